@@ -0,0 +1,11 @@
+
+import booktest as bt
+
+def test_hello(t: bt.TestCaseRun):
+t.h1("Hello Test")
+t.tln("This is a simple test")
+
+@bt.snapshot_httpx()
+def test_snapshot(t: bt.TestCaseRun):
+t.h1("Snapshot Test")
+t.tln("This test uses snapshots")
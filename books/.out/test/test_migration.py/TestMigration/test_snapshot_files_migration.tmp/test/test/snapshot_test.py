@@ -0,0 +1,18 @@
+
+import booktest as bt
+
+@bt.snapshot_httpx()
+def test_with_httpx(t: bt.TestCaseRun):
+    t.h1("HTTPX Snapshot Test")
+    
+@bt.snapshot_requests()
+def test_with_requests(t: bt.TestCaseRun):
+    t.h1("Requests Snapshot Test")
+    
+@bt.snapshot_env()
+def test_with_env(t: bt.TestCaseRun):
+    t.h1("Env Snapshot Test")
+    
+@bt.snapshot_functions()
+def test_with_functions(t: bt.TestCaseRun):
+    t.h1("Functions Snapshot Test")
@@ -39,9 +39,10 @@ from booktest.reporting.output import OutputWriter
 from booktest.reporting.testing import TestIt, value_format
 
 # Dependencies and resources
-from booktest.dependencies.dependencies import depends_on, Resource, Pool, port, port_range
+from booktest.dependencies.dependencies import depends_on, input_files, ephemeral, Resource, Pool, port, port_range
 from booktest.dependencies.memory import monitor_memory, MemoryMonitor, t_memory
-from booktest.dependencies.cache import LruCache, NoCache
+from booktest.dependencies.cache import LruCache, NoCache, MemoryCache
+from booktest.dependencies.codecs import ResultCodec, register_codec
 
 # LLM integration
 from booktest.llm.llm import (
@@ -78,6 +79,8 @@ __all__ = {
     "TestIt",
     "TestSuite",
     "depends_on",
+    "input_files",
+    "ephemeral",
     "Resource",
     "Pool",
     "port",
@@ -123,6 +126,9 @@ __all__ = {
     "t_memory",
     "LruCache",
     "NoCache",
+    "MemoryCache",
+    "ResultCodec",
+    "register_codec",
     "colors",
     "Books",
     "Llm",
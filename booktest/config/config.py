@@ -20,6 +20,29 @@ DEFAULT_PYTHON_PATH = "src:."
 # can be slow
 DEFAULT_TIMEOUT = "1800"
 
+# spawn is the safest start method for parallel workers, as it doesn't inherit
+# threads, locks or open connections from the parent process
+DEFAULT_START_METHOD = "spawn"
+
+# short cases are batched into worker tasks of roughly this many milliseconds
+# to amortize the per task scheduling and process communication overhead
+DEFAULT_BATCH_MS = "1000"
+
+# test results are kept in memory up to this many megabytes, so that dependent
+# tests don't need to load them from the disk
+DEFAULT_CACHE_MEMORY_MB = "1024"
+
+# at most this many test results are waiting to be written in the background.
+# with 0, the results are written before the next test starts
+DEFAULT_RESULT_WRITE_QUEUE = "16"
+
+# the shared artifact cache removes the least recently used results beyond this size
+DEFAULT_ARTIFACT_CACHE_MB = "10240"
+
+# the test output and report files are written through buffers of this many kilobytes
+# and flushed, when the test ends. live_tail=1 flushes the output after every line
+DEFAULT_OUTPUT_BUFFER_KB = "256"
+
 
 def parse_config_value(value):
     if value == "1":
@@ -0,0 +1,222 @@
+import json
+import os
+import shutil
+import uuid
+
+from booktest.config.config import DEFAULT_ARTIFACT_CACHE_MB
+
+#
+# Sharing the memoized test results between machines
+#
+
+
+def same_content(file_path: str, other_path: str):
+    if not os.path.isfile(file_path) or not os.path.isfile(other_path):
+        return False
+    if os.path.getsize(file_path) != os.path.getsize(other_path):
+        return False
+    with open(file_path, "rb") as file, open(other_path, "rb") as other:
+        while True:
+            block = file.read(1024 * 1024)
+            if block != other.read(1024 * 1024):
+                return False
+            if len(block) == 0:
+                return True
+
+
+def copy_atomically(source: str, target: str):
+    temp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        shutil.copyfile(source, temp_path)
+        os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def copy_dir_atomically(source: str, target: str):
+    """
+    Replaces the target directory with a copy of the source directory
+    """
+    temp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+    try:
+        shutil.copytree(source, temp_path)
+        shutil.rmtree(target, ignore_errors=True)
+        os.rename(temp_path, target)
+    except BaseException:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        raise
+
+
+def case_files_dir(md_path: str):
+    """
+    Returns the directory of the files, like images, which the case
+    created next to its output and refers to from it
+    """
+    return os.path.splitext(md_path)[0]
+
+
+def dir_size(dir_path: str):
+    rv = 0
+    for root, _, files in os.walk(dir_path):
+        for name in files:
+            rv += os.path.getsize(os.path.join(root, name))
+    return rv
+
+
+class ArtifactCache:
+    """
+    A directory of test results and outputs keyed by the case fingerprint.
+    The directory can be shared by the CI jobs e.g. via a mounted volume, so
+    that the jobs reuse each other's results instead of recomputing them.
+
+    The entries are published atomically by renaming a completed temporary
+    directory. The least recently used entries are removed by trim(), which
+    is called once at the end of the run instead of after every publish,
+    because it scans the whole cache.
+    """
+
+    RESULT_FILE = "result.bin"
+    OUTPUT_FILE = "output.md"
+    FILES_DIR = "files"
+    META_FILE = "meta.json"
+
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def entry_dir(self, fingerprint: str):
+        return os.path.join(self.cache_dir, fingerprint[:2], fingerprint)
+
+    def temp_dir(self):
+        return os.path.join(self.cache_dir, ".tmp", uuid.uuid4().hex)
+
+    def fetch(self, fingerprint: str, bin_path: str, out_md: str, exp_md: str):
+        """
+        Copies the cached result, output and case files into the output directory,
+        if the cached output matches the snapshot. Returns the original case
+        duration in milliseconds or None, if there is no usable entry.
+        """
+        entry_dir = self.entry_dir(fingerprint)
+        cached_md = os.path.join(entry_dir, self.OUTPUT_FILE)
+        # the output must still match the snapshot, or the case would differ
+        if not same_content(cached_md, exp_md):
+            return None
+        try:
+            with open(os.path.join(entry_dir, self.META_FILE)) as file:
+                meta = json.load(file)
+            os.makedirs(os.path.dirname(bin_path), exist_ok=True)
+            copy_atomically(os.path.join(entry_dir, self.RESULT_FILE), bin_path)
+            # the files are in place before the output referring to them
+            cached_files = os.path.join(entry_dir, self.FILES_DIR)
+            if os.path.isdir(cached_files):
+                copy_dir_atomically(cached_files, case_files_dir(out_md))
+            else:
+                shutil.rmtree(case_files_dir(out_md), ignore_errors=True)
+            copy_atomically(cached_md, out_md)
+            # the modification time of the metadata tracks the last use
+            os.utime(os.path.join(entry_dir, self.META_FILE))
+        except (OSError, ValueError):
+            # the entry was removed by another job meanwhile
+            return None
+        return meta.get("took_ms", 0)
+
+    def publish(self, fingerprint: str, name: str, bin_path: str, out_md: str, exp_md: str, took_ms: int):
+        """
+        Stores the case result, output and case files, if the output matches
+        the snapshot. Returns True, if a new entry was published.
+        """
+        if not os.path.exists(out_md):
+            # the accepted output and files were moved into the snapshot
+            out_md = exp_md
+        files_dir = case_files_dir(out_md)
+        entry_dir = self.entry_dir(fingerprint)
+        if os.path.exists(entry_dir) or \
+           not os.path.exists(bin_path) or \
+           not same_content(out_md, exp_md):
+            return False
+
+        temp_dir = self.temp_dir()
+        os.makedirs(temp_dir)
+        try:
+            shutil.copyfile(bin_path, os.path.join(temp_dir, self.RESULT_FILE))
+            shutil.copyfile(out_md, os.path.join(temp_dir, self.OUTPUT_FILE))
+            size = os.path.getsize(bin_path) + os.path.getsize(out_md)
+            if os.path.isdir(files_dir):
+                shutil.copytree(files_dir, os.path.join(temp_dir, self.FILES_DIR))
+                size += dir_size(files_dir)
+            with open(os.path.join(temp_dir, self.META_FILE), "w") as file:
+                json.dump({"name": name,
+                           "took_ms": took_ms,
+                           "bytes": size},
+                          file)
+            os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+            os.rename(temp_dir, entry_dir)
+        except OSError:
+            # another job published the same entry first
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return False
+
+        return True
+
+    def entries(self):
+        """
+        Returns the entries as (last use, bytes, entry directory) tuples
+        """
+        rv = []
+        for prefix in os.scandir(self.cache_dir):
+            if not prefix.is_dir() or prefix.name == ".tmp":
+                continue
+            for entry in os.scandir(prefix.path):
+                try:
+                    meta_path = os.path.join(entry.path, self.META_FILE)
+                    with open(meta_path) as file:
+                        size = json.load(file).get("bytes", 0)
+                    rv.append((os.path.getmtime(meta_path), size, entry.path))
+                except (OSError, ValueError):
+                    continue
+        return rv
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def trim(self):
+        """
+        Removes the least recently used entries, until the cache fits in max_bytes
+        """
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in entries:
+            if total <= self.max_bytes:
+                break
+            # the entry is moved away first, so that it disappears atomically
+            removed_dir = self.temp_dir()
+            try:
+                os.makedirs(os.path.dirname(removed_dir), exist_ok=True)
+                os.rename(entry_dir, removed_dir)
+            except OSError:
+                continue
+            shutil.rmtree(removed_dir, ignore_errors=True)
+            total -= size
+
+
+def artifact_cache(config: dict):
+    """
+    Returns the artifact cache configured with artifact_cache or None
+    """
+    cache_dir = config.get("artifact_cache")
+    if not cache_dir:
+        return None
+    max_mb = int(config.get("artifact_cache_mb", DEFAULT_ARTIFACT_CACHE_MB))
+    return ArtifactCache(cache_dir, max_mb * 1024 * 1024)
+
+
+def trim_artifact_cache(config: dict):
+    """
+    Removes the least recently used entries of the configured artifact
+    cache, when the run has published its results
+    """
+    cache = artifact_cache(config)
+    if cache is not None and os.path.isdir(cache.cache_dir):
+        cache.trim()
@@ -0,0 +1,245 @@
+import hashlib
+import inspect
+import os
+
+from booktest.dependencies.dependencies import remove_decoration, get_decorated_attr, \
+    bind_dependent_method_if_unbound
+from booktest.reporting.reports import TestResult
+from booktest.config.naming import to_filesystem_path
+from booktest.core.artifacts import artifact_cache
+
+#
+# Memoization of the test case results across runs
+#
+
+# the fingerprint is stored next to the case result file
+FINGERPRINT_SUFFIX = ".fingerprint"
+
+
+def hash_path(digest, file_path: str):
+    """
+    Hashes the file or the directory content with the file names
+    """
+    if os.path.isdir(file_path):
+        for root, dirs, files in os.walk(file_path):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, file_path).encode())
+                hash_path(digest, path)
+    elif os.path.isfile(file_path):
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+    else:
+        digest.update(b"<missing>")
+
+
+class Fingerprints:
+    """
+    Fingerprints of the test cases. The fingerprint covers the test function
+    source, its module source, the fingerprints of its dependencies and
+    the content of its declared input files.
+
+    Code outside the test module is not covered, unless it is
+    declared as an input file.
+
+    The stored fingerprints also cover the case snapshot in exp_dir, so
+    that the case is compared again, when its snapshot is edited or accepted.
+
+    With an artifact cache, the results are also fetched from and
+    published into the cache shared with the other machines.
+    """
+
+    def __init__(self, tests, exp_dir, artifacts=None):
+        self.tests = tests
+        self.exp_dir = exp_dir
+        self.artifacts = artifacts
+        # case name -> fingerprint or None, if the fingerprint is not available
+        self.fingerprints = {}
+        self.module_hashes = {}
+
+    def module_hash(self, source_file: str):
+        if source_file not in self.module_hashes:
+            digest = hashlib.sha256()
+            hash_path(digest, source_file)
+            self.module_hashes[source_file] = digest.hexdigest()
+        return self.module_hashes[source_file]
+
+    def dependencies(self, name):
+        """
+        Returns the cases, which the case depends on, regardless of the selection
+        """
+        method = self.tests.get_case(name)
+        rv = []
+        for dependency in get_decorated_attr(method, "_dependencies") or []:
+            case = self.tests.case_by_method(bind_dependent_method_if_unbound(method, dependency))
+            if case is not None:
+                rv.append(case)
+        return rv
+
+    def fingerprint(self, name):
+        if name in self.fingerprints:
+            return self.fingerprints[name]
+
+        method = self.tests.get_case(name)
+        func = remove_decoration(method)
+        try:
+            source = inspect.getsource(func)
+            source_file = inspect.getsourcefile(func)
+        except (OSError, TypeError):
+            # e.g. functions created dynamically
+            source = None
+            source_file = None
+
+        rv = None
+        if source is not None and source_file is not None:
+            digest = hashlib.sha256()
+            digest.update(name.encode())
+            digest.update(source.encode())
+            digest.update(self.module_hash(source_file).encode())
+            for dependency in self.dependencies(name):
+                dependency_fingerprint = self.fingerprint(dependency)
+                if dependency_fingerprint is None:
+                    digest = None
+                    break
+                digest.update(dependency_fingerprint.encode())
+            if digest is not None:
+                for input_file in sorted(get_decorated_attr(method, "_input_files") or []):
+                    digest.update(input_file.encode())
+                    hash_path(digest, input_file)
+                rv = digest.hexdigest()
+
+        self.fingerprints[name] = rv
+        return rv
+
+    def path(self, out_dir, name):
+        return self.tests.test_result_path(out_dir, name) + FINGERPRINT_SUFFIX
+
+    def snapshot_fingerprint(self, name, md_path):
+        """
+        Returns the case fingerprint combined with the digest of the case
+        output or snapshot in md_path
+        """
+        fingerprint = self.fingerprint(name)
+        if fingerprint is None:
+            return None
+        digest = hashlib.sha256(fingerprint.encode())
+        hash_path(digest, md_path)
+        return digest.hexdigest()
+
+    def write(self, out_dir, name):
+        out_md, exp_md = self.output_paths(out_dir, name)
+        # the output of the run becomes the snapshot, when it is accepted
+        fingerprint = self.snapshot_fingerprint(name, out_md if os.path.exists(out_md) else exp_md)
+        if fingerprint is None:
+            self.remove(out_dir, name)
+        else:
+            with open(self.path(out_dir, name), "w") as file:
+                file.write(fingerprint)
+
+    def remove(self, out_dir, name):
+        path = self.path(out_dir, name)
+        if os.path.exists(path):
+            os.remove(path)
+
+    def matches(self, out_dir, name):
+        """
+        Returns True, if the case result exists and it was created with
+        the current fingerprint and an output matching the current snapshot
+        """
+        path = self.path(out_dir, name)
+        if not os.path.exists(path) or not self.tests.test_result_exists(out_dir, name):
+            return False
+        with open(path) as file:
+            stored = file.read().strip()
+        _, exp_md = self.output_paths(out_dir, name)
+        return stored == self.snapshot_fingerprint(name, exp_md)
+
+    def output_paths(self, out_dir, name):
+        """
+        Returns the case output and snapshot paths
+        """
+        case_path = to_filesystem_path(name) + ".md"
+        return os.path.join(out_dir, case_path), os.path.join(self.exp_dir, case_path)
+
+    def fetch(self, out_dir, name):
+        """
+        Fetches the case result and output from the artifact cache. Returns
+        the case duration or None, if the case is not in the cache.
+        """
+        fingerprint = self.fingerprint(name)
+        if self.artifacts is None or fingerprint is None:
+            return None
+        out_md, exp_md = self.output_paths(out_dir, name)
+        took_ms = self.artifacts.fetch(fingerprint,
+                                       self.tests.test_result_path(out_dir, name),
+                                       out_md,
+                                       exp_md)
+        if took_ms is not None:
+            self.write(out_dir, name)
+        return took_ms
+
+    def publish(self, out_dir, name, took_ms):
+        """
+        Publishes the case result and output into the artifact cache
+        """
+        fingerprint = self.fingerprint(name)
+        if self.artifacts is None or fingerprint is None:
+            return False
+        out_md, exp_md = self.output_paths(out_dir, name)
+        return self.artifacts.publish(fingerprint,
+                                      name,
+                                      self.tests.test_result_path(out_dir, name),
+                                      out_md,
+                                      exp_md,
+                                      took_ms)
+
+    def cached_cases(self, out_dir, cases, reports):
+        """
+        Splits the cases into the cached cases, which don't need to be rerun,
+        and the cases to run.
+
+        A case is cached, if it succeeded in the previous run, its result was
+        stored with the current fingerprint and its selected dependencies
+        are cached too. Other cases are fetched from the artifact cache, if
+        possible. The fetched cases are added into the reports as succeeded.
+        """
+        selected = set(cases)
+        cached = set()
+        fetched = {}
+        # the previous result of each case. the first report wins like in by_name()
+        results = {}
+        for case_name, result, _ in reports.cases:
+            results.setdefault(case_name, result)
+        for name in cases:
+            if any(dependency in selected and dependency not in cached
+                   for dependency in self.dependencies(name)):
+                continue
+            if results.get(name) == TestResult.OK and self.matches(out_dir, name):
+                cached.add(name)
+            else:
+                took_ms = self.fetch(out_dir, name)
+                if took_ms is not None:
+                    cached.add(name)
+                    fetched[name] = took_ms
+
+        if len(fetched) > 0:
+            reports.cases = [case for case in reports.cases if case[0] not in fetched] + \
+                [(name, TestResult.OK, took_ms) for name, took_ms in fetched.items()]
+
+        return [name for name in cases if name in cached], \
+            [name for name in cases if name not in cached]
+
+
+def is_memoized(config: dict):
+    return config.get("memoize", False) and not config.get("refresh_sources", False)
+
+
+def memoized_cases(tests, exp_dir, out_dir, cases, reports, config: dict):
+    """
+    Returns the cached cases and the cases to run
+    """
+    if not is_memoized(config):
+        return [], cases
+    return Fingerprints(tests, exp_dir, artifact_cache(config)).cached_cases(out_dir, cases, reports)
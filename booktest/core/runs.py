@@ -1,26 +1,180 @@
+import heapq
+import importlib
 import traceback
 import multiprocessing
 import os
+import signal
+import sys
 import threading
 import time
-from collections import defaultdict
-from copy import copy
-
-from booktest.dependencies.cache import LruCache
-from booktest.config.config import DEFAULT_TIMEOUT
+from collections import defaultdict, deque
+
+from booktest.dependencies.cache import MemoryCache
+from booktest.dependencies.shared import SharedResults
+from booktest.dependencies.lifetimes import ResultLifetimes, is_ephemeral
+from booktest.config.config import DEFAULT_TIMEOUT, DEFAULT_START_METHOD, DEFAULT_BATCH_MS, \
+    DEFAULT_CACHE_MEMORY_MB
+from booktest.dependencies.dependencies import remove_decoration
 from booktest.config.detection import BookTestSetup
 from booktest.reporting.review import create_index, report_case, start_report, \
-    end_report, report_case_begin, report_case_result
-from booktest.core.testrun import TestRun
-from booktest.reporting.reports import CaseReports, Metrics, test_result_to_exit_code, read_lines, write_lines, UserRequest, \
-    TestResult
+    end_report, report_case_begin, report_case_result, report_cached_cases
+from booktest.core.testrun import TestRun, write_skipped_case
+from booktest.core.testcaserun import flush_case_outputs
+from booktest.core.workers import WorkerPool, notify
+from booktest.core.fingerprints import memoized_cases, FINGERPRINT_SUFFIX
+from booktest.core.artifacts import trim_artifact_cache
+from booktest.utils.utils import ensure_dir, remove_dir
+from booktest.reporting.reports import CaseReports, Metrics, test_result_to_exit_code, UserRequest, \
+    TestResult, DurationHistory
 
 #
 # Parallelization and test execution support:
 #
 
 
-PROCESS_LOCAL_CACHE = LruCache(8)
+# the test results kept in the worker process memory. created on the first task
+PROCESS_LOCAL_CACHE = None
+
+# the process setup of the worker, which is torn down, when the worker exits
+WORKER_SETUP = None
+
+# the exception raised by the worker's process setup
+WORKER_SETUP_ERROR = None
+
+# the modules preloaded into the forkserver of this process, or None
+FORKSERVER_PRELOAD = None
+
+
+def memory_cache(config: dict):
+    """
+    Creates the in-memory result cache limited by the cache_memory_mb
+    configuration. The evicted results are not spilled, because the results
+    are always written into their .bin files. The results removed from
+    the disk must be removed from the cache too.
+    """
+    memory_mb = int(config.get("cache_memory_mb", DEFAULT_CACHE_MEMORY_MB))
+    return MemoryCache(memory_mb * 1024 * 1024)
+
+
+def process_cache(config: dict):
+    global PROCESS_LOCAL_CACHE
+    if PROCESS_LOCAL_CACHE is None:
+        PROCESS_LOCAL_CACHE = memory_cache(config)
+    return PROCESS_LOCAL_CACHE
+
+
+START_METHODS = ["spawn", "forkserver", "fork"]
+
+
+def case_modules(tests):
+    """
+    Returns the sorted names of the modules, where the test cases are defined
+    """
+    rv = set()
+    for _, method in tests.cases:
+        module = getattr(remove_decoration(method), "__module__", None)
+        if module is not None and module != "__main__":
+            rv.add(module)
+    return sorted(rv)
+
+
+def preload_modules(config: dict, tests):
+    """
+    Returns the modules that are imported once before the workers are started.
+
+    These include booktest itself, the modules listed in the comma separated
+    'parallel_preload' configuration and the modules of the detected tests.
+    """
+    rv = ["booktest"]
+    for module in str(config.get("parallel_preload", "")).split(","):
+        module = module.strip()
+        if len(module) > 0 and module not in rv:
+            rv.append(module)
+    for module in case_modules(tests):
+        if module not in rv:
+            rv.append(module)
+    return rv
+
+
+def forkserver_preloaded():
+    """
+    Returns True, if the forkserver preload has already been set in this
+    process. The server is started by the first worker pool and it keeps
+    this preload, so later preloads would be ignored.
+    """
+    return FORKSERVER_PRELOAD is not None
+
+
+def pool_context(config: dict, tests):
+    """
+    Creates the multiprocessing context for the worker pool based on the
+    'parallel_start_method' configuration:
+
+    - spawn starts each worker as a fresh interpreter, which imports
+      everything it needs. This is the slowest, but the safest option.
+    - forkserver starts a server process, which imports the preloaded
+      modules once. Workers are forked from this server.
+    - fork forks the workers from the main process. The preloaded modules
+      are imported in the main process, so workers share them copy-on-write.
+    """
+    global FORKSERVER_PRELOAD
+    start_method = config.get("parallel_start_method", DEFAULT_START_METHOD)
+    if start_method not in START_METHODS:
+        raise ValueError(
+            f"unknown parallel start method '{start_method}'. use one of {', '.join(START_METHODS)}")
+    if start_method not in multiprocessing.get_all_start_methods():
+        raise ValueError(f"parallel start method '{start_method}' is not supported on this platform")
+
+    context = multiprocessing.get_context(start_method)
+
+    if start_method == "forkserver":
+        if forkserver_preloaded():
+            # the server is started once per process and it keeps the modules
+            # preloaded in the first run, so the workers import the rest
+            import warnings
+            warnings.warn("the forkserver preload was set by an earlier run, so the test modules are not preloaded")
+        else:
+            FORKSERVER_PRELOAD = preload_modules(config, tests)
+            context.set_forkserver_preload(FORKSERVER_PRELOAD)
+    elif start_method == "fork":
+        for module in preload_modules(config, tests):
+            importlib.import_module(module)
+
+    return context
+
+
+def critical_path_priorities(todo, dependencies, durations):
+    """
+    Returns the priority of each case as the duration of the heaviest chain
+    of cases, which starts from a dependent case and ends at the case.
+    """
+    dependents = defaultdict(list)
+    names = set(todo)
+    for name in todo:
+        for dependency in dependencies[name]:
+            dependents[dependency].append(name)
+            names.add(dependency)
+
+    rv = {}
+    for root in sorted(names):
+        stack = [(root, False)]
+        while len(stack) > 0:
+            name, expanded = stack.pop()
+            if name in rv:
+                continue
+            if expanded:
+                duration = durations.get(name, 1)  # assume task to take 1s by default
+                rv[name] = duration + max([rv.get(i, 0) for i in dependents[name]], default=0)
+            else:
+                stack.append((name, True))
+                for dependent in dependents[name]:
+                    if dependent not in rv:
+                        stack.append((dependent, False))
+    return rv
+
+
+def resource_identity(resource):
+    return getattr(resource, "identity", resource)
 
 
 def batch_dir(out_dir: str):
@@ -37,8 +191,64 @@ def prepare_batch_dir(out_dir: str):
     _batch_dir = batch_dir(out_dir)
 
     if os.path.exists(_batch_dir):
-        os.system(f"rm -rf {_batch_dir}")
-        os.makedirs(_batch_dir, exist_ok=True)
+        remove_dir(_batch_dir)
+        ensure_dir(_batch_dir)
+
+
+def init_worker(setup: BookTestSetup = None):
+    global WORKER_SETUP, WORKER_SETUP_ERROR
+    import coverage
+    coverage.process_startup()
+    signal.signal(signal.SIGTERM, terminate_worker)
+
+    if setup is not None:
+        worker_setup = setup.setup_teardown()
+        try:
+            worker_setup.__enter__()
+            WORKER_SETUP = worker_setup
+        except Exception as e:
+            # the error is reported by the batches instead of crashing
+            # the worker, which would be restarted again and again
+            traceback.print_exc()
+            WORKER_SETUP_ERROR = e
+
+
+def terminate_worker(signum, frame):
+    """
+    Flushes the buffered test outputs before the worker is terminated,
+    so that the partial outputs are left for debugging
+    """
+    flush_case_outputs()
+    signal.signal(signum, signal.SIG_DFL)
+    os.kill(os.getpid(), signum)
+
+
+def exit_worker():
+    """
+    Tears down the process setup and releases the worker memory, when
+    the worker exits normally. This is not left to atexit, because
+    the fork and forkserver workers exit without running the atexit hooks.
+    """
+    global WORKER_SETUP
+    worker_setup, WORKER_SETUP = WORKER_SETUP, None
+    try:
+        if worker_setup is not None:
+            worker_setup.__exit__(None, None, None)
+    finally:
+        release_worker_memory()
+
+
+def release_worker_memory():
+    """
+    Drops the cached results, so that the mapped result files
+    and shared memory segments are unmapped before the worker exits
+    """
+    global PROCESS_LOCAL_CACHE
+    PROCESS_LOCAL_CACHE = None
+
+
+def case_batch_name(name):
+    return ".".join(name.split("/"))
 
 
 class RunBatch:
@@ -51,25 +261,57 @@ class RunBatch:
                  exp_dir: str,
                  out_dir: str,
                  tests,
-                 config: dict,
-                 setup: BookTestSetup):
+                 config: dict):
         self.exp_dir = exp_dir
         self.out_dir = out_dir
         self.tests = tests
         self.config = config
-        self.setup = setup
 
-    def __call__(self, case, preallocations={}):
+    def __call__(self, cases, preallocations={}, shared_results={}, released=()):
+        """
+        Runs a single case or a list of cases in one batch directory.
+        The dependency results found in shared_results are decoded from
+        the parent's shared memory segments. The released results, which
+        no remaining case needs, are dropped from the worker's memory.
+
+        Each case report is streamed to the parent process as soon as the case
+        finishes. The reports are also returned, because the streamed reports
+        may arrive after the task completion.
+
+        The process setup is not done here, because it is done once,
+        when the worker starts.
+        """
+        if isinstance(cases, str):
+            cases = [cases]
+
+        cache = process_cache(self.config)
+        for bin_path in released:
+            cache.remove(bin_path)
+
+        reports = []
+        # the parent follows the results in the worker's memory from the
+        # results loaded and evicted during each case
+        cached = set(cache.keys())
+        cached_lock = threading.Lock()
+
+        def case_done(case_name, result, duration):
+            nonlocal cached
+            report = CaseReports.make_case(case_name, result, duration)
+            reports.append(report)
+            with cached_lock:
+                keys = set(cache.keys())
+                loaded, evicted = sorted(keys - cached), sorted(cached - keys)
+                cached = keys
+            notify("case", report, loaded, evicted)
+
         output = None
         try:
             allocations = set()  # everything should be handled by preallocations
-            path = case.split("/")
-            batch_name = ".".join(path)
             batch_dir = \
                 os.path.join(
                     self.out_dir,
                     ".batches",
-                    batch_name)
+                    case_batch_name(cases[0]))
 
             os.makedirs(batch_dir, exist_ok=True)
 
@@ -80,39 +322,103 @@ class RunBatch:
 
             output = open(output_file, "w")
 
+            if WORKER_SETUP_ERROR is not None:
+                raise WORKER_SETUP_ERROR
+
             run = TestRun(
                 self.exp_dir,
                 self.out_dir,
                 batch_dir,
                 self.tests,
-                [case],
+                cases,
                 self.config,
-                PROCESS_LOCAL_CACHE,
+                cache,
                 output,
                 allocations,
                 preallocations,
-                batch_dir=batch_dir)  # Pass batch_dir for DVC manifest handling
+                batch_dir=batch_dir,  # Pass batch_dir for DVC manifest handling
+                case_listener=case_done,
+                shared_results=shared_results,
+                release_results=False)
 
-            with self.setup.setup_teardown():
-                rv = test_result_to_exit_code(run.run())
+            run.run()
 
         except Exception as e:
-            print(f"{case} failed with {e}")
+            print(f"{', '.join(cases)} failed with {e}")
             if output:
-                output.write(f"{case} failed with {e}\n")
+                output.write(f"{', '.join(cases)} failed with {e}\n")
             traceback.print_exc()
-            rv = test_result_to_exit_code(TestResult.FAIL)
         finally:
             if output:
                 output.close()
 
-        return rv
+        return reports
 
 
-def case_batch_dir_and_report_file(batches_dir, name):
-    path = ".".join(name.split("/"))
-    batch_dir = os.path.join(batches_dir, path)
-    return batch_dir, os.path.join(batch_dir, "cases.txt")
+class BatchMerger:
+    """
+    Merges the batch outputs into the output directory as the batches finish,
+    so that little work is left after the last test.
+
+    The .txt outputs are appended to temporary files, which replace the old
+    outputs on finish. The DVC manifest updates are accumulated in memory and
+    written into the manifest once on finish.
+    """
+
+    def __init__(self, out_dir, config):
+        self.out_dir = out_dir
+        self.files = {}
+        self.merged = set()
+        self.manifest_updates = {}
+        self.manifest_path = None
+
+        # Merge DVC manifest updates from batch runs (only if using DVC storage)
+        storage_mode = config.get("storage.mode", "auto")
+        if storage_mode in ("dvc", "auto"):
+            try:
+                from booktest.snapshots.storage import detect_storage_mode, StorageMode
+                if detect_storage_mode(config) == StorageMode.DVC:
+                    self.manifest_path = config.get("storage.dvc.manifest_path", "booktest.manifest.yaml")
+            except Exception as e:
+                # Non-fatal: DVC may not be in use
+                import warnings
+                warnings.warn(f"Failed to detect DVC storage: {e}")
+
+    def merge(self, batch_dir):
+        if batch_dir in self.merged or not os.path.isdir(batch_dir):
+            return
+        self.merged.add(batch_dir)
+
+        for name in sorted(os.listdir(batch_dir)):
+            if name.endswith(".txt") and name != "cases.txt":
+                with open(os.path.join(batch_dir, name), "r") as f:
+                    content = f.read()
+                if len(content) > 0:
+                    if name not in self.files:
+                        self.files[name] = open(os.path.join(self.out_dir, name + ".merging"), "w")
+                    self.files[name].write(content if content.endswith("\n") else content + "\n")
+
+        if self.manifest_path is not None:
+            from booktest.snapshots.storage import DVCStorage
+            DVCStorage.add_manifest_updates(self.manifest_updates, DVCStorage.read_batch_manifest(batch_dir))
+
+    def finish(self, batch_dirs):
+        for batch_dir in batch_dirs:
+            self.merge(batch_dir)
+
+        for name, file in self.files.items():
+            file.close()
+            os.replace(os.path.join(self.out_dir, name + ".merging"), os.path.join(self.out_dir, name))
+        self.files = {}
+
+        if self.manifest_path is not None:
+            try:
+                from booktest.snapshots.storage import DVCStorage
+                DVCStorage.merge_manifest_updates(self.manifest_path, self.manifest_updates)
+            except Exception as e:
+                # Non-fatal: merge may fail
+                import warnings
+                warnings.warn(f"Failed to merge DVC manifests: {e}")
 
 
 class ParallelRunner:
@@ -124,7 +430,8 @@ class ParallelRunner:
                  cases: list,
                  config: dict,
                  setup,
-                 reports: CaseReports):
+                 reports: CaseReports,
+                 history: DurationHistory = None):
         self.cases = cases
         process_count = config.get("parallel", True)
         if process_count is True or process_count == "True":
@@ -133,11 +440,21 @@ class ParallelRunner:
             process_count = int(process_count)
 
         self.process_count = process_count
+        self.start_method = config.get("parallel_start_method", DEFAULT_START_METHOD)
+        self.context = pool_context(config, tests)
         self.pool = None
         self.done = set()
         self.case_durations = {}
         for name, result, duration in reports.cases:
             self.case_durations[name] = duration
+        # the rolling averages over several runs are more reliable than the last run
+        if history is not None:
+            self.case_durations.update(history.durations())
+        self.history_complete = \
+            history is not None and all(history.count(name) > 0 for name in cases)
+
+        # cases known to be faster than this are batched together
+        self.batch_ms = int(config.get("parallel_batch_ms", DEFAULT_BATCH_MS))
 
         batches_dir = \
             os.path.join(
@@ -150,16 +467,19 @@ class ParallelRunner:
         # 2. prepare batch jobs for process pools
         #
 
-        # 2.1 configuration. batches must not be interactive
+        # 2.1 configuration. batches must not be interactive and
+        #     the fail fast is handled by the parent process
 
         import copy
         job_config = copy.copy(config)
         job_config["continue"] = False
         job_config["interactive"] = False
         job_config["always_interactive"] = False
+        job_config["fail_fast"] = False
 
         self.batches_dir = batches_dir
-        self.run_batch = RunBatch(exp_dir, out_dir, tests, job_config, setup)
+        self.run_batch = RunBatch(exp_dir, out_dir, tests, job_config)
+        self.setup = setup
         self.timeout = int(config.get("timeout", DEFAULT_TIMEOUT))
 
         self.log_path = os.path.join(out_dir, "log.txt")
@@ -174,77 +494,353 @@ class ParallelRunner:
             resources[name] = list(tests.method_resources(method))
             todo.add(name)
 
-            batch_dir, batch_report_file = case_batch_dir_and_report_file(self.batches_dir, name)
-            os.makedirs(batch_dir, exist_ok=True)
-
         # prioritize each task based on the heaviest chain of tasks depending on it
-        priorities = defaultdict(lambda: 0)
-
-        def assign_priority(name, dependent_duration):
-            duration = self.case_durations.get(name, 1) # assume task to take 1s by default
-            total_duration = duration + dependent_duration
-            priorities[name] = max(priorities[name], total_duration)
-            for dependent in dependencies[name]:
-                assign_priority(dependent, total_duration)
-
-        for name in todo:
-            assign_priority(name, 0)
-
-        self.priorities = priorities
+        self.priorities = critical_path_priorities(todo, dependencies, self.case_durations)
 
         self._log = None
         self.todo = todo
         self.dependencies = dependencies
         self.resources = resources
-        self.scheduled = {}
         self._abort = False
         self.thread = None
         self.lock = threading.Lock()
-
-        self.reports = []
-        self.left = len(todo)
+        # the condition is signaled, whenever a task or a case finishes,
+        # a report becomes available or the run is aborted
+        self.condition = threading.Condition(self.lock)
+        self.finished_tasks = []
+        self.streamed_reports = []
+        # the exited workers, which the scheduling thread replaces
+        self.exited_workers = []
+        self.running = False
+
+        self.reports = deque()
         self.allocated_resources = set()
+        self.task_batch_dirs = []
+        self.merger = BatchMerger(out_dir, config)
+        # the result files of each worker, which have their results in
+        # the worker's memory cache
+        self.worker_results = defaultdict(set)
+
+        # the cases are planned from a priority queue of the ready cases. the cases
+        # enter the queue, when their last dependency finishes. the cases waiting
+        # for a resource are kept aside until the resource is freed
+        self.dependents = defaultdict(list)
+        self.waiting = defaultdict(lambda: 0)
+        for name in todo:
+            for dependency in dependencies[name]:
+                if dependency in todo:
+                    self.dependents[dependency].append(name)
+                    self.waiting[name] += 1
+        self.blocked = defaultdict(list)
+        self.ready = []
+        self.ready_batchable_ms = 0
+        for name in todo:
+            if self.waiting[name] == 0:
+                self.push_ready(name)
 
-    def plan(self, todo, plan_target):
+        # the results needed by several dependents are shared with the workers
+        # via shared memory until their last dependent has finished
+        self.tests = tests
+        self.out_dir = out_dir
+        self.shared = SharedResults() if config.get("parallel_shared_results", True) else None
+        self.lifetimes = ResultLifetimes(dependencies)
+        # worker -> the result files, which the worker can drop from its memory
+        self.released = defaultdict(list)
+        # the cases, which were not run, because a dependency failed
+        self.skipped = set()
+
+    def estimate_ms(self):
+        """
+        Estimates the run duration as the longer of the critical path and
+        the total work divided over the workers
+        """
+        total_ms = sum(self.case_durations.get(name, 1) for name in self.todo)
+        critical_path_ms = max([self.priorities[name] for name in self.todo], default=0)
+        return max(critical_path_ms, total_ms / max(1, self.process_count))
+
+    def push_ready(self, name):
+        heapq.heappush(self.ready, (-self.priorities[name], name))
+        if self.is_batchable(name):
+            self.ready_batchable_ms += self.case_durations[name]
+
+    def pop_ready(self):
+        _, name = heapq.heappop(self.ready)
+        if self.is_batchable(name):
+            self.ready_batchable_ms -= self.case_durations[name]
+        return name
+
+    def case_done(self, name):
+        """
+        Marks the case done and moves the dependents without unfinished
+        dependencies to the ready queue
+        """
+        self.done.add(name)
+        for dependent in self.dependents[name]:
+            if dependent in self.done:
+                # the dependent was skipped
+                continue
+            self.waiting[dependent] -= 1
+            if self.waiting[dependent] == 0:
+                self.push_ready(dependent)
+
+    def skip_dependents(self, name):
+        """
+        Marks the unfinished cases depending on the failed case done without
+        running them. Returns the skipped cases as (case, failed dependency) pairs.
+        """
+        rv = []
+        failed = [name]
+        while len(failed) > 0:
+            dependency = failed.pop()
+            for dependent in self.dependents[dependency]:
+                if dependent not in self.done:
+                    # the dependent is waiting for the failed case, so it cannot be scheduled yet
+                    self.done.add(dependent)
+                    self.skipped.add(dependent)
+                    rv.append((dependent, dependency))
+                    failed.append(dependent)
+        return rv
+
+    def share_results(self, name, result):
+        """
+        Shares the case result with the workers, if several dependents still need it
+        """
+        if self.shared is None:
+            return
+        if result in (TestResult.OK, TestResult.DIFF) and self.lifetimes.unfinished_dependents(name) > 1:
+            bin_path = self.tests.test_result_path(self.out_dir, name)
+            if self.shared.publish(bin_path):
+                self.log(f"{name} result shared with the workers.")
+
+    def release_results(self, name):
+        """
+        Releases the results, which are not needed anymore after the case. The workers
+        drop them from their memory and the ephemeral result files are removed.
+        """
+        for released in self.lifetimes.finished(name):
+            bin_path = self.tests.test_result_path(self.out_dir, released)
+            if self.shared is not None:
+                self.shared.release(bin_path)
+            self.release_from_workers(bin_path)
+            if is_ephemeral(self.tests.get_case(released)):
+                for file_path in (bin_path, bin_path + FINGERPRINT_SUFFIX):
+                    if os.path.exists(file_path):
+                        os.remove(file_path)
+                self.log(f"{released} ephemeral result removed.")
+
+    def release_from_workers(self, bin_path):
+        """
+        Makes the workers drop the result from their memory, when they get their next task
+        """
+        for worker_id in range(self.process_count):
+            self.released[worker_id].append(bin_path)
+            self.worker_results[worker_id].discard(bin_path)
+
+    def skip_case(self, name, dependency):
+        """
+        Reports the case skipped and removes its results from the earlier runs
+        """
+        write_skipped_case(self.out_dir, name, [dependency])
+        bin_path = self.tests.test_result_path(self.out_dir, name)
+        for file_path in (bin_path, bin_path + FINGERPRINT_SUFFIX):
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        self.release_from_workers(bin_path)
+        self.release_results(name)
+        self.log(f"{name} skipped, because {dependency} failed.")
+
+    def shared_results(self, names):
+        """
+        Returns the shared memory segments of the dependency results of the cases
+        """
+        if self.shared is None:
+            return {}
+        bin_paths = set()
+        for name in names:
+            for dependency in self.dependencies[name]:
+                bin_paths.add(self.tests.test_result_path(self.out_dir, dependency))
+        return self.shared.segment_names(bin_paths)
+
+    def is_batchable(self, name):
+        """
+        Cases without resources, which are known to be fast based
+        on the previous runs, can be batched into a single task
+        """
+        return len(self.resources[name]) == 0 and \
+            name in self.case_durations and \
+            self.case_durations[name] < self.batch_ms
+
+    def allocate(self, name):
+        """
+        Allocates the case resources. Returns the preallocations or None, if some
+        resource is not available. In the latter case, the case waits
+        until the resource is freed.
+        """
+        allocations = self.allocated_resources
+        preallocations = {}
+        for pos, resource in enumerate(self.resources[name]):
+            resource_allocations_preallocations = resource.allocate((name, pos), allocations, preallocations)
+            if resource_allocations_preallocations is None:
+                self.blocked[resource_identity(resource)].append(name)
+                return None
+            _, allocations, preallocations = resource_allocations_preallocations
+
+        self.allocated_resources = allocations
+        return preallocations
+
+    def deallocate(self, name, preallocations):
+        """
+        Frees the case resources and moves the cases waiting for them back to the ready queue
+        """
+        for pos, resource in enumerate(self.resources[name]):
+            allocation_id = (name, pos)
+            if allocation_id not in preallocations:
+                raise ValueError(f"missing {allocation_id} in {preallocations}")
+            resource_identity_allocation = preallocations[allocation_id]
+            self.log(f" - {allocation_id}={resource_identity_allocation[0]}:{resource_identity_allocation[1]}")
+            self.allocated_resources = resource.deallocate(self.allocated_resources, resource_identity_allocation[1])
+            for blocked in self.blocked.pop(resource_identity(resource), []):
+                self.push_ready(blocked)
+
+    def plan(self, plan_target):
+        """
+        Plans up to plan_target tasks from the ready queue and allocates their
+        resources. Returns the tasks as (case names, preallocations) pairs.
+
+        Fast cases are grouped into batches. The batch size adapts to the ready
+        work, so that the fast cases are still spread over all free workers.
+        """
         rv = []
-        allocated_resources = copy(self.allocated_resources)
+        # ready cases, which didn't fit in this plan
+        deferred = []
+
+        batch_target_ms = min(self.batch_ms, self.ready_batchable_ms / max(1, plan_target))
+        batch = None
+        batch_ms = 0
 
         # run slowest jobs first
-        todo = list(todo)
-        todo.sort(key=lambda name: (-self.priorities[name], name))
+        while len(self.ready) > 0:
+            if len(rv) >= plan_target and (batch is None or batch_ms >= batch_target_ms):
+                break
+
+            name = self.pop_ready()
+
+            if self.is_batchable(name):
+                if batch is None or batch_ms >= batch_target_ms:
+                    if len(rv) >= plan_target:
+                        deferred.append(name)
+                        continue
+                    batch = []
+                    batch_ms = 0
+                    rv.append((batch, {}))
+                batch.append(name)
+                batch_ms += self.case_durations[name]
+                continue
 
-        for name in todo:
             if len(rv) >= plan_target:
-                break
-            runnable = True
-            for dependency in self.dependencies[name]:
-                if dependency in self.todo and dependency not in self.done:
-                    runnable = False
-
-            allocated_resources2 = copy(allocated_resources)
-            preallocations = {}
-
-            for pos, resource in enumerate(self.resources[name]):
-                resource_allocations_preallocations = resource.allocate((name, pos), allocated_resources2, preallocations)
-                if resource_allocations_preallocations is not None:
-                    _, new_allocations, new_preallocations = resource_allocations_preallocations
-                    allocated_resources2 = new_allocations
-                    preallocations = new_preallocations
-                else:
-                    runnable = False
-                    break
+                deferred.append(name)
+                continue
+
+            preallocations = self.allocate(name)
+            if preallocations is not None:
+                rv.append(([name], preallocations))
 
-            if runnable:
-                rv.append((name, preallocations))
-                allocated_resources = allocated_resources2
+        for name in deferred:
+            self.push_ready(name)
 
-        return rv, allocated_resources
+        return rv
 
     def abort(self):
-        with self.lock:
+        with self.condition:
             self._abort = True
+            self.condition.notify_all()
+        # the workers killed during the shutdown are not replaced
+        if self.pool is not None:
+            self.pool.close()
+
+    def on_event(self, worker_id, event):
+        """
+        Callback, which is called by the worker pool reader thread, when
+        a worker has finished a case or a task
+        """
+        with self.condition:
+            kind = event[0]
+            if kind == "case":
+                self.streamed_reports.append((worker_id, event[1], event[2], event[3]))
+            elif kind == "done":
+                self.finished_tasks.append((worker_id, event[1], event[2]))
+            elif kind == "replace":
+                self.exited_workers.append(worker_id)
+            else:
+                # the task raised an exception or the worker died
+                self.finished_tasks.append((worker_id, event[1], []))
+                if kind == "exit":
+                    self.worker_results[worker_id].clear()
+            self.condition.notify_all()
+
+    def worker_cache_changed(self, worker_id, loaded, evicted):
+        """
+        Updates the results in the worker's memory cache with the result files
+        loaded and evicted by the worker
+        """
+        results = self.worker_results[worker_id]
+        results.update(loaded)
+        results.difference_update(evicted)
+
+    def affinity(self, worker_id, dependencies):
+        results = self.worker_results[worker_id]
+        return sum(1
+                   for dependency in dependencies
+                   if self.tests.test_result_path(self.out_dir, dependency) in results)
+
+    def assign_workers(self, tasks, idle_workers):
+        """
+        Assigns the tasks to the idle workers. The tasks prefer the workers, which
+        have the task dependency results in their memory. If such worker is busy, the task
+        falls back to another idle worker.
+        """
+        rv = []
+        idle_workers = list(idle_workers)
+        for names, preallocations in tasks:
+            dependencies = set()
+            for name in names:
+                dependencies |= self.dependencies[name]
+            worker_id = max(idle_workers, key=lambda i: (self.affinity(i, dependencies), -i))
+            idle_workers.remove(worker_id)
+            rv.append((worker_id, names, preallocations))
+        return rv
+
+    def wait_events(self, scheduled):
+        """
+        Blocks until some scheduled task or case has finished, a worker has exited,
+        the earliest task has timeouted or the run is aborted. Returns the finished
+        tasks, the streamed reports and the exited workers.
+        """
+        with self.condition:
+            while len(self.finished_tasks) == 0 and \
+                    len(self.streamed_reports) == 0 and \
+                    len(self.exited_workers) == 0 and \
+                    not self._abort:
+                if len(scheduled) == 0:
+                    # only waiting for the busy workers to become free
+                    self.condition.wait()
+                    continue
+                deadline = min(task[1] for task in scheduled.values()) + self.timeout
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            finished_tasks = self.finished_tasks
+            streamed_reports = self.streamed_reports
+            exited_workers = self.exited_workers
+            self.finished_tasks = []
+            self.streamed_reports = []
+            self.exited_workers = []
+            return finished_tasks, streamed_reports, exited_workers
 
     def log(self, message):
+        if self._log is None:
+            return
         timestamp = time.strftime("%Y-%m-%d %H:%M:%S")
         self._log.write(f"{timestamp}: {message}\n")
         self._log.flush()
@@ -254,11 +850,17 @@ class ParallelRunner:
         for name in sorted(list([(self.priorities[i], i) for i in self.todo]), key=lambda x: (-x[0], x[1])):
             self.log(f" - {name[0]} {name[1]}")
 
+        # task id -> (worker id, begin or last progress, preallocations, case names)
         scheduled = dict()
+        # case name -> task id
+        case_tasks = dict()
 
-        while len(self.done) < len(self.todo) and not self._abort:
-            plan_target = (self.process_count - len(scheduled))
-            planned_tasks, planned_allocated_resources = self.plan(self.todo - self.done - scheduled.keys(), plan_target)
+        # the tasks are waited to finish even after their last case is reported,
+        # so that the workers have completed writing the batch outputs
+        while (len(self.done) < len(self.todo) or len(scheduled) > 0) and not self._abort:
+            idle_workers = self.pool.idle_workers()
+            plan_target = min(len(idle_workers), self.process_count - len(scheduled))
+            planned_tasks = self.plan(plan_target)
 
             #
             # 1. start async jobs
@@ -266,126 +868,197 @@ class ParallelRunner:
             self.log(f"planned {len(planned_tasks)} / {len(self.todo) - len(self.done)} tasks")
             self.log(f"{len(self.allocated_resources)} resources reserved")
 
-            for name, preallocations in planned_tasks:
-                self.log(f"scheduling {name} with resources:")
+            for worker_id, names, preallocations in self.assign_workers(planned_tasks, idle_workers):
+                task_id = names[0]
+                if len(names) > 1:
+                    self.log(f"scheduling batch {task_id} with {len(names)} cases to worker {worker_id}: {', '.join(names)}")
+                else:
+                    self.log(f"scheduling {task_id} to worker {worker_id} with resources:")
                 for allocation_id, resource_identity_allocation in preallocations.items():
                     self.log(f" - {allocation_id}={resource_identity_allocation[0]}:{resource_identity_allocation[1]}")
 
-                scheduled[name] = (self.pool.apply_async(self.run_batch, args=[name, preallocations]), time.time(), preallocations)
-
-            self.allocated_resources = planned_allocated_resources
+                self.pool.submit(worker_id,
+                                 task_id,
+                                 names,
+                                 preallocations,
+                                 self.shared_results(names),
+                                 self.released.pop(worker_id, []))
+                scheduled[task_id] = (worker_id, time.time(), preallocations, names)
+                for name in names:
+                    case_tasks[name] = task_id
+                self.task_batch_dirs.append(os.path.join(self.batches_dir, case_batch_name(task_id)))
 
             scheduled_example = ", ".join(list(scheduled)[:3] + ["..."] if len(scheduled) > 3 else list(scheduled))
             self.log(f"{len(scheduled)} / {len(self.todo) - len(self.done)} tasks are scheduled: {scheduled_example}")
             self.log(f"{len(self.allocated_resources)} resources reserved")
 
-            if len(scheduled) == 0:
-                self.log(f"no tasks to run, while only {len(self.done)}/{self.todo} done. todo: {', '.join(planned_tasks)}")
+            if len(scheduled) == 0 and len(idle_workers) == self.process_count:
+                self.log(f"no tasks to run, while only {len(self.done)}/{len(self.todo)} done.")
                 break
 
             #
-            # 2. collect done tasks
+            # 2. collect done cases and tasks
             #
+            finished_tasks, streamed_reports, exited_workers = self.wait_events(scheduled)
+
+            # the workers are started from this thread instead of the pool's
+            # reader thread, and not at all after the run has been aborted
+            for worker_id in exited_workers:
+                if not self._abort:
+                    self.pool.restart(worker_id)
+                    self.log(f"worker {worker_id} restarted.")
+
+            reports = []
+            now = time.time()
+
+            def report(case_report):
+                name = case_report[0]
+                if name in case_tasks and name not in self.done:
+                    skipped = []
+                    if case_report[1] == TestResult.FAIL:
+                        skipped = self.skip_dependents(name)
+                    self.case_done(name)
+                    self.share_results(name, case_report[1])
+                    self.release_results(name)
+                    reports.append(case_report)
+                    self.log(f"{name} reported as {case_report[1]} after {case_report[2]}.")
+                    for skipped_name, dependency in skipped:
+                        self.skip_case(skipped_name, dependency)
+                        reports.append(CaseReports.make_case(skipped_name, TestResult.SKIPPED, 0))
+
+            for worker_id, case_report, loaded, evicted in streamed_reports:
+                name = case_report[0]
+                report(case_report)
+                self.worker_cache_changed(worker_id, loaded, evicted)
+                # the batch progresses, so restart its timeout
+                task_id = case_tasks.get(name)
+                if task_id in scheduled:
+                    _, _, preallocations, names = scheduled[task_id]
+                    scheduled[task_id] = (worker_id, now, preallocations, names)
+
             done_tasks = list()
-            while len(done_tasks) == 0 and not self._abort:
-                for name, task_begin_preallocation in scheduled.items():
-                    task, begin, preallocation = task_begin_preallocation
-                    if task in done_tasks:
-                        pass # already added
-                    elif task.ready():
-                        done_tasks.append((name, preallocation))
-                        self.log(f"{name} ready.")
-                    elif time.time() - begin > self.timeout:
-                        done_tasks.append((name, preallocation))
-                        self.log(f"{name} timeouted after {time.time() - begin}.")
-                if len(done_tasks) == 0:
-                    time.sleep(0.001)
+            for worker_id, task_id, task_reports in finished_tasks:
+                if task_id in scheduled:
+                    for case_report in task_reports:
+                        report(case_report)
+                    done_tasks.append(task_id)
+                    self.log(f"{task_id} ready.")
+
+            for task_id, (worker_id, begin, preallocations, names) in scheduled.items():
+                if now - begin > self.timeout and task_id not in done_tasks:
+                    # free the worker and the resources for the other cases
+                    self.pool.terminate(worker_id)
+                    done_tasks.append(task_id)
+                    self.log(f"{task_id} timeouted after {now - begin} and worker {worker_id} was terminated.")
 
             #
-            # 3. remove done tasks and collect their reports
+            # 3. remove done tasks and fail their unreported cases
             #
-            self.done |= {i[0] for i in done_tasks}
-            reports = []
-            for name, preallocations in done_tasks:
-                begin = scheduled[name][1]
-                del scheduled[name]
-                batch_dir = case_batch_dir_and_report_file(self.batches_dir, name)[0]
-                i_case_report = None
-                if os.path.exists(batch_dir):
-                    i_report = CaseReports.of_dir(batch_dir)
-                    if len(i_report.cases) > 0:
-                        i_case_report = i_report.cases[0]
-                if i_case_report is None:
-                    i_case_report = CaseReports.make_case(name, TestResult.FAIL, 1000*(time.time() - begin))
-                reports.append(i_case_report)
-                self.log(f"{name} reported as {i_case_report[1]} after {i_case_report[2]}.")
+            for task_id in done_tasks:
+                worker_id, begin, preallocations, names = scheduled[task_id]
+                del scheduled[task_id]
+                self.merger.merge(os.path.join(self.batches_dir, case_batch_name(task_id)))
+
+                for name in names:
+                    report(CaseReports.make_case(name, TestResult.FAIL, 1000*(now - begin)))
+
                 self.log("freeing resources:")
 
-                for pos, resource in enumerate(self.resources[name]):
-                    allocation_id = (name, pos)
-                    if allocation_id not in preallocations:
-                        raise ValueError(f"missing {allocation_id} in {preallocations}")
-                    resource_identity_allocation = preallocations[allocation_id]
-                    self.log(f" - {allocation_id}={resource_identity_allocation[0]}:{resource_identity_allocation[1]}")
-                    self.allocated_resources = resource.deallocate(self.allocated_resources, resource_identity_allocation[1])
+                for name in names:
+                    self.deallocate(name, preallocations)
 
             self.log(f"done {len(self.done)}/{len(self.todo)} tasks.")
 
             #
             # 4. make reports visible to the interactive thread vis shared list
             #
-            with self.lock:
+            with self.condition:
                 self.log(f"reporting {len(reports)}.")
-                self.left -= len(reports)
                 self.reports.extend(reports)
+                self.condition.notify_all()
+
+        for task_id, (worker_id, begin, preallocations, names) in scheduled.items():
+            self.log(f"{task_id} cancelled in worker {worker_id}.")
 
         self.log("parallel run ended.")
 
+    def run_thread(self):
+        try:
+            self.thread_function()
+        finally:
+            # wake up the interactive thread even if the scheduling failed
+            with self.condition:
+                self.running = False
+                self.condition.notify_all()
+
     def batch_dirs(self):
-        rv = []
-        for i in self.cases:
-            rv.append(case_batch_dir_and_report_file(self.batches_dir, i)[0])
-        return rv
+        return list(self.task_batch_dirs)
 
     def has_next(self):
         with self.lock:
-            return (self.left > 0 or len(self.reports) > 0) and not self._abort
+            # the cases are reported before their batches finish, so the run
+            # continues until the scheduling thread has merged the last batch
+            return (len(self.reports) > 0 or self.running) and not self._abort
+
+    def join(self):
+        """
+        Waits for the scheduling thread to finish the remaining tasks
+        """
+        self.thread.join()
 
     def done_reports(self):
         with self.lock:
-            return self.reports
+            return list(self.reports)
 
     def next_report(self):
-        while True:
-            with self.lock:
-                if len(self.reports) > 0:
-                    rv = self.reports[0]
-                    self.reports = self.reports[1:]
-                    return rv
-            # todo, use semaphore instead of polling
-            time.sleep(0.01)
+        """
+        Blocks until the next report is available. Returns None, if
+        the run ended or was aborted before a report became available.
+        """
+        with self.condition:
+            while len(self.reports) == 0 and self.running and not self._abort:
+                self.condition.wait()
+            if len(self.reports) > 0:
+                return self.reports.popleft()
+            return None
 
     def __enter__(self):
-        import coverage
         self.finished = False
         self._log = open(self.log_path, "w")
 
-        self.pool = multiprocessing.get_context('spawn').Pool(self.process_count, initializer=coverage.process_startup)
+        if self.start_method == "fork" and threading.active_count() > 1:
+            import warnings
+            warnings.warn("forking parallel workers from a multi-threaded process may deadlock them. "
+                          "consider using 'forkserver' or 'spawn' start method")
+
+        # the workers must be started before the scheduling thread
+        # to keep the 'fork' start method safe. the exited workers are
+        # replaced from the scheduling thread, while the pool's reader
+        # thread only waits for the worker events
+        self.pool = WorkerPool(self.context,
+                               self.process_count,
+                               self.run_batch,
+                               self.on_event,
+                               initializer=init_worker,
+                               initargs=(self.setup,),
+                               finalizer=exit_worker)
         self.pool.__enter__()
 
-        self.thread = threading.Thread(target=self.thread_function)
+        self.running = True
+        self.thread = threading.Thread(target=self.run_thread)
         self.thread.start()
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        # it's important to wait the jobs for
+        # after the normal run, the scheduling thread ends, when the workers have
+        # finished their tasks. on errors, the pool terminates the workers running
+        # the aborted tasks, while the idle workers exit normally for
         # the coverage measurement to succeed
-        self._abort = True
+        if exc_type is not None:
+            self.abort()
         self.thread.join()
-        self.pool.close()
-
-        # for some reason, this will get stuck on keyboard interruptions
-        # yet, it is necessary for getting the coverage correctly
-        self.pool.join()
+        self.pool.__exit__(exc_type, exc_val, exc_tb)
+        if self.shared is not None:
+            self.shared.close()
         self._log.close()
 
 
@@ -398,8 +1071,10 @@ def parallel_run_tests(exp_dir,
     begin = time.time()
 
     reports = CaseReports.of_dir(out_dir)
+    history = DurationHistory.of_dir(out_dir)
 
     done, todo = reports.cases_to_done_and_todo(cases, config)
+    cached, todo = memoized_cases(tests, exp_dir, out_dir, todo, reports, config)
 
     prepare_batch_dir(out_dir)
 
@@ -409,15 +1084,21 @@ def parallel_run_tests(exp_dir,
                             todo,
                             config,
                             setup,
-                            reports)
+                            reports,
+                            history)
 
     fail_fast = config.get("fail_fast", False)
 
-    start_report(print)
+    estimate_ms = None
+    if runner.history_complete and sys.stdout.isatty():
+        estimate_ms = runner.estimate_ms()
+
+    start_report(print, estimate_ms)
+    report_cached_cases(print, cached)
 
     exit_code = 0
 
-    os.system(f"mkdir -p {out_dir}")
+    ensure_dir(out_dir)
     report_file = os.path.join(out_dir, "cases.ndjson")
 
     with open(report_file, "w") as report_f:
@@ -445,7 +1126,10 @@ def parallel_run_tests(exp_dir,
         with runner:
             try:
                 while runner.has_next():
-                    case_name, result, duration = runner.next_report()
+                    report = runner.next_report()
+                    if report is None:
+                        break
+                    case_name, result, duration = report
 
                     reviewed_result, request, ai_result = \
                         report_case(print,
@@ -474,6 +1158,12 @@ def parallel_run_tests(exp_dir,
                 for i in runner.todo - runner.done:
                     print(f"  {i}..interrupted")
 
+            except BaseException:
+                # stop scheduling the remaining cases, so that the error
+                # surfaces without waiting for the rest of the suite
+                runner.abort()
+                raise
+
             finally:
                 #
                 # 3.2 merge outputs from test. do this
@@ -481,6 +1171,9 @@ def parallel_run_tests(exp_dir,
                 #     testing from CTRL-C
                 #
 
+                # the scheduling thread may still merge the batch outputs
+                runner.join()
+
                 # add already processed, but not interacted reports
                 for case_name, result, duration in runner.done_reports():
                     report_case_begin(print,
@@ -497,33 +1190,9 @@ def parallel_run_tests(exp_dir,
                         result,
                         duration)
 
-                merged = {}
-                for batch_dir in runner.batch_dirs():
-                    if os.path.isdir(batch_dir):
-                        for j in os.listdir(batch_dir):
-                            if j.endswith(".txt"):
-                                lines = merged.get(j, [])
-                                lines.extend(
-                                    read_lines(batch_dir, j))
-                                merged[j] = lines
-
-                for name, lines in merged.items():
-                    if name != "cases.txt":
-                        write_lines(out_dir, name, lines)
-
-                # Merge DVC manifest updates from batch runs (only if using DVC storage)
-                storage_mode = config.get("storage.mode", "auto")
-                if storage_mode in ("dvc", "auto"):
-                    try:
-                        from booktest.snapshots.storage import DVCStorage, detect_storage_mode, StorageMode
-                        detected_mode = detect_storage_mode(config)
-                        if detected_mode == StorageMode.DVC:
-                            manifest_path = config.get("storage.dvc.manifest_path", "booktest.manifest.yaml")
-                            DVCStorage.merge_batch_manifests(manifest_path, runner.batch_dirs())
-                    except Exception as e:
-                        # Non-fatal: DVC may not be in use or merge may fail
-                        import warnings
-                        warnings.warn(f"Failed to merge DVC manifests: {e}")
+                # merge the outputs of the batches, which were not
+                # merged during the run, e.g. because of an abort
+                runner.merger.finish(runner.batch_dirs())
 
                 #
                 # 4. do test reporting & review
@@ -531,6 +1200,8 @@ def parallel_run_tests(exp_dir,
                 end = time.time()
                 took_ms = int((end-begin)*1000)
                 Metrics(took_ms).to_dir(out_dir)
+                history.update_all(reviewed).to_dir(out_dir)
+                trim_artifact_cache(config)
 
                 # AI reviews have already been written to cases.ndjson inline,
                 # so no need to do anything else here.
@@ -567,13 +1238,17 @@ def parallel_run_tests(exp_dir,
     return exit_code
 
 
-def run_tests(exp_dir,
-              out_dir,
-              tests,
-              cases: list,
-              config: dict,
-              cache,
-              setup: BookTestSetup):
+def sequential_run(exp_dir, out_dir, tests, cases, config, cache):
+    """
+    Creates the test run for the sequential runs. Returns the run, the duration history
+    and the list, where the run collects the case reports for the history.
+    """
+    history = DurationHistory.of_dir(out_dir)
+    reviewed = []
+
+    estimate_ms = None
+    if sys.stdout.isatty() and all(history.count(name) > 0 for name in cases):
+        estimate_ms = sum(history.ewma(name) for name in cases)
 
     run = TestRun(
         exp_dir,
@@ -582,11 +1257,29 @@ def run_tests(exp_dir,
         tests,
         cases,
         config,
-        cache)
+        cache,
+        case_listener=lambda name, result, duration: reviewed.append((name, result, duration)),
+        estimate_ms=estimate_ms)
+
+    return run, history, reviewed
+
+
+def run_tests(exp_dir,
+              out_dir,
+              tests,
+              cases: list,
+              config: dict,
+              cache,
+              setup: BookTestSetup):
+
+    run, history, reviewed = sequential_run(exp_dir, out_dir, tests, cases, config, cache)
 
     with setup.setup_teardown():
         rv = test_result_to_exit_code(run.run())
 
+    history.update_all(reviewed).to_dir(out_dir)
+    trim_artifact_cache(config)
+
     return rv
 
 async def run_tests_async(exp_dir,
@@ -597,17 +1290,13 @@ async def run_tests_async(exp_dir,
                           cache,
                           setup: BookTestSetup):
 
-    run = TestRun(
-        exp_dir,
-        out_dir,
-        out_dir,
-        tests,
-        cases,
-        config,
-        cache)
+    run, history, reviewed = sequential_run(exp_dir, out_dir, tests, cases, config, cache)
 
     with setup.setup_teardown():
         rv = await test_result_to_exit_code(run.run())
 
+    history.update_all(reviewed).to_dir(out_dir)
+    trim_artifact_cache(config)
+
     return rv
 
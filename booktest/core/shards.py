@@ -0,0 +1,170 @@
+import argparse
+import os
+import shutil
+
+from booktest.reporting.reports import CaseReports, DurationHistory, Metrics, read_lines, write_lines
+
+#
+# Splitting the test run across machines and merging the results
+#
+
+
+# files, which are merged case by case instead of being copied from the shards
+SHARD_BOOKKEEPING = {"cases.ndjson", "cases.txt", "metrics.json", DurationHistory.FILE_NAME, ".batches"}
+
+
+def parse_shard(value: str):
+    """
+    Parses the 'i/n' shard specification into (i, n), where i is in 1..n
+    """
+    try:
+        i, n = value.split("/")
+        i, n = int(i), int(n)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"shard '{value}' is not in 'i/n' format")
+    if n < 1 or i < 1 or i > n:
+        raise argparse.ArgumentTypeError(f"shard '{value}' must satisfy 1 <= i <= n")
+    return i, n
+
+
+def case_chains(tests, cases):
+    """
+    Groups the cases into chains, which are connected via dependencies.
+    The chains are returned in the order of their first case.
+    """
+    parent = {name: name for name in cases}
+
+    def root(name):
+        while parent[name] != name:
+            parent[name] = parent[parent[name]]
+            name = parent[name]
+        return name
+
+    for name in cases:
+        for dependency in tests.method_dependencies(tests.get_case(name), cases):
+            if dependency in parent:
+                parent[root(dependency)] = root(name)
+
+    chains = {}
+    for name in cases:
+        chains.setdefault(root(name), []).append(name)
+    return list(chains.values())
+
+
+def shard_cases(tests, cases, shard: int, shards: int, durations: dict):
+    """
+    Returns the cases of the shard:th shard out of shards.
+
+    Cases, which depend on each other, are kept in the same shard. The chains
+    are assigned to the shards longest first, always to the shard with the least
+    work, so that the shards take roughly the same time. The partition
+    is deterministic, as long as every shard sees the same durations.
+    """
+    chains = case_chains(tests, cases)
+    order = {name: i for i, name in enumerate(cases)}
+
+    def chain_ms(chain):
+        return sum(durations.get(name, 1) for name in chain)
+
+    chains.sort(key=lambda chain: (-chain_ms(chain), order[chain[0]]))
+
+    loads = [0] * shards
+    selected = set()
+    for chain in chains:
+        target = min(range(shards), key=lambda i: (loads[i], i))
+        loads[target] += chain_ms(chain)
+        if target == shard - 1:
+            selected.update(chain)
+
+    return [name for name in cases if name in selected]
+
+
+def expected_durations(out_dir):
+    """
+    Returns the expected case durations based on the duration history
+    and the last run
+    """
+    rv = {}
+    for name, _, duration in CaseReports.of_dir(out_dir).cases:
+        rv[name] = duration
+    rv.update(DurationHistory.of_dir(out_dir).durations())
+    return rv
+
+
+def copy_case_files(shard_dir, out_dir):
+    for root, dirs, files in os.walk(shard_dir):
+        relative = os.path.relpath(root, shard_dir)
+        if relative == ".":
+            dirs[:] = [i for i in dirs if i not in SHARD_BOOKKEEPING]
+            # the top level output files are concatenated instead
+            files = [i for i in files if i not in SHARD_BOOKKEEPING and not i.endswith(".txt")]
+        target = os.path.join(out_dir, relative)
+        os.makedirs(target, exist_ok=True)
+        for name in files:
+            shutil.copy2(os.path.join(root, name), os.path.join(target, name))
+
+
+def merge_out_dirs(config, out_dir, shard_dirs):
+    """
+    Merges the .out directories of several shards into out_dir, so that
+    the combined results can be reviewed as a single run.
+
+    Returns the merged case reports.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+
+    cases = {}
+    ai_reviews = {}
+    history = DurationHistory()
+    outputs = {}
+    took_ms = 0
+    batch_dirs = []
+
+    for shard_dir in shard_dirs:
+        if not os.path.isdir(shard_dir):
+            raise ValueError(f"shard output directory {shard_dir} does not exist")
+        if os.path.realpath(shard_dir) == os.path.realpath(out_dir):
+            raise ValueError(f"shard output directory {shard_dir} must differ from {out_dir}")
+
+        reports = CaseReports.of_dir(shard_dir)
+        for case in reports.cases:
+            cases[case[0]] = case
+            ai_review = reports.get_ai_review(case[0])
+            if ai_review is not None:
+                ai_reviews[case[0]] = ai_review
+
+        for name, stats in DurationHistory.of_dir(shard_dir).cases.items():
+            if stats["count"] >= history.count(name):
+                history.cases[name] = stats
+
+        if os.path.exists(os.path.join(shard_dir, "metrics.json")):
+            # the shards run in parallel, so the slowest shard determines the duration
+            took_ms = max(took_ms, Metrics.of_dir(shard_dir).took_ms)
+
+        for name in sorted(os.listdir(shard_dir)):
+            path = os.path.join(shard_dir, name)
+            if name.endswith(".txt") and name not in SHARD_BOOKKEEPING and os.path.isfile(path):
+                outputs.setdefault(name, []).extend(read_lines(shard_dir, name))
+
+        batches_dir = os.path.join(shard_dir, ".batches")
+        if os.path.isdir(batches_dir):
+            batch_dirs.extend(os.path.join(batches_dir, i) for i in sorted(os.listdir(batches_dir)))
+
+        copy_case_files(shard_dir, out_dir)
+
+    merged = CaseReports(list(cases.values()), ai_reviews)
+    merged.to_dir(out_dir)
+    history.to_dir(out_dir)
+    Metrics(took_ms).to_dir(out_dir)
+    for name, lines in outputs.items():
+        write_lines(out_dir, name, lines)
+
+    # Merge DVC manifest updates from the shards' batch runs (only if using DVC storage)
+    storage_mode = config.get("storage.mode", "auto")
+    if storage_mode in ("dvc", "auto") and len(batch_dirs) > 0:
+        from booktest.snapshots.storage import DVCStorage, detect_storage_mode, StorageMode
+        if detect_storage_mode(config) == StorageMode.DVC:
+            manifest_path = config.get("storage.dvc.manifest_path", "booktest.manifest.yaml")
+            DVCStorage.merge_batch_manifests(manifest_path, batch_dirs)
+
+    return merged
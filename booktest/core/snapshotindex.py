@@ -0,0 +1,101 @@
+from bisect import bisect_left
+
+from booktest.llm.tokenizer import tokenize
+from booktest.utils.utils import open_file_or_resource
+
+#
+# Random access to the snapshot file lines
+#
+
+
+class SnapshotIndex:
+    """
+    The snapshot file lines read into memory with a single read. The line
+    numbers start from 1, like in the snapshot reader.
+
+    The numbers of the lines with the same content, and of the lines with
+    the same sought prefix, are indexed on the first seek, so that the
+    later seeks are binary searches instead of file scans. The lines are
+    tokenized once, even if the reader returns to them.
+    """
+
+    def __init__(self, lines: list):
+        self.lines = lines
+        # line number - 1 -> the tokens of the line
+        self.line_tokens = [None] * len(lines)
+        # line -> the sorted numbers of the lines with the content
+        self.line_numbers = None
+        # prefix -> the sorted numbers of the lines starting with the prefix
+        self.prefix_numbers = {}
+
+    @staticmethod
+    def of_file(file_name: str, resource_snapshots: bool = False):
+        with open_file_or_resource(file_name, resource_snapshots) as f:
+            text = f.read()
+        lines = text.split("\n")
+        if len(lines[-1]) == 0:
+            # the file ends with a line end
+            lines.pop()
+        return SnapshotIndex(lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def line(self, number: int):
+        """
+        Returns the line or None, if the number is past the last line
+        """
+        if 1 <= number <= len(self.lines):
+            return self.lines[number - 1]
+        return None
+
+    def tokens(self, number: int):
+        """
+        Returns the tokens of the line
+        """
+        rv = self.line_tokens[number - 1]
+        if rv is None:
+            rv = tokenize(self.lines[number - 1])
+            self.line_tokens[number - 1] = rv
+        return rv
+
+    @staticmethod
+    def first(numbers: list, begin: int, end: int):
+        at = bisect_left(numbers, begin)
+        if at < len(numbers) and numbers[at] < end:
+            return numbers[at]
+        return None
+
+    def find_line(self, line: str, begin: int, end: int):
+        """
+        Returns the number of the first line in [begin, end) equal to
+        the line or None
+        """
+        if self.line_numbers is None:
+            self.line_numbers = {}
+            for number, content in enumerate(self.lines, 1):
+                self.line_numbers.setdefault(content, []).append(number)
+        return self.first(self.line_numbers.get(line, []), begin, end)
+
+    def find_prefix(self, prefix: str, begin: int, end: int):
+        """
+        Returns the number of the first line in [begin, end) starting with
+        the prefix or None
+        """
+        numbers = self.prefix_numbers.get(prefix)
+        if numbers is None:
+            numbers = [number
+                       for number, content in enumerate(self.lines, 1)
+                       if content.startswith(prefix)]
+            self.prefix_numbers[prefix] = numbers
+        return self.first(numbers, begin, end)
+
+    def find(self, is_line_ok, begin: int, end: int):
+        """
+        Returns the number of the first line in [begin, end) accepted
+        by is_line_ok() or None
+        """
+        for number in range(max(begin, 1), min(end, len(self.lines) + 1)):
+            if is_line_ok(self.lines[number - 1]):
+                return number
+        return None
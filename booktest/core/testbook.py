@@ -79,16 +79,16 @@ class TestBook(metaclass=OrderedClass):
                 full_path = "::".join(parts)
         cases = []
 
+        members = dict(inspect.getmembers(self))
         for name in self.member_names:
-            if name.startswith("test_"):
-                for m in inspect.getmembers(self):
-                    if m[0] == name:
-                        unbound = m[1].__func__
-                        if not hasattr(unbound, "_self_type"):
-                            unbound._self_type = type(self)
-                        # Just use method name - TestSuite will prepend class path
-                        # Method name in pytest format: "test_bar" (not cleaned)
-                        cases.append([name, m[1]])
+            if name.startswith("test_") and name in members:
+                method = members[name]
+                unbound = method.__func__
+                if not hasattr(unbound, "_self_type"):
+                    unbound._self_type = type(self)
+                # Just use method name - TestSuite will prepend class path
+                # Method name in pytest format: "test_bar" (not cleaned)
+                cases.append([name, method])
 
         self.test_suite = TestSuite(full_path, cases)
         self.cases = self.test_suite.cases
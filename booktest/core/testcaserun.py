@@ -10,16 +10,28 @@ import sys
 import json
 
 from booktest.reporting.review import report_case_begin, case_review, report_case_result, maybe_print_logs
-from booktest.llm.tokenizer import TestTokenizer, BufferIterator
+from booktest.llm.tokenizer import tokenize
+from booktest.core.snapshotindex import SnapshotIndex
 from booktest.reporting.reports import TestResult, TwoDimensionalTestResult, SuccessState, SnapshotState
-from booktest.utils.utils import file_or_resource_exists, open_file_or_resource
+from booktest.utils.utils import file_or_resource_exists, ensure_dir
 from booktest.config.naming import to_filesystem_path, from_filesystem_path
 from booktest.reporting.output import OutputWriter
-from booktest.reporting.colors import yellow, red, gray, cyan, dim_gray
+from booktest.reporting.markers import MARKERS_SUFFIX, marker_record, text_record, render_line
+from booktest.config.config import DEFAULT_OUTPUT_BUFFER_KB
 
 
 
-DIFF_POSITION = 60
+# the test case runs, which have their output files open
+OPEN_CASE_RUNS = set()
+
+
+def flush_case_outputs():
+    """
+    Flushes the buffered outputs of the running test cases, so that the partial
+    outputs are left for debugging, when the process is terminated
+    """
+    for case_run in list(OPEN_CASE_RUNS):
+        case_run.flush()
 
 
 class TestCaseRun(OutputWriter):
@@ -50,6 +62,11 @@ class TestCaseRun(OutputWriter):
         self.verbose = config.get("verbose", False)
         self.resource_snapshots = config.get("resource_snapshots", False)
         self.point_error_pos = config.get("point_error_pos", False)
+        # with live tail, the output file is flushed after every line, so that
+        # it can be followed while the test runs
+        self.live_tail = config.get("live_tail", False)
+        self.output_buffer_size = \
+            int(config.get("output_buffer_kb", DEFAULT_OUTPUT_BUFFER_KB)) * 1024
         self.config = config
 
         if output is None:
@@ -58,18 +75,20 @@ class TestCaseRun(OutputWriter):
 
         # snapshot file (todo: change expectation jargon into snapshot jargon)
         self.exp_base_dir = path.join(run.exp_dir, relative_dir)
-        os.system(f"mkdir -p {self.exp_base_dir}")
+        ensure_dir(self.exp_base_dir)
         self.exp_file_name = path.join(self.exp_base_dir, name + ".md")
         self.exp_dir_name = path.join(self.exp_base_dir, name)
         self.exp_file_exists = file_or_resource_exists(self.exp_file_name, self.resource_snapshots)
         self.exp = None
         self.exp_line = None
         self.exp_line_number = None
+        # the tokens of the snapshot line and the position of the next token
         self.exp_tokens = None
+        self.exp_token_index = 0
 
         # prepare output
         self.out_base_dir = path.join(run.out_dir, relative_dir)
-        os.system(f"mkdir -p {self.out_base_dir}")
+        ensure_dir(self.out_base_dir)
         self.out_file_name = path.join(self.out_base_dir, name + ".md")
         self.out_dir_name = path.join(self.out_base_dir, name)
         self.out_tmp_dir_name = path.join(self.out_base_dir, name + ".tmp")
@@ -78,6 +97,7 @@ class TestCaseRun(OutputWriter):
 
         # prepare reporting
         self.rep_file_name = path.join(self.out_base_dir, name + ".txt")
+        self.markers_file_name = path.join(self.out_base_dir, name + MARKERS_SUFFIX)
         self.rep = None
 
         # prepare std error output
@@ -140,15 +160,18 @@ class TestCaseRun(OutputWriter):
 
     def report(self, *args, sep=' ', end='\n'):
         """ writes a report line in report log and possibly in standard output  """
-        print(*args, sep=sep, end=end, file=self.rep)
+        text = sep.join(str(i) for i in args) + end
+        self.rep.write(json.dumps(text_record(self.line_number, text)))
+        self.rep.write("\n")
         if self.verbose:
             self.print(*args, sep=sep, end=end)
 
     def reset_exp_reader(self):
         """ Resets the reader that reads expectation / snapshot file """
-        self.close_exp_reader()
         if self.exp_file_exists:
-            self.exp = open_file_or_resource(self.exp_file_name, self.resource_snapshots)
+            # the snapshot is read only once per test case
+            if self.exp is None:
+                self.exp = SnapshotIndex.of_file(self.exp_file_name, self.resource_snapshots)
         else:
             self.exp = None
         self.exp_line = None
@@ -487,15 +510,18 @@ class TestCaseRun(OutputWriter):
         :return:
         """
 
-        if self.exp is not None:
-            self.exp.close()
-            self.exp = None
+        self.exp = None
 
     def open(self):
         # open files
-        self.out = open(self.out_file_name, "w")
-        self.rep = open(self.rep_file_name, "w")
+        buffering = -1 if self.live_tail else self.output_buffer_size
+        self.out = open(self.out_file_name, "w", buffering=buffering)
+        self.rep = open(self.markers_file_name, "w", buffering=buffering)
+        # the report is rendered from the output and the markers, when needed
+        if path.exists(self.rep_file_name):
+            os.remove(self.rep_file_name)
         self.err = open(self.err_file_name, "w")
+        OPEN_CASE_RUNS.add(self)
         self.log = logging.StreamHandler(self.err)
 
         # swap logger
@@ -539,24 +565,36 @@ class TestCaseRun(OutputWriter):
         self.out = None
         self.rep.close()
         self.rep = None
+        OPEN_CASE_RUNS.discard(self)
+
+    def flush(self):
+        """
+        Writes the buffered output, report and log lines into the files
+        """
+        for file in (self.out, self.rep, self.err):
+            if file is not None and not file.closed:
+                file.flush()
+
+    def goto_exp_line(self, line_number):
+        """
+        Moves the snapshot reader cursor to the line number. The line
+        after the last line marks the end of the file.
+        """
+        self.exp_line_number = line_number
+        self.exp_line = self.exp.line(line_number)
+        if self.exp_line is None:
+            self.exp_tokens = None
+        else:
+            self.exp_tokens = self.exp.tokens(line_number)
+        self.exp_token_index = 0
 
     def next_exp_line(self):
         """
         Moves snapshot reader cursor to the next snapshot file line
         """
         if self.exp_file_exists:
-            if self.exp:
-                line = self.exp.readline()
-                if len(line) == 0:
-                    self.close_exp_reader()
-                    self.exp_line = None
-                    self.exp_tokens = None
-                    self.exp_line_number += 1
-                else:
-                    self.exp_line_number += 1
-                    self.exp_line = line[0:len(line)-1]
-                    self.exp_tokens =\
-                        BufferIterator(TestTokenizer(self.exp_line))
+            if self.exp is not None and self.exp_line_number <= len(self.exp):
+                self.goto_exp_line(self.exp_line_number + 1)
             elif self.last_checked:
                 self.exp_line = None
                 self.exp_tokens = None
@@ -569,13 +607,47 @@ class TestCaseRun(OutputWriter):
         file reader is reset.
         """
         if self.exp_file_exists:
-
+            end_number = len(self.exp) + 1
             if line_number < self.exp_line_number:
-                self.reset_exp_reader()
+                self.goto_exp_line(max(1, min(line_number, end_number)))
+            elif (self.exp_line is not None
+                  and self.exp_line_number < line_number):
+                self.goto_exp_line(min(line_number, end_number))
+
+    def seek_with(self, find, begin=0, end=sys.maxsize):
+        """
+        Moves the snapshot reader cursor to the next line found with
+        find(begin, end), which returns the first matching line number
+        in the [begin, end) range or None.
+
+        The seek starts from the cursor position and it ends on the 'end'
+        line. If the sought line is not found before the end of the file,
+        the seek restarts from the 'begin' line and ends at the original
+        cursor position.
+        """
+        if self.exp_file_exists:
+            at_line_number = self.exp_line_number
+            end_number = len(self.exp) + 1
 
-            while (self.exp_line is not None
-                   and self.exp_line_number < line_number):
-                self.next_exp_line()
+            if self.exp_line is not None:
+                found = find(at_line_number, min(end, end_number))
+                if found is None and end < end_number:
+                    # the seek stops at the end line, if it's before the file end
+                    found = max(at_line_number, end)
+                if found is not None:
+                    if found != at_line_number:
+                        self.goto_exp_line(found)
+                    return
+
+            # if anchor was not found, let's look for previous location
+            # or alternatively: let's return to the original location
+            self.jump(begin)
+            begin_number = self.exp_line_number
+            found = find(begin_number, min(at_line_number, end_number))
+            if found is None:
+                found = max(begin_number, min(at_line_number, end_number))
+            if found != self.exp_line_number:
+                self.goto_exp_line(found)
 
     def seek(self, is_line_ok, begin=0, end=sys.maxsize):
         """
@@ -587,27 +659,11 @@ class TestCaseRun(OutputWriter):
         but it may restart seeking from the beginning of the file,
         if the sought line is not found.
 
-        NOTE: this is really an O(N) scanning operation.
-              it may restart at the beginning of file and
-              it typically reads the the entire file
-              on seek failures.
+        NOTE: this scans the snapshot lines in memory. seek_line() and
+              seek_prefix() use the line index instead.
         """
-        if self.exp_file_exists:
-            at_line_number = self.exp_line_number
-
-            # scan, until the anchor is found
-            while (self.exp_line is not None
-                   and not is_line_ok(self.exp_line)
-                   and self.exp_line_number < end):
-                self.next_exp_line()
-            if self.exp_line is None:
-                # if anchor was not found, let's look for previous location
-                # or alternatively: let's return to the original location
-                self.jump(begin)
-                while (self.exp_line is not None
-                       and not is_line_ok(self.exp_line)
-                       and self.exp_line_number < at_line_number):
-                    self.next_exp_line()
+        return self.seek_with(
+            lambda b, e: self.exp.find(is_line_ok, b, e), begin, end)
 
     def seek_line(self, anchor, begin=0, end=sys.maxsize):
         """
@@ -617,12 +673,11 @@ class TestCaseRun(OutputWriter):
         but it may restart seeking from the beginning of the file,
         if the sought line is not found.
 
-        NOTE: this is really an O(N) scanning operation.
-              it may restart at the beginning of file and
-              it typically reads the the entire file
-              on seek failures.
+        The lines are looked up from an index, so the seek doesn't
+        scan the file.
         """
-        return self.seek(lambda x: x == anchor, begin, end)
+        return self.seek_with(
+            lambda b, e: self.exp.find_line(anchor, b, e), begin, end)
 
     def seek_prefix(self, prefix):
         """
@@ -632,12 +687,11 @@ class TestCaseRun(OutputWriter):
         but it may restart seeking from the beginning of the file,
         if the sought line is not found.
 
-        NOTE: this is really an O(N) scanning operation.
-              it may restart at the beginning of file and
-              it typically reads the the entire file
-              on seek failures.
+        The lines with the prefix are indexed on the first seek of
+        the prefix, so that the later seeks don't scan the file.
         """
-        return self.seek(lambda x: x.startswith(prefix))
+        return self.seek_with(
+            lambda b, e: self.exp.find_prefix(prefix, b, e))
 
     def write_line(self):
         """
@@ -646,7 +700,8 @@ class TestCaseRun(OutputWriter):
         """
         self.out.write(self.out_line)
         self.out.write('\n')
-        self.out.flush()
+        if self.live_tail:
+            self.out.flush()
         self.out_line = ""
         self.next_exp_line()
         self.line_number = self.line_number + 1
@@ -693,65 +748,19 @@ class TestCaseRun(OutputWriter):
                 self.info_diffs += 1
                 pos = 0
 
-            # Choose coloring approach based on markers
-
-            # Pad the uncolored line to 60 chars, then apply coloring
-            # We need to pad before coloring to get correct alignment
-            if len(self.out_line) < DIFF_POSITION:
-                padded_line = self.out_line + " " * (DIFF_POSITION - len(self.out_line))
-                diff_separator = f" {dim_gray('≠')} "
-            else:
-                padded_line = self.out_line
-                diff_separator = f"\n{dim_gray('≠')} "
-
-            if has_token_markers and len(self.line_markers) > 0:
-                # Use token-level coloring
-                try:
-                    # Color the symbol itself
-                    if has_error:
-                        colored_symbol = red(symbol)
-                    elif has_diff:
-                        colored_symbol = yellow(symbol)
-                    else:
-                        colored_symbol = cyan(symbol)
-                    # Now colorize the padded content
-                    colored_padded = self._colorize_line_with_markers(
-                        padded_line, self.line_markers,
-                        has_error, has_diff, has_info
-                    )
-                    left_side = f"{colored_symbol} {colored_padded}"
-                except Exception as e:
-                    # Fallback to line-level coloring on error
-                    import traceback
-                    import sys
-                    print(f"Warning: token coloring failed: {e}", file=sys.stderr)
-                    traceback.print_exc(file=sys.stderr)
-                    if has_error:
-                        color_fn = red
-                    elif has_diff:
-                        color_fn = yellow
-                    else:
-                        color_fn = cyan
-                    left_side = color_fn(f"{symbol} {padded_line}")
-            else:
-                # Use line-level coloring
-                if has_error:
-                    color_fn = red
-                elif has_diff:
-                    color_fn = yellow
-                else:
-                    color_fn = cyan
-                left_side = color_fn(f"{symbol} {padded_line}")
+            # only the markers are recorded. the colored report is rendered,
+            # when it is shown
+            record = marker_record(self.line_number,
+                                   symbol,
+                                   self.line_markers,
+                                   self.exp_line,
+                                   pos if self.point_error_pos else None)
+            self.rep.write(json.dumps(record))
+            self.rep.write("\n")
 
-            if self.exp_line is not None:
-                # Colorize expected line with differing tokens highlighted
-                right_side = self._colorize_expected_line(self.exp_line, self.line_markers)
-            else:
-                right_side = gray("EOF")
-            self.report(f"{left_side}{diff_separator}{right_side}")
-
-            if self.point_error_pos:
-                self.report("  " + (" " * pos) + "^")
+            if self.verbose:
+                for line in render_line(self.out_line, record):
+                    self.print(line)
 
             self.write_line()
 
@@ -760,171 +769,17 @@ class TestCaseRun(OutputWriter):
             self.line_error = None
             self.line_diff = None
         else:
-            self.report(f"  {self.out_line}")
+            if self.verbose:
+                self.print(f"  {self.out_line}")
             self.write_line()
 
-    def _colorize_line_with_markers(self, line, markers, has_error, has_diff, has_info):
-        """
-        Colorize a line using markers with priority handling.
-
-        There is no separate line-level vs token-level concept. All coloring is done
-        through markers. The methods info(), diff(), and fail() create markers from
-        (0, MAX_SIZE, type) that cover the entire line. Token-specific markers override
-        these when they have higher priority.
-
-        Priority order: fail > diff > info > none
-
-        Args:
-            line: The line text to colorize
-            markers: List of (start_pos, end_pos, marker_type) tuples
-            has_error: True if line has any error markers (legacy, for stats)
-            has_diff: True if line has any diff markers (legacy, for stats)
-            has_info: True if line has any info markers (legacy, for stats)
-
-        Returns:
-            Colored string with ANSI color codes
-        """
-        from booktest.reporting.colors import yellow, red, cyan
-
-        if not markers:
-            # No markers at all - line is uncolored
-            return line
-
-        # Priority values for marker types
-        marker_priorities = {'info': 1, 'diff': 2, 'fail': 3}
-
-        # Filter and normalize markers
-        valid_markers = []
-        for start, end, mtype in markers:
-            if 0 <= start:
-                # Clamp end to line length (handles MAX_SIZE markers)
-                end = min(end, len(line))
-                if start < end:  # Only keep markers with non-zero width
-                    valid_markers.append((start, end, mtype))
-
-        if not valid_markers:
-            return line
-
-        # Build position-to-marker map, resolving conflicts by priority
-        position_marker = {}  # Map each position to its highest-priority marker
-        for start_pos, end_pos, marker_type in valid_markers:
-            priority = marker_priorities.get(marker_type, 0)
-            for pos in range(start_pos, end_pos):
-                existing_priority = marker_priorities.get(position_marker.get(pos), 0)
-                if priority > existing_priority:
-                    position_marker[pos] = marker_type
-
-        # Build colored line by scanning positions
-        result = ""
-        current_marker = None
-        current_start = 0
-
-        for pos in range(len(line)):
-            marker_at_pos = position_marker.get(pos)
-
-            if marker_at_pos != current_marker:
-                # Flush previous segment
-                if current_start < pos:
-                    segment = line[current_start:pos]
-                    # Apply color based on marker type
-                    if current_marker == 'fail':
-                        result += red(segment)
-                    elif current_marker == 'diff':
-                        result += yellow(segment)
-                    elif current_marker == 'info':
-                        result += cyan(segment)
-                    else:
-                        result += segment
-
-                current_marker = marker_at_pos
-                current_start = pos
-
-        # Flush final segment
-        if current_start < len(line):
-            segment = line[current_start:len(line)]
-            if current_marker == 'fail':
-                result += red(segment)
-            elif current_marker == 'diff':
-                result += yellow(segment)
-            elif current_marker == 'info':
-                result += cyan(segment)
-            else:
-                result += segment
-
-        return result
-
-    def _colorize_expected_line(self, exp_line, markers):
-        """
-        Colorize the expected line by highlighting differing tokens.
-
-        The base text is shown in dim gray (more subtle than regular gray), while tokens
-        that differ from the new output are shown in regular gray for contrast.
-
-        Args:
-            exp_line: The expected line text
-            markers: List of (start_pos, end_pos, marker_type) tuples from the output line
-
-        Returns:
-            Colored string with differing tokens highlighted
-        """
-        from booktest.reporting.colors import dim_gray, gray
-        from booktest.llm.tokenizer import TestTokenizer
-
-        if not markers or not exp_line:
-            return dim_gray(exp_line)
-
-        # Tokenize both lines to find corresponding positions
-        out_tokens = list(TestTokenizer(self.out_line))
-        exp_tokens = list(TestTokenizer(exp_line))
-
-        # Build list of token positions in expected line that differ
-        differing_positions = set()
-        out_pos = 0
-        exp_pos = 0
-
-        for i, out_token in enumerate(out_tokens):
-            # Check if this output token has a marker
-            has_marker = any(start <= out_pos < end for start, end, _ in markers)
-
-            if i < len(exp_tokens):
-                exp_token = exp_tokens[i]
-                if has_marker and out_token != exp_token:
-                    # Mark this position in expected line as differing
-                    differing_positions.add((exp_pos, exp_pos + len(exp_token)))
-                exp_pos += len(exp_token)
-
-            out_pos += len(out_token)
-
-        # Build the colored expected line
-        if not differing_positions:
-            return dim_gray(exp_line)
-
-        result = ""
-        last_pos = 0
-        sorted_positions = sorted(differing_positions)
-
-        for start, end in sorted_positions:
-            # Add dim gray text before this differing token
-            if start > last_pos:
-                result += dim_gray(exp_line[last_pos:start])
-
-            # Highlight the differing token in regular gray for contrast
-            result += gray(exp_line[start:end])
-            last_pos = end
-
-        # Add remaining dim gray text
-        if last_pos < len(exp_line):
-            result += dim_gray(exp_line[last_pos:])
-
-        return result
-
     def head_exp_token(self):
         """
         Returns the next token in the snapshot file without moving snapshot file cursor
         """
         if self.exp_tokens is not None:
-            if self.exp_tokens.has_next():
-                return self.exp_tokens.head
+            if self.exp_token_index < len(self.exp_tokens):
+                return self.exp_tokens[self.exp_token_index]
             else:
                 return '\n'
         else:
@@ -936,8 +791,9 @@ class TestCaseRun(OutputWriter):
         cursor into the next token.
         """
         if self.exp_tokens is not None:
-            if self.exp_tokens.has_next():
-                return next(self.exp_tokens)
+            if self.exp_token_index < len(self.exp_tokens):
+                self.exp_token_index += 1
+                return self.exp_tokens[self.exp_token_index - 1]
             else:
                 return '\n'
         else:
@@ -995,6 +851,35 @@ class TestCaseRun(OutputWriter):
         self.feed_token(token, info_check=True)
         return self
 
+    def feed_text(self, text, check=False, info_check=False):
+        """
+        Feeds a piece of text into the test stream with optional comparison.
+
+        The lines of the text, which match the snapshot, or which are not
+        compared, are appended into the output line in one step. The text is
+        compared and marked token by token only, when it differs from the
+        snapshot.
+        """
+        for i, part in enumerate(text.split("\n")):
+            if i > 0:
+                self.feed_token("\n", check, info_check)
+            if len(part) == 0:
+                continue
+            tokens = tokenize(part)
+            compared = self.exp_file_exists and (check or info_check)
+            end = self.exp_token_index + len(tokens)
+            matches = self.exp_tokens is not None and self.exp_tokens[self.exp_token_index:end] == tokens
+            if compared and not matches:
+                for token in tokens:
+                    self.feed_token(token, check, info_check)
+            else:
+                self.out_line += part
+                if self.exp_tokens is not None:
+                    self.exp_token_index = \
+                        min(self.exp_token_index + len(tokens), len(self.exp_tokens))
+                self.last_checked = check or info_check
+        return self
+
     def test_feed(self, text):
         """
         Feeds a piece text into the test stream. The text tokenized and feed
@@ -1003,10 +888,7 @@ class TestCaseRun(OutputWriter):
         NOTE: The token content IS COMPARED to snapshot content for differences
         that are reported.
         """
-        tokens = TestTokenizer(str(text))
-        for t in tokens:
-            self.test_feed_token(t)
-        return self
+        return self.feed_text(str(text), check=True)
 
     def feed(self, text):
         """
@@ -1016,10 +898,7 @@ class TestCaseRun(OutputWriter):
         NOTE: The token content IS NOT COMPARED to snapshot content, and differences
         are ignored
         """
-        tokens = TestTokenizer(text)
-        for t in tokens:
-            self.feed_token(t)
-        return self
+        return self.feed_text(text)
 
     def info_feed(self, text):
         """
@@ -1029,10 +908,7 @@ class TestCaseRun(OutputWriter):
 
         Use this for diagnostic output that should be tracked but not cause failures.
         """
-        tokens = TestTokenizer(str(text))
-        for t in tokens:
-            self.info_feed_token(t)
-        return self
+        return self.feed_text(str(text), info_check=True)
 
     def fail_feed_token(self, token):
         """
@@ -1054,8 +930,7 @@ class TestCaseRun(OutputWriter):
         Feeds text into the stream and marks all tokens as failed (red).
         Use this to write error messages or failed output.
         """
-        tokens = TestTokenizer(str(text))
-        for t in tokens:
+        for t in tokenize(str(text)):
             self.fail_feed_token(t)
         return self
 
@@ -1,22 +1,48 @@
 import asyncio
+import functools
 import inspect
 import os.path as path
 import os
 import time
 import traceback
-import pickle
 
 from booktest.utils.coroutines import maybe_async_call
+from booktest.utils.utils import ensure_dir
 from booktest.dependencies.dependencies import remove_decoration, get_decorated_attr
+from booktest.dependencies.codecs import read_result
+from booktest.dependencies.cache import MemoryCache
+from booktest.dependencies.shared import attach_result
+from booktest.dependencies.writer import ResultWriter
+from booktest.dependencies.lifetimes import ResultLifetimes, is_ephemeral
 from booktest.core.testcaserun import TestCaseRun
 from booktest.reporting.reports import TestResult, CaseReports, UserRequest, Metrics
-from booktest.reporting.review import end_report, create_index, start_report
+from booktest.reporting.review import end_report, create_index, start_report, report_cached_cases, \
+    report_case_begin, report_case_result
+from booktest.config.naming import to_filesystem_path
+from booktest.core.fingerprints import Fingerprints, is_memoized
+from booktest.core.artifacts import artifact_cache
+from booktest.config.config import DEFAULT_RESULT_WRITE_QUEUE
+from booktest.reporting.markers import MARKERS_SUFFIX
 
 
 #
 # Test running
 #
 
+def write_skipped_case(out_dir, case_name, failed_dependencies):
+    """
+    Writes the case report explaining, why the case was not run
+    """
+    file_path = path.join(out_dir, to_filesystem_path(case_name) + ".txt")
+    ensure_dir(path.dirname(file_path))
+    with open(file_path, "w") as f:
+        f.write(f"skipped, because {', '.join(failed_dependencies)} did not pass\n")
+    # the markers of an earlier run would replace the report
+    markers_path = path.join(out_dir, to_filesystem_path(case_name) + MARKERS_SUFFIX)
+    if path.exists(markers_path):
+        os.remove(markers_path)
+
+
 def method_identity(method):
     self = get_decorated_attr(method, "__self__")
     func = get_decorated_attr(method, "__func__")
@@ -48,7 +74,11 @@ class TestRun:
                  output=None,
                  allocations=None,
                  preallocations=None,
-                 batch_dir=None):
+                 batch_dir=None,
+                 case_listener=None,
+                 estimate_ms=None,
+                 shared_results=None,
+                 release_results=True):
         self.exp_dir = exp_dir
         self.report_dir = report_dir
         self.out_dir = out_dir
@@ -67,35 +97,107 @@ class TestRun:
             preallocations = {}
         self.preallocations = preallocations
         self.batch_dir = batch_dir  # For parallel runs to avoid manifest race conditions
+        # called with (case_name, result, duration) after each finished case
+        self.case_listener = case_listener
+        # expected duration of the run, which is shown to the user
+        self.estimate_ms = estimate_ms
+        # result path -> (shared memory segment name, size) for the parallel workers
+        if shared_results is None:
+            shared_results = {}
+        self.shared_results = shared_results
+        # the result fingerprints are stored for the memoization of the later runs
+        self.fingerprints = Fingerprints(tests, exp_dir, artifact_cache(config)) if is_memoized(config) else None
+        # the results are written in the background, while the next cases run
+        self.writer = ResultWriter(int(config.get("result_write_queue", DEFAULT_RESULT_WRITE_QUEUE)),
+                                   config.get("result_compression"))
+        # the results are released after their last dependent. the parallel
+        # runner releases the results of the workers instead
+        self.release_results = release_results
+        self.lifetimes = None
 
     def get_test_result(self, case, method):
-        for t in self.tests.cases:
-            # a bit hacky way for figuring out the dependencies
-            if match_method(method, t[1]):
-                bin_path = self.tests.test_result_path(self.out_dir, t[0])
-                if bin_path not in self.cache:
-                    if path.exists(bin_path):
-                        with open(bin_path, 'rb') as file:
-                            rv = pickle.load(file)
-                            self.cache[bin_path] = rv
-                    else:
-                        raise Exception(
-                            f"case {case.name} dependency {t[0]}" +
-                            f" missing in '{bin_path}'")
-
+        # a bit hacky way for figuring out the dependencies
+        name = self.tests.case_by_method(method)
+        if name is not None:
+            bin_path = self.tests.test_result_path(self.out_dir, name)
+            if bin_path in self.cache:
                 return True, self.cache[bin_path]
 
+            before = time.time()
+            # the result of an earlier case in this run may still be being written
+            self.writer.wait(bin_path)
+            if bin_path in self.shared_results:
+                rv = attach_result(bin_path, *self.shared_results[bin_path])
+            elif path.exists(bin_path):
+                rv = read_result(bin_path)
+            else:
+                raise Exception(
+                    f"case {case.name} dependency {name}" +
+                    f" missing in '{bin_path}'")
+
+            self.cache_result(bin_path, rv, 1000 * (time.time() - before))
+            return True, rv
+
         return False, None
 
-    def save_test_result(self, case_path, result):
-        bin_path = self.tests.test_result_path(self.out_dir, case_path)
-        self.cache[bin_path] = result
-        if result is None:
-            if path.exists(bin_path):
-                os.remove(bin_path)
+    def cache_result(self, bin_path, result, cost_ms):
+        """
+        Caches the result in memory. The memory caches evict first the results,
+        which are quick to recreate relative to their size.
+        """
+        if isinstance(self.cache, MemoryCache):
+            self.cache.put(bin_path, result, cost_ms)
         else:
-            with open(bin_path, 'wb') as file:
-                pickle.dump(result, file)
+            self.cache[bin_path] = result
+
+    def save_test_result(self, case_path, result, took_ms=1):
+        """
+        Caches the result in memory and queues it to be written into the result
+        file. The case is reported as finished only after the write, so that
+        the dependents in the other processes can read it.
+        """
+        bin_path = self.tests.test_result_path(self.out_dir, case_path)
+        on_written = None
+        if self.fingerprints is not None:
+            if result is None:
+                self.fingerprints.remove(self.out_dir, case_path)
+            else:
+                # the fingerprint is written after the result, so it never refers to an older result
+                self.fingerprints.fingerprint(case_path)
+
+                def on_written():
+                    self.fingerprints.write(self.out_dir, case_path)
+                    self.fingerprints.publish(self.out_dir, case_path, took_ms)
+        self.writer.write(bin_path, result, on_written)
+        self.cache_result(bin_path, result, took_ms)
+
+    def report_case(self, case_name, result, duration):
+        if self.case_listener is not None:
+            self.writer.when_written(
+                self.tests.test_result_path(self.out_dir, case_name),
+                lambda: self.case_listener(case_name, result, duration))
+
+    def release(self, case_name):
+        """
+        Drops the results, which the remaining cases don't need, from
+        the memory and removes the ephemeral result files
+        """
+        if self.lifetimes is None:
+            return
+        for name in self.lifetimes.finished(case_name):
+            bin_path = self.tests.test_result_path(self.out_dir, name)
+            remove = getattr(self.cache, "remove", None)
+            if remove is not None:
+                remove(bin_path)
+            if is_ephemeral(self.tests.get_case(name)):
+                on_removed = None
+                if self.fingerprints is not None:
+                    on_removed = functools.partial(self.fingerprints.remove, self.out_dir, name)
+                self.writer.write(bin_path, None, on_removed)
+
+    def flush_results(self):
+        for bin_path, error in self.writer.close():
+            self.print(f"failed to write result {bin_path}: {error}")
 
     async def run_case(self, case_path, case, title=None) \
             -> (TestResult, UserRequest, float):
@@ -107,6 +209,10 @@ class TestRun:
             t.iln().fail().iln(f"test raised exception {e}:")
             t.iln(traceback.format_exc())
             rv = None
+        except BaseException:
+            # leave the partial output for debugging, when the run is interrupted
+            t.flush()
+            raise
 
         result, interaction, ai_result = t.end()
 
@@ -121,7 +227,7 @@ class TestRun:
 
         if should_save:
             # if the test case return a value, store it in a cache
-            self.save_test_result(case_path, rv)
+            self.save_test_result(case_path, rv, t.took_ms)
 
         # Convert two-dimensional result to legacy format for compatibility with CaseReports
         if isinstance(result, TwoDimensionalTestResult):
@@ -131,6 +237,34 @@ class TestRun:
 
         return legacy_result, interaction, t.took_ms, ai_result
 
+    def failed_dependencies(self, case_name, unavailable):
+        """
+        Returns the dependencies of the case, which failed or were skipped in this run
+        """
+        return [dependency
+                for dependency in self.tests.method_dependencies(self.tests.get_case(case_name),
+                                                                 self.selected_cases)
+                if dependency in unavailable]
+
+    def skip_case(self, case_name, failed_dependencies):
+        """
+        Reports the case skipped without running it. The result of
+        an earlier run is removed, so that it is not used by accident.
+        """
+        write_skipped_case(self.out_dir, case_name, failed_dependencies)
+        bin_path = self.tests.test_result_path(self.out_dir, case_name)
+        remove = getattr(self.cache, "remove", None)
+        if remove is not None:
+            remove(bin_path)
+        self.writer.write(bin_path, None)
+        if self.fingerprints is not None:
+            self.fingerprints.remove(self.out_dir, case_name)
+
+        report_case_begin(self.print, case_name, None, self.verbose)
+        report_case_result(self.print, case_name, TestResult.SKIPPED, 0, self.verbose)
+
+        return TestResult.SKIPPED, UserRequest.NONE, 0, None
+
     def print(self, *args, sep=' ', end='\n'):
         print(*args, sep=sep, end=end, file=self.output)
 
@@ -147,7 +281,7 @@ class TestRun:
         oks = 0
         fails = 0
         tests = 0
-        os.system(f"mkdir -p {self.report_dir}")
+        ensure_dir(self.report_dir)
         report_file = path.join(self.report_dir, "cases.ndjson")
 
         # 1.2. To continue testing, we need to read
@@ -155,13 +289,19 @@ class TestRun:
         old_report = CaseReports.of_dir(self.report_dir)
 
         done, todo = old_report.cases_to_done_and_todo(self.selected_cases, self.config)
+        cached = []
+        if self.fingerprints is not None:
+            cached, todo = self.fingerprints.cached_cases(self.out_dir, todo, old_report)
+        if self.release_results:
+            self.lifetimes = ResultLifetimes.of_cases(self.tests, todo)
 
         #
         # 2. Test
         #
 
         # 2.1 inform user that the testing has started
-        start_report(self.print)
+        start_report(self.print, self.estimate_ms)
+        report_cached_cases(self.print, cached)
 
         # 2.2. run test.
         #      update the report as we test to allow hitting
@@ -177,38 +317,58 @@ class TestRun:
                             report_f, i[0], i[1], i[2], ai_review)
 
             # 2.2.2 run cases
-            for case_name in todo:
-                case = self.tests.get_case(case_name)
-                res, request, duration, ai_result = \
-                    await self.run_case(case_name, case)
-
-                if res == TestResult.DIFF \
-                   or res == TestResult.FAIL:
-                    if rv != TestResult.FAIL:
-                        rv = res
-                    # treat both FAIL and DIFF as failures
-                    failed.append((case_name, res, duration))
-                    fails += 1
-                    tests += 1
-                else:
-                    passed.append(case_name)
-                    oks += 1
-                    tests += 1
-
-                CaseReports.write_case_jsonl(
-                    report_f, case_name, res, duration, ai_result)
-
-                # manage situations, where testing should
-                # be aborted
-                if request == UserRequest.ABORT or \
-                   (self.fail_fast and fails > 0):
-                    break
+            # the dependents of these cases are skipped
+            unavailable = set()
+            try:
+                for case_name in todo:
+                    failed_dependencies = self.failed_dependencies(case_name, unavailable)
+                    if len(failed_dependencies) > 0:
+                        res, request, duration, ai_result = \
+                            self.skip_case(case_name, failed_dependencies)
+                    else:
+                        case = self.tests.get_case(case_name)
+                        res, request, duration, ai_result = \
+                            await self.run_case(case_name, case)
+
+                    if res == TestResult.FAIL or res == TestResult.SKIPPED:
+                        unavailable.add(case_name)
+
+                    if res == TestResult.DIFF \
+                       or res == TestResult.FAIL \
+                       or res == TestResult.SKIPPED:
+                        if rv != TestResult.FAIL:
+                            rv = res
+                        # treat FAIL, DIFF and SKIPPED as failures
+                        failed.append((case_name, res, duration))
+                        fails += 1
+                        tests += 1
+                    else:
+                        passed.append(case_name)
+                        oks += 1
+                        tests += 1
+
+                    CaseReports.write_case_jsonl(
+                        report_f, case_name, res, duration, ai_result)
+
+                    self.report_case(case_name, res, duration)
+                    self.release(case_name)
+
+                    # manage situations, where testing should
+                    # be aborted
+                    if request == UserRequest.ABORT or \
+                       (self.fail_fast and fails > 0):
+                        break
+            finally:
+                # the reported cases are persisted also, when the run is interrupted
+                self.flush_results()
 
         took = int((time.time() - before) * 1000)
 
+        # the batches of parallel runs write their metrics into the batch
+        # directory, while the main process writes the whole run's metrics
         Metrics(took).to_file(
             os.path.join(
-                self.out_dir, "metrics.json"))
+                self.report_dir, "metrics.json"))
 
         # Only print end_report here if auto-report won't handle it
         # Auto-report will show the summary if:
@@ -1,15 +1,18 @@
 import os.path as path
 import os
 import argparse
+import shutil
+import sys
 
 from coverage import Coverage
 
-from booktest.dependencies.cache import LruCache
 from booktest.dependencies.dependencies import bind_dependent_method_if_unbound
 from booktest.config.detection import BookTestSetup
-from booktest.reporting.reports import CaseReports
-from booktest.reporting.review import run_tool, review
-from booktest.core.runs import parallel_run_tests, run_tests
+from booktest.reporting.reports import CaseReports, Metrics
+from booktest.reporting.review import run_tool, review, end_report
+from booktest.core.runs import parallel_run_tests, run_tests, memory_cache
+from booktest.core.shards import parse_shard, shard_cases, expected_durations, merge_out_dirs
+from booktest.core.fingerprints import Fingerprints, is_memoized
 from booktest.config.config import get_default_config
 import booktest.utils.setup
 from booktest.core.testrun import method_identity, match_method
@@ -18,43 +21,89 @@ from booktest.config.selection import is_selected
 from booktest.config.naming import to_filesystem_path
 
 
+class CaseIndex:
+    """
+    Index of the test cases by the case name and by the test function,
+    so that the cases and the dependencies are found without scanning
+    all the cases
+    """
+
+    def __init__(self, cases):
+        self.cases = cases
+        self.count = len(cases)
+        self.by_name = {}
+        # test function -> [(self, case name)] in the case order
+        self.by_func = {}
+        self.unhashable = []
+        for name, method in cases:
+            self.by_name.setdefault(name, method)
+            method_self, method_func = method_identity(method)
+            try:
+                self.by_func.setdefault(method_func, []).append((method_self, name))
+            except TypeError:
+                self.unhashable.append((name, method))
+
+    def is_current(self, cases):
+        return self.cases is cases and self.count == len(cases)
+
+    def case_by_method(self, method):
+        matcher_self, matcher_func = method_identity(method)
+        try:
+            candidates = self.by_func.get(matcher_func, [])
+        except TypeError:
+            candidates = []
+        for method_self, name in candidates:
+            if matcher_self is None or matcher_self == method_self:
+                return name
+        for name, m in self.unhashable:
+            if match_method(method, m):
+                return name
+        return None
+
+
 class Tests:
     def __init__(self, cases):
         self.cases = cases
 
+    def case_index(self) -> CaseIndex:
+        # the index is rebuilt, if the cases have been replaced or extended
+        index = getattr(self, "_case_index", None)
+        if index is None or not index.is_current(self.cases):
+            index = CaseIndex(self.cases)
+            self._case_index = index
+        return index
+
     def test_result_path(self, out_dir, case_path):
         # Convert pytest-style names to filesystem paths (:: → /)
         case_path_fs = to_filesystem_path(case_path)
         return path.join(out_dir, case_path_fs + ".bin")
 
-    def test_result_exists(self, out_dir, case_path):
+    def test_result_exists(self, out_dir, case_path, fingerprints=None):
+        if fingerprints is not None:
+            # the result must have been created by the current test version
+            return fingerprints.matches(out_dir, case_path)
         return path.exists(self.test_result_path(out_dir, case_path))
 
     def get_case(self, case_name):
-        for s in self.cases:
-            if s[0] == case_name:
-                return s[1]
-        return None
+        return self.case_index().by_name.get(case_name)
 
     def case_by_method(self, method):
-        for t in self.cases:
-            if match_method(method, t[1]):
-                return t[0]
-        return None
+        return self.case_index().case_by_method(method)
 
     def method_dependencies(self,
                             method,
                             selection,
-                            cache_out_dir=None):
+                            cache_out_dir=None,
+                            fingerprints=None):
         rv = []
         if hasattr(method, "_dependencies"):
             for dependency in method._dependencies:
                 bound_method = bind_dependent_method_if_unbound(method, dependency)
                 case = self.case_by_method(bound_method)
                 if case is not None:
-                    if is_selected(case, selection) or \
-                       cache_out_dir is None or \
-                       not self.test_result_exists(cache_out_dir, case):
+                    if cache_out_dir is None or \
+                       is_selected(case, selection) or \
+                       not self.test_result_exists(cache_out_dir, case, fingerprints):
                         rv.append(case)
 
         return rv
@@ -70,32 +119,66 @@ class Tests:
     def all_method_dependencies(self,
                                 method,
                                 selection,
-                                cache_out_dir=None):
+                                cache_out_dir=None,
+                                fingerprints=None):
         rv = []
-        for dependency in self.method_dependencies(method, selection, cache_out_dir):
+        for dependency in self.method_dependencies(method, selection, cache_out_dir, fingerprints):
             m = self.get_case(dependency)
-            rv.extend(self.all_method_dependencies(m, selection, cache_out_dir))
+            rv.extend(self.all_method_dependencies(m, selection, cache_out_dir, fingerprints))
             rv.append(dependency)
 
         return rv
 
+    def dependency_order(self,
+                         case_names,
+                         selection,
+                         cache_out_dir=None,
+                         fingerprints=None):
+        """
+        Returns the cases and their dependencies recursively without
+        duplicates in the order, in which they need to be run.
+
+        Each case is visited once, so that the order is linear
+        in the number of cases and dependencies.
+        """
+        # dictionary is used as an ordered set
+        order = {}
+        visiting = set()
+        for case_name in case_names:
+            # depth first search without recursion, because the chains can be long
+            stack = [(case_name, None)]
+            while len(stack) > 0:
+                name, dependencies = stack.pop()
+                if name in order:
+                    continue
+                if dependencies is None:
+                    if name in visiting:
+                        raise ValueError(f"case {name} depends on itself")
+                    visiting.add(name)
+                    dependencies = \
+                        iter(self.method_dependencies(self.get_case(name),
+                                                      selection,
+                                                      cache_out_dir,
+                                                      fingerprints))
+                for dependency in dependencies:
+                    if dependency not in order:
+                        stack.append((name, dependencies))
+                        stack.append((dependency, None))
+                        break
+                else:
+                    visiting.remove(name)
+                    order[name] = None
+
+        return list(order)
+
     def all_names(self):
         return list(map(lambda x: x[0], self.cases))
 
-    def selected_names(self, selection, cache_out_dir=None):
-        selected = []
-        for c in self.cases:
-            if is_selected(c[0], selection):
-                dependencies = \
-                    self.all_method_dependencies(c[1],
-                                                 selection,
-                                                 cache_out_dir)
-                for dependency in dependencies:
-                    if dependency not in selected:
-                        selected.append(dependency)
-                if c[0] not in selected:
-                    selected.append(c[0])
-        return selected
+    def selected_names(self, selection, cache_out_dir=None, fingerprints=None):
+        return self.dependency_order([c[0] for c in self.cases if is_selected(c[0], selection)],
+                                     selection,
+                                     cache_out_dir,
+                                     fingerprints)
 
     def _print_failure_report_if_needed(self, exit_code, exp_dir, out_dir, config, cases):
         """
@@ -250,6 +333,13 @@ class Tests:
             type=int,
             help="run test on N parallel processes"
         )
+        parser.add_argument(
+            "--start-method",
+            dest='start_method',
+            choices=["spawn", "forkserver", "fork"],
+            help="how parallel worker processes are started. forkserver and fork "
+                 "import the test modules once, before the workers are started"
+        )
         parser.add_argument(
             "-s",
             action='store_true',
@@ -292,6 +382,20 @@ class Tests:
             type=int,
             help="fail tests on a timeout. works only with parallel runs"
         )
+        parser.add_argument(
+            "--shard",
+            dest='shard',
+            type=parse_shard,
+            help="runs only the i:th of n duration balanced shards of the selected tests, e.g. 2/8. "
+                 "dependent tests are kept in the same shard"
+        )
+        parser.add_argument(
+            "--merge-out",
+            dest='merge_out',
+            nargs='+',
+            metavar='SHARD_OUT_DIR',
+            help="merges the .out directories of the shard runs into this project's .out directory for review"
+        )
         parser.add_argument(
             "--narrow-detection",
             dest='narrow_detection',
@@ -436,20 +540,18 @@ class Tests:
         :param root_dir:  the directory containing books and .out directory
         :param parsed: the object containing argparse parsed arguments
         :param cache: in-memory cache. Can be e.g. dictionary {},
-                      LruCache or NoCache.
+                      MemoryCache, LruCache or NoCache.
         :return: returns an exit value. 0 for success, 1 for error
         """
 
         out_dir = os.path.join(root_dir, ".out")
         exp_dir = root_dir
 
-        if cache is None:
-            cache = LruCache(8)
-
         if setup is None:
             setup = BookTestSetup()
 
-        config = get_default_config()
+        # copied, so that the overrides don't leak into the later runs in the process
+        config = dict(get_default_config())
         # extra default configuration parameters get layered
         # on top of normal default configuration
         for key, value in extra_default_config.items():
@@ -489,6 +591,8 @@ class Tests:
             config["timeout"] = parsed.timeout
             if config.get("parallel") is None:
                 raise ValueError("timeout requires parallel run")
+        if parsed.start_method:
+            config["parallel_start_method"] = parsed.start_method
         if parsed.md_viewer:
             config["md_viewer"] = parsed.md_viewer
         if parsed.diff_tool:
@@ -498,6 +602,9 @@ class Tests:
         if parsed.diff_tool:
             config["python_path"] = parsed.python_path
 
+        if cache is None:
+            cache = memory_cache(config)
+
         def is_garbage(not_garbage, file):
             for ng in not_garbage:
                 if ng == file:
@@ -544,7 +651,22 @@ class Tests:
         if selection == "*":
             selection = config.get("default_tests", "test,book").split(",")
 
-        cases = self.selected_names(selection, cache_out_dir)
+        # with memoization, the dependency results of the older test versions are not reused
+        fingerprints = Fingerprints(self, exp_dir) if is_memoized(config) else None
+
+        cases = self.selected_names(selection, cache_out_dir, fingerprints)
+
+        if parsed.shard:
+            shard, shards = parsed.shard
+            cases = shard_cases(self, cases, shard, shards, expected_durations(out_dir))
+
+        if parsed.merge_out:
+            merged = merge_out_dirs(config, out_dir, parsed.merge_out)
+            end_report(print,
+                       merged.failed_with_details(),
+                       len(merged.cases),
+                       Metrics.of_dir(out_dir).took_ms)
+            return 0 if len(merged.failed()) == 0 else -1
 
         reports = CaseReports.of_dir(out_dir)
         done, todo = reports.cases_to_done_and_todo(cases, config)
@@ -566,7 +688,8 @@ class Tests:
             for name in todo:
                 file = path.join(exp_dir, f"{name}.md")
                 if path.exists(file):
-                    os.system(f"cat {file}")
+                    with open(file, "r") as f:
+                        shutil.copyfileobj(f, sys.stdout)
             return 0
         elif cmd == '--path':
             for name in todo:
@@ -590,22 +713,22 @@ class Tests:
             return 0
         elif cmd == '-l':
             from booktest.reporting.colors import green, yellow, red, gray
-            from booktest.reporting.reports import TestResult
-
-            def format_duration(duration_ms):
-                """Format duration in human-readable form."""
-                if duration_ms >= 60000:
-                    return f"{duration_ms / 60000:.1f} min"
-                elif duration_ms >= 1000:
-                    return f"{duration_ms / 1000:.1f} s"
-                else:
-                    return f"{int(duration_ms)} ms"
+            from booktest.reporting.reports import TestResult, DurationHistory, format_duration
 
             # Build a lookup from test name to (result, duration_ms)
             result_lookup = {}
             for case_name, result, duration_ms in reports.cases:
                 result_lookup[case_name] = (result, duration_ms)
 
+            history = DurationHistory.of_dir(out_dir)
+
+            def typical_duration(name):
+                """The expected and the p95 duration over the previous runs"""
+                if history.count(name) == 0:
+                    return ""
+                return gray(f" (avg {format_duration(history.ewma(name))}, "
+                            f"p95 {format_duration(history.p95(name))})")
+
             # Count stats
             ok_count = diff_count = fail_count = todo_count = 0
 
@@ -619,13 +742,16 @@ class Tests:
                     elif result == TestResult.DIFF:
                         status = yellow("DIFF") + f" {duration_str}"
                         diff_count += 1
+                    elif result == TestResult.SKIPPED:
+                        status = gray("skipped")
+                        fail_count += 1
                     else:  # FAIL
                         status = red("FAIL") + f" {duration_str}"
                         fail_count += 1
-                    print(f"  {s} - {status}")
+                    print(f"  {s} - {status}{typical_duration(s)}")
                 else:
                     # Not run yet
-                    print(f"  {s}")
+                    print(f"  {s}{typical_duration(s)}")
                     todo_count += 1
 
             return 0
@@ -704,7 +830,7 @@ class Tests:
         :param root_dir: the directory containing books and .out directory
         :param args: a string containing command line arguments
         :param cache: in-memory cache. Can be e.g. dictionary {},
-                      LruCache or NoCache.
+                      MemoryCache, LruCache or NoCache.
         :return: returns an exit value. 0 for success, 1 for error
         """
         # Custom formatter to add workflow examples
@@ -0,0 +1,261 @@
+import threading
+from multiprocessing.connection import Pipe, wait
+
+#
+# Worker processes for the parallel runs
+#
+
+# connection to the parent process. set in the worker processes
+WORKER_CONNECTION = None
+
+# the events may be sent also from the other threads of the worker
+WORKER_LOCK = threading.Lock()
+
+# how long a terminated worker may take to exit, before it is killed
+TERMINATE_TIMEOUT = 5
+
+
+def notify(*event):
+    """
+    Sends an event from the current worker process to the parent process.
+    Does nothing, when called outside a worker process.
+    """
+    if WORKER_CONNECTION is not None:
+        with WORKER_LOCK:
+            WORKER_CONNECTION.send(event)
+
+
+def worker_main(connection, function, initializer, initargs, finalizer=None):
+    global WORKER_CONNECTION
+    WORKER_CONNECTION = connection
+
+    if initializer is not None:
+        initializer(*initargs)
+
+    try:
+        while True:
+            try:
+                job = connection.recv()
+            except (EOFError, OSError):
+                break
+            if job is None:
+                break
+
+            task_id, args = job
+            try:
+                result = function(*args)
+                with WORKER_LOCK:
+                    connection.send(("done", task_id, result))
+            except Exception as e:
+                with WORKER_LOCK:
+                    connection.send(("error", task_id, repr(e)))
+    finally:
+        # the finalizer is not called, if the worker is terminated
+        if finalizer is not None:
+            finalizer()
+
+    connection.close()
+
+
+def terminate_process(process):
+    process.terminate()
+    process.join(TERMINATE_TIMEOUT)
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+
+class Worker:
+
+    def __init__(self, worker_id, process, connection):
+        self.worker_id = worker_id
+        self.process = process
+        self.connection = connection
+        # the task, which is running in the worker or None, if the worker is idle
+        self.task_id = None
+
+
+class WorkerPool:
+    """
+    A pool of worker processes, where the caller decides which worker
+    runs which task.
+
+    All workers run the same function, which is sent to the worker only once
+    on the worker start. Workers report events via the on_event callback,
+    which is called from the pool's reader thread as on_event(worker_id, event).
+    The events are:
+
+    - ("done", task_id, result), when the task has finished
+    - ("error", task_id, message), when the task raised an exception
+    - ("exit", task_id), when the worker died or was terminated while
+      running the task
+    - ("replace",), when the worker has exited. The caller replaces the worker
+      with a fresh one by calling restart(worker_id) from its own thread,
+      because forking from the reader thread is not safe
+    - any event sent with notify() while the task is running
+
+    The exited workers are not replaced after close() has been called.
+    """
+
+    def __init__(self, context, size: int, function, on_event, initializer=None, initargs=(), finalizer=None):
+        self.context = context
+        self.size = size
+        self.function = function
+        self.on_event = on_event
+        self.initializer = initializer
+        self.initargs = initargs
+        self.finalizer = finalizer
+        self.lock = threading.Lock()
+        self.workers = []
+        self.reader = None
+        self.closing = False
+        # wakes up the reader thread, when a worker has been restarted
+        self.wakeup_reader, self.wakeup_writer = Pipe(duplex=False)
+
+    def start_process(self):
+        connection, child_connection = self.context.Pipe()
+        # workers are not daemons, so that the test cases can start processes
+        # of their own. the workers exit, when the parent closes the connection
+        process = self.context.Process(
+            target=worker_main,
+            args=(child_connection, self.function, self.initializer, self.initargs, self.finalizer),
+            daemon=False)
+        process.start()
+        child_connection.close()
+        return process, connection
+
+    def __enter__(self):
+        for worker_id in range(self.size):
+            process, connection = self.start_process()
+            self.workers.append(Worker(worker_id, process, connection))
+        self.reader = threading.Thread(target=self.read_events, daemon=True)
+        self.reader.start()
+        return self
+
+    def idle_workers(self):
+        with self.lock:
+            return [worker.worker_id
+                    for worker in self.workers
+                    if worker.process is not None and worker.task_id is None]
+
+    def submit(self, worker_id, task_id, *args):
+        with self.lock:
+            worker = self.workers[worker_id]
+            if worker.process is None:
+                raise ValueError(f"worker {worker_id} has exited")
+            if worker.task_id is not None:
+                raise ValueError(f"worker {worker_id} is already running {worker.task_id}")
+            worker.task_id = task_id
+            worker.connection.send((task_id, args))
+
+    def terminate(self, worker_id):
+        """
+        Terminates the worker and the task running in it. The reader
+        thread reports the exit, after which the worker can be restarted.
+        """
+        with self.lock:
+            process = self.workers[worker_id].process
+        if process is not None:
+            terminate_process(process)
+
+    def restart(self, worker_id):
+        """
+        Replaces the exited worker with a fresh one. Does nothing, if the
+        pool is closing or the worker is still running.
+        """
+        with self.lock:
+            worker = self.workers[worker_id]
+            if self.closing or worker.process is not None:
+                return
+            worker.process, worker.connection = self.start_process()
+        self.wakeup_writer.send(worker_id)
+
+    def close(self):
+        """
+        Stops replacing the exited workers, e.g. when the run is aborted
+        """
+        with self.lock:
+            self.closing = True
+
+    def dispatch(self, worker, event):
+        if event[0] in ("done", "error"):
+            with self.lock:
+                worker.task_id = None
+        self.on_event(worker.worker_id, event)
+
+    def worker_exited(self, worker):
+        """
+        Handles the exit of the worker process
+        """
+        # process the events sent before the exit
+        try:
+            while worker.connection.poll():
+                self.dispatch(worker, worker.connection.recv())
+        except (EOFError, OSError):
+            pass
+        worker.connection.close()
+        worker.process.join()
+
+        with self.lock:
+            task_id = worker.task_id
+            worker.task_id = None
+            worker.process = None
+            closing = self.closing
+
+        if task_id is not None:
+            self.on_event(worker.worker_id, ("exit", task_id))
+        if not closing:
+            self.on_event(worker.worker_id, ("replace",))
+
+    def read_events(self):
+        while True:
+            with self.lock:
+                if self.closing and all(worker.connection.closed for worker in self.workers):
+                    break
+                # the workers with closed connections have exited
+                active = [worker for worker in self.workers if not worker.connection.closed]
+                connections = {worker.connection: worker for worker in active}
+                sentinels = {worker.process.sentinel: worker for worker in active}
+
+            for ready in wait(list(connections) + list(sentinels) + [self.wakeup_reader]):
+                if ready is self.wakeup_reader:
+                    # the restarted workers are waited in the next round
+                    ready.recv()
+                elif ready in connections:
+                    worker = connections[ready]
+                    try:
+                        self.dispatch(worker, ready.recv())
+                    except (EOFError, OSError):
+                        # the worker exited. its sentinel will handle the rest
+                        pass
+                elif ready in sentinels:
+                    worker = sentinels[ready]
+                    if worker.process is not None and worker.process.sentinel == ready:
+                        self.worker_exited(worker)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        with self.lock:
+            self.closing = True
+            busy = []
+            for worker in self.workers:
+                if worker.process is None:
+                    continue
+                if worker.task_id is not None:
+                    busy.append(worker.process)
+                try:
+                    worker.connection.send(None)
+                except (OSError, ValueError):
+                    pass
+            processes = [worker.process for worker in self.workers if worker.process is not None]
+
+        # nobody waits for the tasks still running, so they are terminated.
+        # the idle workers exit normally to keep their coverage measurements
+        for process in busy:
+            terminate_process(process)
+        for process in processes:
+            process.join()
+        # wake up the reader, if it waits only for the restarts
+        self.wakeup_writer.send(None)
+        self.reader.join()
+        self.wakeup_reader.close()
+        self.wakeup_writer.close()
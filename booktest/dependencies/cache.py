@@ -1,3 +1,4 @@
+import sys
 from collections import OrderedDict
 
 
@@ -34,6 +35,9 @@ class LruCache:
             if len(self.__cache) > self.__size:
                 self.__cache.popitem(last=False)
 
+    def remove(self, key):
+        self.__cache.pop(key, None)
+
 
 class NoCache:
     # This can be provided to skip using in-memory cache
@@ -42,9 +46,164 @@ class NoCache:
     def __len__(self):
         return 0
 
+    def __contains__(self, key):
+        return False
+
     def __getitem__(self, key):
         return None
 
     def __setitem__(self, key, value) -> None:
         pass
 
+    def remove(self, key):
+        pass
+
+
+#
+# Estimating the memory use of the cached values
+#
+
+# (type check, size function) pairs. the latest registration is checked first
+SIZE_HOOKS = []
+
+
+def register_size_hook(type_check, size):
+    """
+    Registers a function, which returns the size of the values in bytes,
+    for which type_check(value) returns True
+    """
+    SIZE_HOOKS.insert(0, (type_check, size))
+
+
+def is_numpy_array(value):
+    np = sys.modules.get("numpy")
+    return np is not None and isinstance(value, np.ndarray)
+
+
+def is_pandas_object(value):
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(value, (pd.DataFrame, pd.Series, pd.Index))
+
+
+def pandas_size(value):
+    usage = value.memory_usage(deep=True)
+    return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+
+
+def is_torch_tensor(value):
+    torch = sys.modules.get("torch")
+    return torch is not None and isinstance(value, torch.Tensor)
+
+
+register_size_hook(is_numpy_array, lambda value: value.nbytes)
+register_size_hook(is_pandas_object, pandas_size)
+register_size_hook(is_torch_tensor, lambda value: value.element_size() * value.nelement())
+
+
+def estimate_size(value) -> int:
+    """
+    Estimates the memory used by the value and the objects it refers to.
+    Objects shared by several parts of the value are counted once.
+    """
+    rv = 0
+    seen = set()
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if id(value) in seen:
+            continue
+        seen.add(id(value))
+
+        hook = next((size for type_check, size in SIZE_HOOKS if type_check(value)), None)
+        if hook is not None:
+            rv += hook(value)
+            continue
+
+        rv += sys.getsizeof(value)
+        if isinstance(value, (str, bytes, bytearray, int, float, bool, type(None))):
+            continue
+        elif isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple, set, frozenset)):
+            stack.extend(value)
+        elif hasattr(value, "__dict__") and not isinstance(value, type):
+            stack.append(vars(value))
+
+    return rv
+
+
+class MemoryCache:
+    """
+    Cache limited by the estimated memory use of the values in bytes.
+
+    When the cache is full, the values that are cheap to recreate for
+    the memory they use are evicted first. The priority of the value is its
+    cost divided by its size plus an inflation term, which grows with each
+    eviction, so that values not used for a while are evicted eventually, even
+    if they were expensive (GreedyDual-Size).
+
+    The cost can be e.g. the milliseconds it took to create or load the value.
+    Evicted values are passed to the optional spill function, which can store
+    them e.g. on the disk.
+    """
+
+    def __init__(self, max_bytes: int, spill=None):
+        self.max_bytes = max_bytes
+        self.spill = spill
+        # key -> (value, size, cost, priority)
+        self.__cache = {}
+        self.__inflation = 0
+        self.size = 0
+
+    def __len__(self):
+        return len(self.__cache)
+
+    def __contains__(self, key):
+        return key in self.__cache
+
+    def keys(self):
+        return list(self.__cache)
+
+    def __getitem__(self, key):
+        entry = self.__cache.get(key)
+        if entry is None:
+            return None
+        value, size, cost, _ = entry
+        self.__cache[key] = (value, size, cost, self.priority(size, cost))
+        return value
+
+    def __setitem__(self, key, value) -> None:
+        self.put(key, value)
+
+    def priority(self, size, cost):
+        return self.__inflation + cost / max(size, 1)
+
+    def remove(self, key):
+        entry = self.__cache.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def put(self, key, value, cost=1):
+        self.remove(key)
+
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            # the value would evict everything else and still not fit
+            if self.spill is not None:
+                self.spill(key, value)
+            return
+
+        while self.size + size > self.max_bytes:
+            self.evict()
+
+        self.__cache[key] = (value, size, cost, self.priority(size, cost))
+        self.size += size
+
+    def evict(self):
+        key = min(self.__cache, key=lambda k: self.__cache[k][3])
+        value, _, _, priority = self.__cache[key]
+        self.__inflation = priority
+        self.remove(key)
+        if self.spill is not None:
+            self.spill(key, value)
@@ -0,0 +1,367 @@
+import io
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+import zlib
+
+#
+# Serialization of the test case return values, which are stored in
+# the <case>.bin files and loaded by the dependent test cases
+#
+
+# the result files start with this line followed by the codec name.
+# files without the header are plain pickles written by older versions
+RESULT_MAGIC = b"#booktest-result "
+
+# the header line and the buffers are aligned, so that the arrays
+# referring to the mapped files are aligned too
+BUFFER_ALIGNMENT = 64
+
+
+def aligned(offset: int):
+    return (offset + BUFFER_ALIGNMENT - 1) // BUFFER_ALIGNMENT * BUFFER_ALIGNMENT
+
+
+# the smaller result files are read into memory, because each mapping keeps
+# a file descriptor open, until all the values referring to it are released
+MAP_MIN_BYTES = 1024 * 1024
+
+
+def map_file(file):
+    """
+    Maps the file into memory as copy-on-write, so that the pages are
+    shared until the values are modified, and the modifications are never
+    written back into the file.
+    """
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+
+class ResultCodec:
+    """
+    Codec encodes the test case results into the result files and decodes
+    them back. The decode receives the encoded payload as a memoryview of
+    the memory mapped file or of a shared memory segment, so that the
+    decoded arrays can refer to the buffer instead of copying it.
+    """
+
+    name = None
+
+    def encode(self, value, file):
+        raise NotImplementedError()
+
+    def decode(self, buffer: memoryview):
+        raise NotImplementedError()
+
+
+class PickleCodec(ResultCodec):
+    """
+    Pickle protocol 5, where the large buffers like numpy arrays and the pandas
+    data frame blocks are stored out-of-band after the pickle stream.
+
+    On decode, the arrays refer to the out-of-band buffers in place,
+    so they are not copied into memory, until they are modified.
+    """
+
+    name = "pickle"
+
+    # pickle length and buffer count followed by the buffer lengths
+    HEADER = struct.Struct("<QI")
+    BUFFER_LENGTH = struct.Struct("<Q")
+
+    def encode(self, value, file):
+        buffers = []
+        data = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+        raws = [buffer.raw() for buffer in buffers]
+
+        start = file.tell()
+        file.write(self.HEADER.pack(len(data), len(raws)))
+        for raw in raws:
+            file.write(self.BUFFER_LENGTH.pack(raw.nbytes))
+        file.write(data)
+        for raw in raws:
+            position = file.tell() - start
+            file.write(b"\0" * (aligned(position) - position))
+            file.write(raw)
+
+    def decode(self, buffer: memoryview):
+        if len(buffer) < self.HEADER.size:
+            raise EOFError("the result is truncated")
+        data_length, buffer_count = self.HEADER.unpack_from(buffer)
+        position = self.HEADER.size
+        if len(buffer) < position + buffer_count * self.BUFFER_LENGTH.size:
+            raise EOFError("the result is truncated")
+        lengths = []
+        for _ in range(buffer_count):
+            lengths.append(self.BUFFER_LENGTH.unpack_from(buffer, position)[0])
+            position += self.BUFFER_LENGTH.size
+        data = buffer[position:position + data_length]
+        position += data_length
+
+        buffers = []
+        for length in lengths:
+            position = aligned(position)
+            buffers.append(buffer[position:position + length])
+            position += length
+        if position > len(buffer):
+            raise EOFError("the result is truncated")
+
+        return pickle.loads(data, buffers=buffers)
+
+
+class NpyCodec(ResultCodec):
+    """
+    Stores numpy arrays in the .npy format. The decoded array refers
+    to the buffer in place.
+    """
+
+    name = "npy"
+
+    def encode(self, value, file):
+        import numpy as np
+        np.lib.format.write_array(file, value, allow_pickle=False)
+
+    def decode(self, buffer: memoryview):
+        import numpy as np
+        # magic and version are followed by 2 (version 1.0) or 4 byte header length
+        version = np.lib.format.read_magic(io.BytesIO(buffer[:8]))
+        length_format = "<H" if version == (1, 0) else "<I"
+        header_length = struct.unpack_from(length_format, buffer, 8)[0]
+        header = io.BytesIO(buffer[:8 + struct.calcsize(length_format) + header_length])
+
+        np.lib.format.read_magic(header)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+        order = "F" if fortran_order else "C"
+
+        count = 1
+        for i in shape:
+            count *= i
+        if count == 0 or dtype.itemsize == 0:
+            return np.zeros(shape, dtype=dtype, order=order)
+
+        array = np.frombuffer(buffer, dtype=dtype, count=count, offset=header.tell())
+        return array.reshape(shape, order=order)
+
+
+class ArrowCodec(ResultCodec):
+    """
+    Stores Arrow tables in the Arrow IPC file format. The decoded table
+    refers to the buffer in place. Requires pyarrow.
+    """
+
+    name = "arrow"
+
+    def encode(self, value, file):
+        import pyarrow as pa
+        with pa.ipc.new_file(file, value.schema) as writer:
+            writer.write_table(value)
+
+    def decode(self, buffer: memoryview):
+        import pyarrow as pa
+        return pa.ipc.open_file(pa.py_buffer(buffer)).read_all()
+
+
+CODECS = {}
+
+# (type check, codec name) pairs. the latest registration is checked first
+TYPE_CODECS = []
+
+DEFAULT_CODEC = PickleCodec.name
+
+
+def register_codec(codec: ResultCodec, type_check=None):
+    """
+    Registers the result codec. If type_check is given, the codec is used
+    for the results, for which type_check(value) returns True.
+    """
+    CODECS[codec.name] = codec
+    if type_check is not None:
+        TYPE_CODECS.insert(0, (type_check, codec.name))
+
+
+def is_numpy_array(value):
+    np = sys.modules.get("numpy")
+    # numpy can only be in use, if it has been imported
+    return np is not None \
+        and type(value) is np.ndarray \
+        and not value.dtype.hasobject
+
+
+def is_arrow_table(value):
+    pa = sys.modules.get("pyarrow")
+    return pa is not None and isinstance(value, pa.Table)
+
+
+register_codec(PickleCodec())
+register_codec(NpyCodec(), is_numpy_array)
+register_codec(ArrowCodec(), is_arrow_table)
+
+
+class Compression:
+    """
+    Compression of the encoded result files. The compressed results are
+    decompressed into memory, so the arrays don't refer to the mapped file.
+    """
+
+    name = None
+
+    def compress(self, data: bytes) -> bytes:
+        raise NotImplementedError()
+
+    def decompress(self, buffer: memoryview) -> bytes:
+        raise NotImplementedError()
+
+
+class ZlibCompression(Compression):
+
+    name = "zlib"
+
+    def compress(self, data: bytes) -> bytes:
+        return zlib.compress(data, 1)
+
+    def decompress(self, buffer: memoryview) -> bytes:
+        return zlib.decompress(buffer)
+
+
+class ZstdCompression(Compression):
+    """
+    Requires zstandard
+    """
+
+    name = "zstd"
+
+    def compress(self, data: bytes) -> bytes:
+        import zstandard
+        return zstandard.ZstdCompressor().compress(data)
+
+    def decompress(self, buffer: memoryview) -> bytes:
+        import zstandard
+        return zstandard.ZstdDecompressor().decompress(buffer)
+
+
+class Lz4Compression(Compression):
+    """
+    Requires lz4
+    """
+
+    name = "lz4"
+
+    def compress(self, data: bytes) -> bytes:
+        import lz4.frame
+        return lz4.frame.compress(data)
+
+    def decompress(self, buffer: memoryview) -> bytes:
+        import lz4.frame
+        return lz4.frame.decompress(buffer)
+
+
+COMPRESSIONS = {}
+
+
+def register_compression(compression: Compression):
+    COMPRESSIONS[compression.name] = compression
+
+
+register_compression(ZlibCompression())
+register_compression(ZstdCompression())
+register_compression(Lz4Compression())
+
+
+def result_compression(name: str):
+    """
+    Returns the named compression or None for the uncompressed results
+    """
+    if name is None or name in ("", "none"):
+        return None
+    if name not in COMPRESSIONS:
+        raise ValueError(f"unknown result compression '{name}', "
+                         f"expected one of none, {', '.join(COMPRESSIONS)}")
+    return COMPRESSIONS[name]
+
+
+def result_codec(value) -> ResultCodec:
+    for type_check, name in TYPE_CODECS:
+        if type_check(value):
+            return CODECS[name]
+    return CODECS[DEFAULT_CODEC]
+
+
+def write_result(file_path: str, value, compression: str = None):
+    """
+    Writes the value into the result file using the codec selected by
+    the value type. The file is replaced atomically, because the older
+    version of the file may still be memory mapped.
+    """
+    codec = result_codec(value)
+    compressor = result_compression(compression)
+    # the results may be written by several threads
+    temp_path = f"{file_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(temp_path, "wb") as file:
+            header = RESULT_MAGIC + codec.name.encode()
+            if compressor is not None:
+                header += b" " + compressor.name.encode()
+            file.write(header.ljust(aligned(len(header) + 1) - 1) + b"\n")
+            if compressor is None:
+                codec.encode(value, file)
+            else:
+                encoded = io.BytesIO()
+                codec.encode(value, encoded)
+                file.write(compressor.compress(encoded.getbuffer()))
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def decode_result(buffer: memoryview, source: str):
+    """
+    Decodes the value from the result file content
+    """
+    if buffer[:len(RESULT_MAGIC)] != RESULT_MAGIC:
+        # plain pickle
+        return pickle.loads(buffer)
+
+    end = len(RESULT_MAGIC)
+    while end < len(buffer) and buffer[end] != ord("\n"):
+        end += 1
+    if end == len(buffer):
+        raise EOFError(f"result {source} is truncated")
+    names = bytes(buffer[len(RESULT_MAGIC):end]).decode().split()
+    name = names[0]
+    if name not in CODECS:
+        raise ValueError(f"result {source} uses unknown codec '{name}'")
+
+    payload = buffer[end + 1:]
+    if len(names) > 1:
+        if names[1] not in COMPRESSIONS:
+            raise ValueError(f"result {source} uses unknown compression '{names[1]}'")
+        # the decompressed arrays are writable like the copy-on-write mapped arrays
+        payload = memoryview(bytearray(COMPRESSIONS[names[1]].decompress(payload)))
+
+    return CODECS[name].decode(payload)
+
+
+def read_result(file_path: str):
+    """
+    Reads the value from the result file. The large files are memory mapped,
+    so that the large arrays are not read into memory, until they are modified.
+    Raises EOFError, if the file is empty or truncated.
+    """
+    with open(file_path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            raise EOFError(f"result {file_path} is empty")
+        if size < MAP_MIN_BYTES:
+            # the read arrays are writable like the copy-on-write mapped arrays
+            buffer = memoryview(bytearray(file.read()))
+        else:
+            buffer = memoryview(map_file(file))
+    return decode_result(buffer, file_path)
+
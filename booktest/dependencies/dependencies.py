@@ -315,6 +315,28 @@ async def call_function_test(dependencies, func, case, kwargs):
     return await call_test(function_method_caller, dependencies, func, case, kwargs)
 
 
+def input_files(*paths):
+    """
+    Declares the files or directories, which the test reads. With memoization,
+    the test is rerun, when the content of these files changes.
+    """
+    def decorator(func):
+        func._input_files = list(get_decorated_attr(func, "_input_files") or []) + list(paths)
+        return func
+
+    return decorator
+
+
+def ephemeral(func):
+    """
+    Marks the test result as transient. The result file is removed, when
+    the selected dependents of the test have finished, and the test is
+    rerun, when a dependent is run later.
+    """
+    func._ephemeral = True
+    return func
+
+
 def depends_on(*dependencies):
     """
     This method depends on a method on this object.
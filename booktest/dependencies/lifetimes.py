@@ -0,0 +1,53 @@
+from booktest.dependencies.dependencies import get_decorated_attr
+
+#
+# Releasing the test case results, which the selected cases don't need anymore
+#
+
+
+class ResultLifetimes:
+    """
+    Counts the unfinished dependents of each case result. A result can be
+    released, when its last dependent has finished, or right after the case,
+    if nothing in the run depends on it.
+    """
+
+    def __init__(self, dependencies: dict):
+        # case -> the dependencies of the case
+        self.dependencies = dependencies
+        self.done = set()
+        self.unfinished = {}
+        for name, case_dependencies in dependencies.items():
+            self.unfinished.setdefault(name, 0)
+            for dependency in case_dependencies:
+                self.unfinished[dependency] = self.unfinished.get(dependency, 0) + 1
+
+    @staticmethod
+    def of_cases(tests, cases):
+        return ResultLifetimes({name: tests.method_dependencies(tests.get_case(name), cases)
+                                for name in cases})
+
+    def unfinished_dependents(self, name):
+        return self.unfinished.get(name, 0)
+
+    def finished(self, name):
+        """
+        Marks the case finished. Returns the cases, whose
+        results are not needed anymore.
+        """
+        if name in self.done:
+            return []
+        self.done.add(name)
+
+        rv = []
+        if self.unfinished.get(name) == 0:
+            rv.append(name)
+        for dependency in self.dependencies.get(name, []):
+            self.unfinished[dependency] -= 1
+            if self.unfinished[dependency] == 0:
+                rv.append(dependency)
+        return rv
+
+
+def is_ephemeral(method):
+    return get_decorated_attr(method, "_ephemeral") is True
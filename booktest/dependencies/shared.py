@@ -0,0 +1,93 @@
+import os
+from multiprocessing import shared_memory
+
+from booktest.dependencies.codecs import decode_result, map_file
+
+#
+# Sharing the dependency results between the parallel worker processes
+#
+
+# smaller results are cheaper to read from the disk than to share
+SHARED_MIN_BYTES = 1024 * 1024
+
+# the POSIX shared memory segments are files in this directory on Linux
+SHARED_MEMORY_DIR = "/dev/shm"
+
+
+class SharedResults:
+    """
+    Shared memory segments owned by the parent process, which contain the
+    result files needed by several workers.
+
+    The workers map the segments copy-on-write and decode the results from
+    them instead of each deserializing its own copy from the disk. The
+    segment is released, when the last dependent has finished.
+    """
+
+    def __init__(self, min_bytes: int = SHARED_MIN_BYTES):
+        self.min_bytes = min_bytes
+        # result file path -> shared memory segment
+        self.segments = {}
+
+    def publish(self, bin_path: str):
+        """
+        Copies the result file into a shared memory segment, if the file is
+        large enough. Returns True, if the result was published.
+        """
+        if bin_path in self.segments or not os.path.exists(bin_path):
+            return False
+        size = os.path.getsize(bin_path)
+        if size < self.min_bytes:
+            return False
+
+        segment = shared_memory.SharedMemory(create=True, size=size)
+        try:
+            with open(bin_path, "rb") as file:
+                file.readinto(segment.buf[:size])
+        except BaseException:
+            segment.close()
+            segment.unlink()
+            raise
+
+        self.segments[bin_path] = (segment, size)
+        return True
+
+    def release(self, bin_path: str):
+        entry = self.segments.pop(bin_path, None)
+        if entry is not None:
+            segment, _ = entry
+            segment.close()
+            segment.unlink()
+
+    def segment_names(self, bin_paths):
+        """
+        Returns the segment names and sizes of the published results for the workers
+        """
+        return {bin_path: (self.segments[bin_path][0].name, self.segments[bin_path][1])
+                for bin_path in bin_paths
+                if bin_path in self.segments}
+
+    def close(self):
+        for bin_path in list(self.segments):
+            self.release(bin_path)
+
+
+def attach_result(bin_path: str, segment_name: str, size: int):
+    """
+    Decodes the result from the shared memory segment in the worker process.
+
+    The segment is mapped copy-on-write like the result files, so the arrays
+    in the result are writable and the modifications stay in the worker.
+    Where the segments are not files, the result is decoded from a copy.
+    """
+    segment_path = os.path.join(SHARED_MEMORY_DIR, segment_name)
+    if os.path.exists(segment_path):
+        with open(segment_path, "rb") as file:
+            buffer = memoryview(map_file(file))[:size]
+    else:
+        segment = shared_memory.SharedMemory(name=segment_name)
+        try:
+            buffer = memoryview(bytearray(segment.buf[:size]))
+        finally:
+            segment.close()
+    return decode_result(buffer, bin_path)
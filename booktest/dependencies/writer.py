@@ -0,0 +1,148 @@
+import os
+import queue
+import threading
+
+from booktest.dependencies.codecs import write_result
+
+#
+# Writing the test case results into the result files in the background
+#
+
+
+class PendingWrite:
+
+    def __init__(self, file_path: str, value, on_written):
+        self.file_path = file_path
+        self.value = value
+        self.on_written = on_written
+        self.error = None
+        self.done = threading.Event()
+        # called after the write, e.g. to report the case as finished
+        self.callbacks = []
+
+
+class ResultWriter:
+    """
+    Writes the results into the result files in a background thread, so that
+    encoding and writing large results is not on the test's critical path.
+
+    At most max_pending writes are queued, after which write() blocks. With
+    max_pending=0, the results are written synchronously. The files are
+    replaced atomically, so a crash never leaves a truncated result file.
+
+    Readers wait only for the pending write of the file they read.
+    """
+
+    def __init__(self, max_pending: int = 16, compression: str = None):
+        self.max_pending = max_pending
+        self.compression = compression
+        self.lock = threading.Lock()
+        # file path -> latest pending write of the file
+        self.pending = {}
+        self.errors = []
+        self.queue = None
+        self.thread = None
+
+    def write(self, file_path: str, value, on_written=None):
+        """
+        Writes the value into the file or removes the file, if the value
+        is None. on_written is called after a successful write in
+        the writing thread.
+        """
+        entry = PendingWrite(file_path, value, on_written)
+        if self.max_pending <= 0:
+            self._write(entry)
+            self._finish(entry)
+            return
+
+        with self.lock:
+            self.pending[file_path] = entry
+        if self.thread is None:
+            self.queue = queue.Queue(self.max_pending)
+            self.thread = threading.Thread(target=self._run, name="booktest-result-writer", daemon=True)
+            self.thread.start()
+        self.queue.put(entry)
+
+    def _write(self, entry):
+        try:
+            if entry.value is None:
+                if os.path.exists(entry.file_path):
+                    os.remove(entry.file_path)
+            else:
+                write_result(entry.file_path, entry.value, self.compression)
+            if entry.on_written is not None:
+                entry.on_written()
+        except Exception as e:
+            entry.error = e
+            self.errors.append((entry.file_path, e))
+            # the readers must not find the older result instead
+            if os.path.exists(entry.file_path):
+                os.remove(entry.file_path)
+
+    def _finish(self, entry):
+        with self.lock:
+            if self.pending.get(entry.file_path) is entry:
+                del self.pending[entry.file_path]
+            # the write doesn't keep the result in memory anymore
+            entry.value = None
+            callbacks = entry.callbacks
+            entry.callbacks = []
+        for callback in callbacks:
+            callback()
+        entry.done.set()
+
+    def _run(self):
+        while True:
+            entry = self.queue.get()
+            if entry is None:
+                break
+            self._write(entry)
+            self._finish(entry)
+
+    def is_pending(self, file_path: str):
+        with self.lock:
+            return file_path in self.pending
+
+    def wait(self, file_path: str):
+        """
+        Waits for the pending write of the file. Raises the write error, if the write failed.
+        """
+        with self.lock:
+            entry = self.pending.get(file_path)
+        if entry is not None:
+            entry.done.wait()
+            if entry.error is not None:
+                raise entry.error
+
+    def when_written(self, file_path: str, callback):
+        """
+        Calls the callback after the pending write of the file or immediately,
+        if the file is not being written
+        """
+        with self.lock:
+            entry = self.pending.get(file_path)
+            if entry is not None:
+                entry.callbacks.append(callback)
+                return
+        callback()
+
+    def flush(self):
+        """
+        Waits for all pending writes. Returns and forgets the failed
+        writes as (file path, error) pairs.
+        """
+        with self.lock:
+            entries = list(self.pending.values())
+        for entry in entries:
+            entry.done.wait()
+        errors = self.errors
+        self.errors = []
+        return errors
+
+    def close(self):
+        errors = self.flush()
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        return errors
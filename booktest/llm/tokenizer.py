@@ -1,14 +1,34 @@
+import re
+
 #
 # Text processing used in test
 #
 
 
+# the tokens of ASCII text: whitespace, numbers with an optional sign and
+# decimals, words and any other single character
+TOKEN_PATTERN = re.compile(r"[ \t]+|[+-]?[0-9]+(?:\.[0-9]+)?|[A-Za-z0-9]+|.", re.DOTALL)
+
+
+def tokenize(text: str) -> list:
+    """
+    Returns the tokens of the text as a list. The tokens are the
+    same as with TestTokenizer.
+    """
+    if text.isascii():
+        return TOKEN_PATTERN.findall(text)
+    return list(TestTokenizer(text))
+
+
 class TestTokenizer:
     """ simple tokenizer, that tokenizes whitespaces, words and numbers """
 
     def __init__(self, buf, at=0):
         self.buf = buf
         self.at = at
+        # unicode digits and letters are not covered by the pattern,
+        # so non-ASCII text is scanned character by character
+        self.pattern = TOKEN_PATTERN if buf.isascii() else None
 
     def __iter__(self):
         return self
@@ -25,6 +45,13 @@ class TestTokenizer:
     def __next__(self):
         if not self.has_next():
             raise StopIteration()
+        if self.pattern is not None:
+            match = self.pattern.match(self.buf, self.at)
+            self.at = match.end()
+            return match.group()
+        return self.scan_token()
+
+    def scan_token(self):
         c = self.peek()
         begin = self.at
         if c == " " or c == "\t":
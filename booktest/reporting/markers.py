@@ -0,0 +1,260 @@
+import json
+import os
+import sys
+import traceback
+from collections import defaultdict
+
+from booktest.llm.tokenizer import tokenize
+from booktest.reporting.colors import yellow, red, gray, cyan, dim_gray
+from booktest.reporting.reports import read_lines
+
+#
+# The test case report is recorded as markers of the differing output
+# lines, and the colored report is rendered only when it is shown
+#
+
+
+DIFF_POSITION = 60
+
+MARKERS_SUFFIX = ".markers.ndjson"
+
+# marker type -> priority, when the markers overlap
+MARKER_PRIORITIES = {'info': 1, 'diff': 2, 'fail': 3}
+
+MARKER_COLORS = {'fail': red, 'diff': yellow, 'info': cyan}
+
+SYMBOL_COLORS = {'!': red, '?': yellow}
+
+
+def marker_record(line_number, symbol, markers, exp_line, pos=None):
+    """
+    Returns the marker record of a differing output line. The line itself
+    is not stored, because it is in the test output file.
+    """
+    rv = {"line": line_number,
+          "symbol": symbol,
+          "markers": markers,
+          "exp": exp_line}
+    if pos is not None:
+        rv["pos"] = pos
+    return rv
+
+
+def text_record(line_number, text):
+    """
+    Returns the record of a plain report text written before the output
+    line with the number
+    """
+    return {"line": line_number, "text": text}
+
+
+def colorize_line_with_markers(line, markers):
+    """
+    Colorize a line using markers with priority handling.
+
+    There is no separate line-level vs token-level concept. All coloring is done
+    through markers. The methods info(), diff(), and fail() create markers from
+    (0, MAX_SIZE, type) that cover the entire line. Token-specific markers override
+    these when they have higher priority.
+
+    Priority order: fail > diff > info > none
+
+    Args:
+        line: The line text to colorize
+        markers: List of (start_pos, end_pos, marker_type) tuples
+
+    Returns:
+        Colored string with ANSI color codes
+    """
+    # Build position-to-marker map, resolving conflicts by priority
+    position_marker = {}
+    for start, end, marker_type in markers:
+        if start < 0:
+            continue
+        # Clamp end to line length (handles MAX_SIZE markers)
+        priority = MARKER_PRIORITIES.get(marker_type, 0)
+        for pos in range(start, min(end, len(line))):
+            if priority > MARKER_PRIORITIES.get(position_marker.get(pos), 0):
+                position_marker[pos] = marker_type
+
+    if not position_marker:
+        return line
+
+    # Build colored line from the segments of the same marker
+    result = ""
+    current_marker = None
+    current_start = 0
+    for pos in range(len(line) + 1):
+        marker_at_pos = position_marker.get(pos) if pos < len(line) else None
+        if marker_at_pos != current_marker or pos == len(line):
+            if current_start < pos:
+                segment = line[current_start:pos]
+                color = MARKER_COLORS.get(current_marker)
+                result += color(segment) if color is not None else segment
+            current_marker = marker_at_pos
+            current_start = pos
+
+    return result
+
+
+def colorize_expected_line(out_line, exp_line, markers):
+    """
+    Colorize the expected line by highlighting differing tokens.
+
+    The base text is shown in dim gray (more subtle than regular gray), while tokens
+    that differ from the new output are shown in regular gray for contrast.
+
+    Args:
+        out_line: The output line text
+        exp_line: The expected line text
+        markers: List of (start_pos, end_pos, marker_type) tuples from the output line
+
+    Returns:
+        Colored string with differing tokens highlighted
+    """
+    if not markers or not exp_line:
+        return dim_gray(exp_line)
+
+    # Tokenize both lines to find corresponding positions
+    out_tokens = tokenize(out_line)
+    exp_tokens = tokenize(exp_line)
+
+    # Build list of token positions in expected line that differ
+    differing_positions = set()
+    out_pos = 0
+    exp_pos = 0
+
+    for i, out_token in enumerate(out_tokens):
+        # Check if this output token has a marker
+        has_marker = any(start <= out_pos < end for start, end, _ in markers)
+
+        if i < len(exp_tokens):
+            exp_token = exp_tokens[i]
+            if has_marker and out_token != exp_token:
+                # Mark this position in expected line as differing
+                differing_positions.add((exp_pos, exp_pos + len(exp_token)))
+            exp_pos += len(exp_token)
+
+        out_pos += len(out_token)
+
+    if not differing_positions:
+        return dim_gray(exp_line)
+
+    result = ""
+    last_pos = 0
+    for start, end in sorted(differing_positions):
+        # Add dim gray text before this differing token
+        if start > last_pos:
+            result += dim_gray(exp_line[last_pos:start])
+        # Highlight the differing token in regular gray for contrast
+        result += gray(exp_line[start:end])
+        last_pos = end
+
+    # Add remaining dim gray text
+    if last_pos < len(exp_line):
+        result += dim_gray(exp_line[last_pos:])
+
+    return result
+
+
+def render_line(out_line, record=None):
+    """
+    Returns the report lines of an output line. The differing lines are
+    shown side by side with the snapshot line.
+    """
+    if record is None:
+        return [f"  {out_line}"]
+
+    symbol = record["symbol"]
+    markers = record["markers"]
+    color_fn = SYMBOL_COLORS.get(symbol, cyan)
+
+    # Pad the uncolored line to 60 chars, then apply coloring
+    # We need to pad before coloring to get correct alignment
+    if len(out_line) < DIFF_POSITION:
+        padded_line = out_line + " " * (DIFF_POSITION - len(out_line))
+        diff_separator = f" {dim_gray('≠')} "
+    else:
+        padded_line = out_line
+        diff_separator = f"\n{dim_gray('≠')} "
+
+    if len(markers) > 0:
+        # Use token-level coloring
+        try:
+            left_side = f"{color_fn(symbol)} {colorize_line_with_markers(padded_line, markers)}"
+        except Exception as e:
+            # Fallback to line-level coloring on error
+            print(f"Warning: token coloring failed: {e}", file=sys.stderr)
+            traceback.print_exc(file=sys.stderr)
+            left_side = color_fn(f"{symbol} {padded_line}")
+    else:
+        left_side = color_fn(f"{symbol} {padded_line}")
+
+    exp_line = record["exp"]
+    if exp_line is not None:
+        right_side = colorize_expected_line(out_line, exp_line, markers)
+    else:
+        right_side = gray("EOF")
+
+    rv = [f"{left_side}{diff_separator}{right_side}"]
+    if "pos" in record:
+        rv.append("  " + (" " * record["pos"]) + "^")
+    return rv
+
+
+def render_text(text):
+    """
+    Returns the report lines of a plain report text
+    """
+    if text.endswith("\n"):
+        text = text[:-1]
+    return text.split("\n")
+
+
+def render_report(out_lines, records):
+    """
+    Renders the report lines of the output lines and the marker records
+    """
+    texts = defaultdict(list)
+    markers = {}
+    for record in records:
+        if "text" in record:
+            texts[record["line"]].append(record["text"])
+        else:
+            markers[record["line"]] = record
+    for line_number, out_line in enumerate(out_lines):
+        for text in texts.pop(line_number, []):
+            yield from render_text(text)
+        yield from render_line(out_line, markers.get(line_number))
+    # the texts reported after the last output line
+    for line_number in sorted(texts):
+        for text in texts[line_number]:
+            yield from render_text(text)
+
+
+def read_case_report(exp_dir, out_dir, case_name_fs):
+    """
+    Returns the report lines of the test case.
+
+    The report is rendered from the test output and the marker records.
+    Accepted outputs are read from the snapshot directory. Reports without
+    marker records, like the ones of skipped cases, are read as such.
+    """
+    markers_file = os.path.join(out_dir, case_name_fs + MARKERS_SUFFIX)
+    if not os.path.exists(markers_file):
+        return read_lines(out_dir, case_name_fs + ".txt")
+
+    out_file = os.path.join(out_dir, case_name_fs + ".md")
+    if not os.path.exists(out_file):
+        out_file = os.path.join(exp_dir, case_name_fs + ".md")
+
+    # the lines may contain carriage returns, which are kept as such
+    out_lines = []
+    if os.path.exists(out_file):
+        with open(out_file, "r", newline="") as f:
+            out_lines = f.read().split("\n")[:-1]
+
+    with open(markers_file, "r") as f:
+        records = [json.loads(line) for line in f if len(line.strip()) > 0]
+
+    return list(render_report(out_lines, records))
@@ -16,6 +16,8 @@ class TestResult(Enum):
     OK = 1
     FAIL = 2
     DIFF = 3
+    # not run, because a dependency failed
+    SKIPPED = 4
 
 
 class SuccessState(Enum):
@@ -141,6 +143,104 @@ class Metrics:
         return Metrics.of_file(os.path.join(dir, "metrics.json"))
 
 
+class DurationHistory:
+    """
+    Stores rolling duration statistics for each case over several runs.
+
+    The exponentially weighted moving average (EWMA) is used as the expected
+    duration, so that a single noisy run doesn't change the estimates much.
+    The p95 is calculated over the most recent samples.
+    """
+
+    FILE_NAME = "durations.json"
+
+    # weight of the newest sample in the moving average
+    EWMA_ALPHA = 0.3
+
+    # how many recent samples are kept for the p95
+    MAX_SAMPLES = 20
+
+    def __init__(self, cases=None):
+        # case name -> {"ewma": float, "p95": float, "count": int, "samples": list}
+        if cases is None:
+            cases = {}
+        self.cases = cases
+
+    def update(self, case_name, duration_ms):
+        stats = self.cases.get(case_name)
+        if stats is None:
+            stats = {"ewma": float(duration_ms), "count": 0, "samples": []}
+            self.cases[case_name] = stats
+        else:
+            stats["ewma"] = \
+                self.EWMA_ALPHA * duration_ms + (1 - self.EWMA_ALPHA) * stats["ewma"]
+        samples = (stats["samples"] + [float(duration_ms)])[-self.MAX_SAMPLES:]
+        stats["samples"] = samples
+        stats["count"] += 1
+        ordered = sorted(samples)
+        stats["p95"] = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+
+    def update_all(self, cases):
+        """
+        Updates the history with (name, result, duration) case reports
+        """
+        for name, result, duration in cases:
+            # the skipped cases were not run, so they tell nothing about the duration
+            if result == TestResult.SKIPPED:
+                continue
+            self.update(name, duration)
+        return self
+
+    def ewma(self, case_name, default=None):
+        stats = self.cases.get(case_name)
+        return stats["ewma"] if stats is not None else default
+
+    def p95(self, case_name, default=None):
+        stats = self.cases.get(case_name)
+        return stats["p95"] if stats is not None else default
+
+    def count(self, case_name):
+        stats = self.cases.get(case_name)
+        return stats["count"] if stats is not None else 0
+
+    def durations(self):
+        """
+        Returns the expected duration of each case in milliseconds
+        """
+        return {name: stats["ewma"] for name, stats in self.cases.items()}
+
+    def to_dir(self, dir):
+        # write via temporary file, as the history is valuable and it
+        # must not be corrupted by an interrupted run
+        path = os.path.join(dir, self.FILE_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.cases, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def of_dir(dir):
+        path = os.path.join(dir, DurationHistory.FILE_NAME)
+        if not os.path.exists(path):
+            return DurationHistory()
+        try:
+            with open(path, "r") as f:
+                return DurationHistory(json.load(f))
+        except (ValueError, OSError) as e:
+            logging.warning(f"ignoring unreadable duration history {path}: {e}")
+            return DurationHistory()
+
+
+def format_duration(duration_ms):
+    """Format duration in human-readable form."""
+    if duration_ms >= 60000:
+        return f"{duration_ms / 60000:.1f} min"
+    elif duration_ms >= 1000:
+        return f"{duration_ms / 1000:.1f} s"
+    else:
+        return f"{int(duration_ms)} ms"
+
+
 class CaseReports:
     """
     This class manages the saved case specific metrics/results.
@@ -237,6 +337,8 @@ class CaseReports:
                         result = TestResult.DIFF
                     elif result_str == "FAIL":
                         result = TestResult.FAIL
+                    elif result_str == "SKIPPED":
+                        result = TestResult.SKIPPED
                     else:
                         raise Exception(f"{result_str}?")
 
@@ -306,6 +408,8 @@ class CaseReports:
                             result = TestResult.DIFF
                         elif result_str == "FAIL":
                             result = TestResult.FAIL
+                        elif result_str == "SKIPPED":
+                            result = TestResult.SKIPPED
                         else:
                             logging.warning(f"Unknown result type: {result_str}, treating as FAIL")
                             result = TestResult.FAIL
@@ -5,6 +5,7 @@ import difflib
 from typing import Optional
 
 from booktest.reporting.reports import TestResult, TwoDimensionalTestResult, CaseReports, UserRequest, read_lines, Metrics
+from booktest.reporting.markers import read_case_report
 from booktest.config.naming import to_filesystem_path
 
 
@@ -322,8 +323,11 @@ def case_review(exp_dir, out_dir, case_name, test_result, config):
                 print(f"    AI category: ACCEPT (confidence: {ai_result.confidence:.2f})")
                 print(f"    Skipping interactive mode (use -I to force interaction)")
 
-    do_interact = always_interactive
-    if not is_ok and not will_auto_freeze and not skip_interactive_due_to_ai:
+    # skipped cases have no output to review
+    is_skipped = (test_result == TestResult.SKIPPED)
+
+    do_interact = always_interactive and not is_skipped
+    if not is_ok and not is_skipped and not will_auto_freeze and not skip_interactive_due_to_ai:
         do_interact = do_interact or interactive
 
     if do_interact:
@@ -379,10 +383,26 @@ def case_review(exp_dir, out_dir, case_name, test_result, config):
     return rv, interaction, ai_result
 
 
-def start_report(printer):
+def start_report(printer, estimate_ms=None):
     printer()
     printer("# test results:")
     printer()
+    if estimate_ms is not None:
+        from booktest.reporting.colors import gray
+        from booktest.reporting.reports import format_duration
+        printer(gray(f"  estimated to take {format_duration(estimate_ms)}"))
+        printer()
+
+
+def report_cached_cases(printer, cases):
+    """
+    Reports the cases, which were not run, because their results were cached
+    """
+    from booktest.reporting.colors import gray
+    for case_name in cases:
+        printer(f"  {case_name} - {gray('cached')}")
+    if len(cases) > 0:
+        printer()
 
 
 def report_case_begin(printer,
@@ -464,6 +484,8 @@ def report_case_result(printer,
             printer(f"{yellow('DIFFERED')} in {int_took_ms} ms{ai_summary}")
         elif result == TestResult.FAIL:
             printer(f"{red('FAILED')} in {int_took_ms} ms{ai_summary}")
+        elif result == TestResult.SKIPPED:
+            printer(gray("skipped: dependency failed"))
 
 def maybe_print_logs(printer, config, out_dir, case_name):
     # Convert pytest-style name to filesystem path (:: → /)
@@ -509,7 +531,7 @@ def report_case(printer,
 
     if verbose:
         # report case content
-        for i in read_lines(out_dir, case_name_fs + ".txt"):
+        for i in read_case_report(exp_dir, out_dir, case_name_fs):
             printer(i)
 
     maybe_print_logs(printer, config, out_dir, case_name)
@@ -542,7 +564,7 @@ def end_report(printer, failed, tests, took_ms):
         tests: Total number of tests
         took_ms: Total time taken in milliseconds
     """
-    from booktest.reporting.colors import yellow, red
+    from booktest.reporting.colors import yellow, red, gray
 
     printer()
     if len(failed) > 0:
@@ -553,9 +575,11 @@ def end_report(printer, failed, tests, took_ms):
         if has_details:
             diff_count = sum(1 for _, result, _ in failed if result == TestResult.DIFF)
             fail_count = sum(1 for _, result, _ in failed if result == TestResult.FAIL)
+            skip_count = sum(1 for _, result, _ in failed if result == TestResult.SKIPPED)
         else:
             diff_count = 0
             fail_count = len(failed)
+            skip_count = 0
 
         # Build summary message
         parts = []
@@ -563,6 +587,8 @@ def end_report(printer, failed, tests, took_ms):
             parts.append(f"{diff_count} differed")
         if fail_count > 0:
             parts.append(f"{fail_count} failed")
+        if skip_count > 0:
+            parts.append(f"{skip_count} skipped")
 
         summary = " and ".join(parts) if parts else "failed"
         printer(f"{len(failed)}/{tests} test {summary} in {took_ms} ms:")
@@ -579,6 +605,8 @@ def end_report(printer, failed, tests, took_ms):
                 # Add color and status
                 if result == TestResult.DIFF:
                     status = yellow("DIFF")
+                elif result == TestResult.SKIPPED:
+                    status = gray("SKIPPED")
                 else:
                     status = red("FAIL")
 
@@ -500,13 +500,66 @@ class DVCStorage(SnapshotStorage):
             return False
 
     @staticmethod
-    def merge_batch_manifests(manifest_path: str, batch_dirs: list) -> None:
+    def read_batch_manifest(batch_dir: str) -> dict:
         """
-        Merge manifest updates from parallel batch runs into main manifest.
+        Read the manifest updates of a parallel batch run.
+
+        Args:
+            batch_dir: Batch directory path
+
+        Returns:
+            Dict mapping test ids to their snapshot updates. Empty, if the batch has no updates.
+        """
+        batch_manifest_file = Path(batch_dir) / "manifest_updates.yaml"
+        if not batch_manifest_file.exists():
+            return {}
+
+        # Skip empty or whitespace-only files to avoid parse errors
+        try:
+            content = batch_manifest_file.read_text().strip()
+            if not content:
+                return {}
+        except Exception:
+            # If we can't read the file, skip it
+            return {}
+
+        try:
+            import yaml
+            return yaml.safe_load(content) or {}
+        except ImportError:
+            try:
+                import json
+                return json.loads(content) or {}
+            except json.JSONDecodeError:
+                # Empty or invalid JSON file, skip it
+                return {}
+
+    @staticmethod
+    def add_manifest_updates(updates: dict, batch_updates: dict) -> dict:
+        """
+        Add batch manifest updates into the accumulated updates.
+
+        Args:
+            updates: Accumulated updates, which are modified in place
+            batch_updates: Updates of a single batch
+
+        Returns:
+            The accumulated updates
+        """
+        for test_id, snapshots in batch_updates.items():
+            if test_id not in updates:
+                updates[test_id] = {}
+            updates[test_id].update(snapshots)
+        return updates
+
+    @staticmethod
+    def merge_manifest_updates(manifest_path: str, updates: dict) -> None:
+        """
+        Merge accumulated manifest updates into main manifest.
 
         Args:
             manifest_path: Path to main manifest file
-            batch_dirs: List of batch directory paths
+            updates: Dict mapping test ids to their snapshot updates
         """
         # Load main manifest
         main_manifest_path = Path(manifest_path)
@@ -528,39 +581,7 @@ class DVCStorage(SnapshotStorage):
         else:
             main_manifest = {}
 
-        # Merge batch manifests
-        for batch_dir in batch_dirs:
-            batch_manifest_file = Path(batch_dir) / "manifest_updates.yaml"
-            if not batch_manifest_file.exists():
-                continue
-
-            # Skip empty or whitespace-only files to avoid parse errors
-            try:
-                content = batch_manifest_file.read_text().strip()
-                if not content:
-                    continue
-            except Exception:
-                # If we can't read the file, skip it
-                continue
-
-            try:
-                import yaml
-                with open(batch_manifest_file, 'r') as f:
-                    batch_updates = yaml.safe_load(f) or {}
-            except ImportError:
-                try:
-                    import json
-                    with open(batch_manifest_file, 'r') as f:
-                        batch_updates = json.load(f) or {}
-                except json.JSONDecodeError:
-                    # Empty or invalid JSON file, skip it
-                    continue
-
-            # Merge updates
-            for test_id, snapshots in batch_updates.items():
-                if test_id not in main_manifest:
-                    main_manifest[test_id] = {}
-                main_manifest[test_id].update(snapshots)
+        DVCStorage.add_manifest_updates(main_manifest, updates)
 
         # Save merged manifest with sorted keys for deterministic output
         try:
@@ -586,6 +607,20 @@ class DVCStorage(SnapshotStorage):
             with open(main_manifest_path, 'w') as f:
                 json.dump(data, f, indent=2, sort_keys=True)
 
+    @staticmethod
+    def merge_batch_manifests(manifest_path: str, batch_dirs: list) -> None:
+        """
+        Merge manifest updates from parallel batch runs into main manifest.
+
+        Args:
+            manifest_path: Path to main manifest file
+            batch_dirs: List of batch directory paths
+        """
+        updates = {}
+        for batch_dir in batch_dirs:
+            DVCStorage.add_manifest_updates(updates, DVCStorage.read_batch_manifest(batch_dir))
+        DVCStorage.merge_manifest_updates(manifest_path, updates)
+
     def _check_dvc_available(self) -> bool:
         """Check if DVC is installed and configured."""
         return self.is_available()
@@ -3,12 +3,27 @@ import functools
 from booktest.utils.coroutines import maybe_async_call
 import importlib.resources as rs
 import os
+import shutil
 
 
 def accept_all(_):
     return True
 
 
+def ensure_dir(dir: str):
+    """
+    Creates the directory with its parents, if it doesn't exist
+    """
+    os.makedirs(dir, exist_ok=True)
+
+
+def remove_dir(dir: str):
+    """
+    Removes the directory tree, if it exists
+    """
+    shutil.rmtree(dir, ignore_errors=True)
+
+
 def path_to_module_resource(path: str):
     """
     DEPRECATED: Old API that doesn't handle dots in filenames.
@@ -1,7 +1,9 @@
 import os
+import shutil
 import sys
 
 import booktest as bt
+from booktest.reporting.reports import CaseReports, Metrics
 
 import subprocess
 
@@ -144,6 +146,54 @@ def test_parallel(t: bt.TestCaseRun, context: str):
     t_cli(t, ["-p"], context)
 
 
+@bt.depends_on(PREDICTOR_CONTEXT)
+def test_parallel_forkserver(t: bt.TestCaseRun, context: str):
+    t.h1("description:")
+    t.tln("forkserver start method preloads the test modules in the server process")
+    t_cli(t, ["-p", "--start-method", "forkserver"], context)
+
+
+@bt.depends_on(PREDICTOR_CONTEXT)
+def test_parallel_fork(t: bt.TestCaseRun, context: str):
+    t.h1("description:")
+    t.tln("fork start method forks the workers from the process, that has already imported the tests")
+    t_cli(t, ["-p", "--start-method", "fork"], context)
+
+
+@bt.depends_on(PREDICTOR_CONTEXT)
+def test_parallel_metrics(t: bt.TestCaseRun, context: str):
+    t.h1("description:")
+    t.tln("the cases are reported before their batches finish, but the run")
+    t.tln("metrics are written only after the last batch has finished. without")
+    t.tln("the duration history, each case is run as a separate batch")
+
+    # the project is copied to run it without the duration history
+    project_dir = t.tmp_path("predictor")
+    shutil.copytree(context,
+                    project_dir,
+                    ignore=shutil.ignore_patterns(".out", "__pycache__"))
+    out_dir = os.path.join(project_dir, "books", ".out")
+
+    with BooktestProcess(["-p1"], project_dir, t.tmp_file("out.txt"), t.tmp_file("err.txt")):
+        pass
+
+    took_ms = Metrics.of_dir(out_dir).took_ms
+    durations = [duration for _, _, duration in CaseReports.of_dir(out_dir).cases]
+    with open(os.path.join(out_dir, "log.txt")) as f:
+        workers = set(re.findall(r"to worker (\d+)", f.read()))
+    batches_dir = os.path.join(out_dir, ".batches")
+    batches = os.listdir(batches_dir)
+    batch_metrics = [i for i in batches
+                     if os.path.exists(os.path.join(batches_dir, i, "metrics.json"))]
+
+    t.h1("metrics:")
+    t.tln(f" * workers: {len(workers)}")
+    t.tln(f" * cases: {len(durations)}")
+    t.tln(f" * batches: {len(batches)}")
+    t.tln(f" * batch metrics: {len(batch_metrics)}")
+    t.t(" * the run took longer than its slowest case..").assertln(took_ms >= max(durations))
+
+
 @bt.depends_on(PREDICTOR_CONTEXT)
 def test_narrow_detection(t: bt.TestCaseRun, context: str):
     t.h1("description:")
@@ -157,7 +207,8 @@ def test_narrow_detection(t: bt.TestCaseRun, context: str):
 @bt.depends_on(TIMEOUT_CONTEXT)
 def test_timeout(t: bt.TestCaseRun, context: str):
     t.h1("description:")
-    t.tln("this test verifies that the slow test will fail with 1s timeout")
+    t.tln("this test verifies that the slow test will fail with 2s timeout")
+    t.tln("and that its worker is terminated before the test finishes")
     t_cli(t, ["-p", "--timeout", "2"], context)
 
 
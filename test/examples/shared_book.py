@@ -0,0 +1,19 @@
+import numpy as np
+
+import booktest as bt
+
+
+def test_features(t: bt.TestCaseRun):
+    features = np.ones((1000, 256))
+    t.tln(f"created {features.shape[0]}x{features.shape[1]} features")
+    return features
+
+
+@bt.depends_on(test_features)
+def test_feature_sum(t: bt.TestCaseRun, features):
+    t.tln(f"sum is {features.sum()}")
+
+
+@bt.depends_on(test_features)
+def test_feature_mean(t: bt.TestCaseRun, features):
+    t.tln(f"mean is {features.mean()}")
@@ -0,0 +1,56 @@
+import contextlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import booktest as bt
+from booktest.config.detection import get_module_tests, BookTestSetup
+from booktest.core.runs import ParallelRunner
+from booktest.reporting.reports import CaseReports, TestResult
+
+
+def exec_tests(tests, root_dir, args, cache=None, extra_default_config: dict = {}):
+    """
+    Runs the tests with the arguments and returns the exit code. The printed
+    output is discarded.
+
+    The run is executed in another thread, because the calling test already
+    runs in an event loop.
+    """
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(1) as executor:
+        return executor.submit(tests.exec,
+                               root_dir,
+                               args,
+                               cache,
+                               extra_default_config).result()
+
+
+def exec_and_report(t, tests, root_dir, args, ran: list, extra_default_config: dict = {}):
+    """
+    Runs the tests like exec_tests and prints the cases, which were run, and
+    the reported results. The test cases record their names into the ran list,
+    which is cleared before the run.
+    """
+    ran.clear()
+    exit_code = exec_tests(tests, root_dir, args, extra_default_config=extra_default_config)
+    reports = CaseReports.of_dir(os.path.join(root_dir, ".out"))
+    results = ", ".join(f"{name} {result.name}" for name, result, _ in reports.cases)
+    t.tln(f" * ran {', '.join(ran)}; reports: {results}")
+    return exit_code
+
+
+def simple_runner(t: bt.TestCaseRun, durations: dict, config: dict, book="simple_book"):
+    """
+    Returns a parallel runner for the cases of the example book. The durations
+    are used as the case durations of the previous run.
+    """
+    tests = bt.merge_tests(get_module_tests(f"test/examples/{book}.py", f"test.examples.{book}"))
+    cases = tests.all_names()
+    reports = CaseReports([(name, TestResult.OK, duration) for name, duration in durations.items()])
+    return ParallelRunner("books",
+                          t.tmp_path("out"),
+                          tests,
+                          cases,
+                          config,
+                          BookTestSetup(),
+                          reports)
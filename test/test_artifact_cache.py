@@ -0,0 +1,111 @@
+import os
+import shutil
+
+import booktest as bt
+from booktest.core.artifacts import ArtifactCache
+from test.nested_runs import exec_and_report
+
+
+def write_file(file_path, content):
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    with open(file_path, "w") as f:
+        f.write(content)
+
+
+def read_file(file_path):
+    with open(file_path) as f:
+        return f.read()
+
+
+def test_artifact_cache(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the artifact cache stores the case results, outputs and files by the")
+    t.tln("case fingerprint and removes the least recently used entries, when trimmed")
+
+    cache = ArtifactCache(t.tmp_path("cache"), 100)
+    bin_path = t.tmp_file("out/case.bin")
+    out_md = t.tmp_file("out/case.md")
+    exp_md = t.tmp_file("books/case.md")
+    write_file(bin_path, "result")
+    write_file(out_md, "output\n")
+    write_file(exp_md, "output\n")
+    write_file(t.tmp_file("out/case/image.png"), "image")
+
+    t.h1("publish:")
+    t.t(" * new entry is published..").assertln(
+        cache.publish("aa01", "case", bin_path, out_md, exp_md, 100))
+    t.t(" * existing entry is kept..").assertln(
+        not cache.publish("aa01", "case", bin_path, out_md, exp_md, 100))
+    write_file(out_md, "changed output\n")
+    t.t(" * differing output is not published..").assertln(
+        not cache.publish("aa02", "case", bin_path, out_md, exp_md, 100))
+
+    t.h1("fetch:")
+    fetched_bin = t.tmp_file("fetched/case.bin")
+    fetched_md = t.tmp_file("fetched/case.md")
+    t.tln(f" * duration of the cached case: {cache.fetch('aa01', fetched_bin, fetched_md, exp_md)} ms")
+    t.t(" * result is fetched..").assertln(read_file(fetched_bin) == "result")
+    t.t(" * output is fetched..").assertln(read_file(fetched_md) == "output\n")
+    t.t(" * case files are fetched..").assertln(
+        read_file(t.tmp_file("fetched/case/image.png")) == "image")
+    t.tln(f" * missing entry: {cache.fetch('bb01', fetched_bin, fetched_md, exp_md)}")
+    write_file(exp_md, "new snapshot\n")
+    t.tln(f" * entry not matching the snapshot: {cache.fetch('aa01', fetched_bin, fetched_md, exp_md)}")
+
+    t.h1("size limit:")
+    write_file(out_md, "new snapshot\n")
+    shutil.rmtree(t.tmp_file("out/case"))
+    for i in range(5):
+        write_file(bin_path, "x" * 30)
+        cache.publish(f"cc{i:02d}", f"case{i}", bin_path, out_md, exp_md, 100)
+    t.tln(f" * entries before trimming: {len(cache.entries())}")
+    cache.trim()
+    entries = sorted(os.path.basename(entry) for _, _, entry in cache.entries())
+    t.tln(f" * kept entries: {', '.join(entries)}")
+    t.t(" * cache fits the limit..").assertln(cache.size() <= 100)
+
+
+def test_shared_artifacts(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("with memoize=1 and artifact_cache, a machine without a local result")
+    t.tln("fetches the unchanged producer from the cache instead of rerunning it")
+
+    artifact_dir = t.tmp_path("artifacts")
+    ran = []
+
+    def produce(t: bt.TestCaseRun):
+        ran.append("produce")
+        with open(t.file("value.txt"), "w") as f:
+            f.write("42")
+        t.tln("produced 42, see [value](produce/value.txt)")
+        return 42
+
+    @bt.depends_on(produce)
+    def consume(t: bt.TestCaseRun, value):
+        ran.append("consume")
+        t.tln(f"consumed {value}")
+
+    tests = bt.Tests([("shared/produce", produce), ("shared/consume", consume)])
+
+    def run(root_dir, *args):
+        exec_and_report(t,
+                        tests,
+                        root_dir,
+                        list(args) + ["shared"],
+                        ran,
+                        {"memoize": True, "artifact_cache": artifact_dir})
+
+    t.h1("first machine:")
+    first = t.tmp_path("first")
+    run(first, "-a")
+
+    t.h1("second machine:")
+    second = t.tmp_path("second")
+    # the second machine has the same snapshots, but no results
+    shutil.copytree(first, second, ignore=shutil.ignore_patterns(".out"))
+    run(second)
+    fetched = read_file(os.path.join(second, ".out", "shared", "produce.md"))
+    accepted = read_file(os.path.join(first, "shared", "produce.md"))
+    t.t(" * fetched output matches..").assertln(fetched == accepted)
+    t.t(" * fetched output refers to the fetched file..").assertln(
+        read_file(os.path.join(second, ".out", "shared", "produce", "value.txt")) == "42")
@@ -0,0 +1,96 @@
+import os
+
+import booktest as bt
+from booktest.core.runs import ParallelRunner, BatchMerger
+from booktest.reporting.reports import read_lines
+from test.nested_runs import simple_runner
+
+
+def t_plan(t: bt.TestCaseRun, runner: ParallelRunner, plan_target: int):
+    for names, _ in runner.plan(plan_target):
+        t.tln(f" * task with {len(names)} cases:")
+        for name in names:
+            t.tln(f"   - {name}")
+
+
+def test_batch_planning(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("cases known to be fast are batched into a single worker task. the batch")
+    t.tln("size adapts to the ready work, so that all free workers get work")
+
+    durations = {
+        "test/examples/simple_book.py::test_simple": 10,
+        "test/examples/simple_book.py::test_cache": 20,
+        "test/examples/simple_book.py::test_cache_use": 30
+    }
+
+    t.h1("one free worker:")
+    t_plan(t, simple_runner(t, durations, {"parallel": 2}), 1)
+
+    t.h1("two free workers:")
+    t_plan(t, simple_runner(t, durations, {"parallel": 2}), 2)
+
+    t.h1("test_cache done, one free worker:")
+    runner = simple_runner(t, durations, {"parallel": 2})
+    runner.pop_ready()
+    runner.pop_ready()
+    runner.case_done("test/examples/simple_book.py::test_cache")
+    runner.push_ready("test/examples/simple_book.py::test_simple")
+    t_plan(t, runner, 1)
+
+    t.h1("batching disabled:")
+    runner = simple_runner(t, durations, {"parallel": 2, "parallel_batch_ms": "0"})
+    t_plan(t, runner, 2)
+
+    t.h1("cases without history are not batched:")
+    runner = simple_runner(t, {}, {"parallel": 2})
+    t_plan(t, runner, 2)
+
+
+def test_batch_merging(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("batch outputs are merged into the output directory as the batches")
+    t.tln("finish. the merged files replace the old outputs on finish. the DVC")
+    t.tln("manifest updates of the batches are written into the manifest once")
+
+    out_dir = t.tmp_dir("merged")
+    manifest_path = t.tmp_file("booktest.manifest.yaml")
+    batch_dirs = []
+    for i in range(3):
+        batch_dir = t.tmp_dir(f"batch{i}")
+        with open(os.path.join(batch_dir, "output.txt"), "w") as f:
+            f.write(f"batch {i} line 1\nbatch {i} line 2")
+        batch_dirs.append(batch_dir)
+
+    # the first and the last batch update the snapshots of the same case
+    with open(os.path.join(batch_dirs[0], "manifest_updates.yaml"), "w") as f:
+        f.write("test/case0:\n  md: sha256:new0\n")
+    with open(os.path.join(batch_dirs[2], "manifest_updates.yaml"), "w") as f:
+        f.write("test/case0:\n  png: sha256:png0\ntest/case2:\n  md: sha256:new2\n")
+
+    with open(os.path.join(out_dir, "output.txt"), "w") as f:
+        f.write("old output\n")
+    with open(manifest_path, "w") as f:
+        f.write("storage_mode: dvc\ntest/case0:\n  md: sha256:old0\ntest/case1:\n  md: sha256:old1\n")
+
+    merger = BatchMerger(out_dir, {"storage.mode": "git"})
+    # the merging doesn't depend on whether dvc is installed
+    merger.manifest_path = manifest_path
+    merger.merge(batch_dirs[0])
+    merger.merge(batch_dirs[1])
+
+    t.h1("during the run:")
+    t.tln(f" * output.txt: {read_lines(out_dir, 'output.txt')}")
+    t.tln(" * manifest:")
+    for line in read_lines(manifest_path):
+        t.tln(f"   {line}")
+
+    merger.finish(batch_dirs)
+
+    t.h1("after finish:")
+    for line in read_lines(out_dir, "output.txt"):
+        t.tln(f" * {line}")
+    t.tln(f" * files: {sorted(os.listdir(out_dir))}")
+    t.tln(" * manifest:")
+    for line in read_lines(manifest_path):
+        t.tln(f"   {line}")
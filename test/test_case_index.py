@@ -0,0 +1,80 @@
+import time
+
+import booktest as bt
+
+
+class Source:
+
+    def value(self, t):
+        return 1
+
+
+def chain_tests(count: int):
+    """
+    Creates count cases, where each case depends on the previous case
+    """
+    cases = []
+    previous = None
+    for i in range(count):
+        if previous is None:
+            def case(t):
+                return 0
+        else:
+            @bt.depends_on(previous)
+            def case(t, value):
+                return value + 1
+        cases.append((f"chain/case{i:05d}", case))
+        previous = case
+    return bt.Tests(cases)
+
+
+def test_case_index(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the cases are indexed by name and by test function, and each")
+    t.tln("case is visited once in the dependency search, so that the selection")
+    t.tln("is linear in the number of cases")
+
+    first = Source()
+    second = Source()
+
+    @bt.depends_on(first.value)
+    def left(t, value):
+        return value
+
+    @bt.depends_on(first.value, second.value)
+    def right(t, first_value, second_value):
+        return first_value + second_value
+
+    @bt.depends_on(right, left)
+    def top(t, right_value, left_value):
+        return right_value + left_value
+
+    tests = bt.Tests([("diamond/top", top),
+                      ("diamond/left", left),
+                      ("diamond/right", right),
+                      ("second/value", second.value),
+                      ("first/value", first.value)])
+
+    t.h1("lookups:")
+    t.t(" * case by name..").assertln(tests.get_case("diamond/left") == left)
+    t.t(" * missing case..").assertln(tests.get_case("diamond/bottom") is None)
+    t.t(" * bound method matches its own object..").assertln(
+        tests.case_by_method(second.value) == "second/value")
+    t.t(" * unbound function matches the first case..").assertln(
+        tests.case_by_method(Source.value) == "second/value")
+    tests.cases.append(("third/value", Source().value))
+    t.t(" * appended cases are indexed..").assertln(tests.get_case("third/value") is not None)
+
+    t.h1("selection of diamond/top:")
+    for name in tests.selected_names(["diamond/top"]):
+        t.tln(f" * {name}")
+
+    t.h1("long dependency chain:")
+    chain = chain_tests(2000)
+    before = time.time()
+    selected = chain.selected_names(["chain"])
+    took_ms = 1000 * (time.time() - before)
+    t.t(" * all cases are selected in order..").assertln(selected == chain.all_names())
+    t.t(" * the last case depends on all the cases..").assertln(
+        chain.dependency_order(["chain/case01999"], ["chain/case01999"]) == selected)
+    t.iln(f" * selection took {took_ms:.0f} ms")
@@ -0,0 +1,24 @@
+import booktest as bt
+from booktest.reporting.reports import DurationHistory, TestResult
+
+
+def test_duration_history(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("case durations are tracked over runs as a moving average and p95,")
+    t.tln("so that a single noisy run doesn't scramble the estimates")
+
+    history = DurationHistory()
+    for duration in [100, 110, 90, 100, 105, 95, 100, 1000, 100, 100]:
+        history.update_all([("slow", TestResult.OK, 10 * duration),
+                            ("fast", TestResult.OK, duration)])
+
+    t.h1("statistics:")
+    t.tln(f" * fast: avg {history.ewma('fast'):.1f} ms, p95 {history.p95('fast'):.1f} ms, {history.count('fast')} runs")
+    t.tln(f" * slow: avg {history.ewma('slow'):.1f} ms, p95 {history.p95('slow'):.1f} ms, {history.count('slow')} runs")
+    t.tln(f" * unknown: avg {history.ewma('unknown')}, {history.count('unknown')} runs")
+
+    t.h1("persistence:")
+    history.to_dir(t.tmp_dir("out"))
+    loaded = DurationHistory.of_dir(t.tmp_path("out"))
+    t.t(" * history is restored..").assertln(loaded.cases == history.cases)
+    t.t(" * missing history is empty..").assertln(len(DurationHistory.of_dir(t.tmp_path("missing")).cases) == 0)
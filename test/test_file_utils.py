@@ -0,0 +1,48 @@
+import os
+import shutil
+
+import booktest as bt
+from booktest.utils.utils import ensure_dir, remove_dir
+from test.nested_runs import exec_tests
+
+
+def test_dir_creation(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("test directories are created in-process. a directory removed by")
+    t.tln("other means is created again, when it is needed")
+
+    root = t.tmp_path("dirs")
+    nested = os.path.join(root, "a", "b")
+
+    t.h1("create:")
+    ensure_dir(nested)
+    t.t(" * nested directory exists..").assertln(os.path.isdir(nested))
+
+    t.h1("remove:")
+    remove_dir(root)
+    t.t(" * directory is removed..").assertln(not os.path.exists(root))
+    ensure_dir(nested)
+    t.t(" * nested directory exists again..").assertln(os.path.isdir(nested))
+
+    t.h1("remove externally:")
+    shutil.rmtree(root)
+    ensure_dir(nested)
+    t.t(" * nested directory exists again..").assertln(os.path.isdir(nested))
+
+
+def test_removed_out_dir(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the tests can be run again in the same process, after their output")
+    t.tln("directory has been removed")
+
+    root_dir = t.tmp_path("books")
+
+    def hello(t: bt.TestCaseRun):
+        t.tln("hello")
+
+    tests = bt.Tests([("dirs/hello", hello)])
+
+    t.h1("runs:")
+    t.tln(f" * first run: {exec_tests(tests, root_dir, ['-a', 'dirs'])}")
+    shutil.rmtree(os.path.join(root_dir, ".out"))
+    t.tln(f" * run after removing .out: {exec_tests(tests, root_dir, ['dirs'])}")
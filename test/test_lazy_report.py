@@ -0,0 +1,53 @@
+import os
+import re
+
+import booktest as bt
+from booktest.core.testrun import write_skipped_case
+from booktest.reporting.markers import MARKERS_SUFFIX, read_case_report
+from test.nested_runs import exec_tests
+
+
+VALUES = {}
+
+ANSI_CODE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def test_lazy_report(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the test run records only the markers of the differing lines. the")
+    t.tln("report is rendered from the output and the markers, when it is shown.")
+    t.tln("the texts written with report() are recorded as such")
+
+    root_dir = t.tmp_path("books")
+    out_dir = os.path.join(root_dir, ".out")
+
+    def report(t: bt.TestCaseRun):
+        t.h1("values:")
+        t.tln(f"accuracy is {VALUES['accuracy']}")
+        t.report("  (reported only)")
+        t.tln("unchanged line")
+        t.t("loss..").assertln(VALUES["loss"] < 0.2)
+
+    tests = bt.Tests([("lazy/report", report)])
+
+    def run(*args):
+        exec_tests(tests, root_dir, list(args) + ["lazy"])
+        case_path = os.path.join(out_dir, "lazy", "report")
+        with open(case_path + MARKERS_SUFFIX) as f:
+            t.tln(f" * records: {len(f.readlines())}")
+        t.tln(f" * report rendered during the run: {os.path.exists(case_path + '.txt')}")
+        for line in read_case_report(root_dir, out_dir, "lazy/report"):
+            t.tln(f"   {ANSI_CODE.sub('', line.rstrip())}")
+
+    t.h1("snapshot:")
+    VALUES.update({"accuracy": 0.95, "loss": 0.12})
+    run("-a")
+
+    t.h1("changed output:")
+    VALUES.update({"accuracy": 0.93, "loss": 0.25})
+    run()
+
+    t.h1("skipped report:")
+    write_skipped_case(out_dir, "lazy/report", ["lazy/data"])
+    for line in read_case_report(root_dir, out_dir, "lazy/report"):
+        t.tln(f"   {line}")
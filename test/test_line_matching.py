@@ -0,0 +1,47 @@
+import os
+import re
+
+import booktest as bt
+from booktest.reporting.reports import CaseReports
+from booktest.reporting.markers import read_case_report
+from test.nested_runs import exec_tests
+
+
+VALUES = {}
+
+ANSI_CODE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+def test_line_matching(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("lines matching the snapshot are appended in one step. the differing")
+    t.tln("lines are still compared and marked token by token")
+
+    root_dir = t.tmp_path("books")
+
+    def report(t: bt.TestCaseRun):
+        t.tln(f"accuracy is {VALUES['accuracy']} and loss is {VALUES['loss']}")
+        t.t("split ").t("line ").tln(VALUES["split"])
+        t.iln(f"took {VALUES['took']} ms")
+        t.tln("unchanged line")
+
+    tests = bt.Tests([("matching/report", report)])
+
+    def run(*args):
+        exec_tests(tests, root_dir, list(args) + ["matching"])
+        out_dir = os.path.join(root_dir, ".out")
+        results = ", ".join(result.name for _, result, _ in CaseReports.of_dir(out_dir).cases)
+        t.tln(f" * result: {results}")
+        for line in read_case_report(root_dir, out_dir, "matching/report"):
+            t.tln(f"   {ANSI_CODE.sub('', line.rstrip())}")
+
+    t.h1("snapshot:")
+    VALUES.update({"accuracy": 0.95, "loss": 0.12, "split": 1, "took": 10})
+    run("-a")
+
+    t.h1("same output:")
+    run()
+
+    t.h1("changed output:")
+    VALUES.update({"loss": 0.15, "split": 2, "took": 12})
+    run()
@@ -0,0 +1,114 @@
+import os
+
+import booktest as bt
+from booktest.core.fingerprints import Fingerprints
+from booktest.dependencies.codecs import write_result
+from booktest.reporting.reports import CaseReports, TestResult
+from booktest.utils.utils import ensure_dir
+from booktest.config.detection import get_module_tests
+from test.nested_runs import exec_and_report
+
+
+def test_fingerprints(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("case results are stored with a fingerprint of the test source, its module,")
+    t.tln("its dependencies and input files. unchanged cases with a successful")
+    t.tln("previous run are cached, until their snapshot changes")
+
+    tests = bt.merge_tests(get_module_tests("test/examples/simple_book.py", "test.examples.simple_book"))
+    cache = "test/examples/simple_book.py::test_cache"
+    cache_use = "test/examples/simple_book.py::test_cache_use"
+    simple = "test/examples/simple_book.py::test_simple"
+    cases = tests.all_names()
+
+    exp_dir = t.tmp_path("books")
+    out_dir = t.tmp_path("out")
+    fingerprints = Fingerprints(tests, exp_dir)
+    _, exp_md = fingerprints.output_paths(out_dir, cache)
+    ensure_dir(os.path.dirname(exp_md))
+    with open(exp_md, "w") as file:
+        file.write("cached\n")
+    bin_path = tests.test_result_path(out_dir, cache)
+    ensure_dir(os.path.dirname(bin_path))
+    write_result(bin_path, "foo")
+    fingerprints.write(out_dir, cache)
+
+    ok_reports = CaseReports([(name, TestResult.OK, 10) for name in cases])
+
+    t.h1("fingerprints:")
+    t.t(" * fingerprints are stable..").assertln(
+        fingerprints.fingerprint(cache) == Fingerprints(tests, exp_dir).fingerprint(cache))
+    t.t(" * dependents have own fingerprints..").assertln(
+        fingerprints.fingerprint(cache) != fingerprints.fingerprint(cache_use))
+
+    t.h1("unchanged result:")
+    cached, todo = fingerprints.cached_cases(out_dir, cases, ok_reports)
+    t.tln(f" * cached: {', '.join(cached)}")
+    t.tln(f" * todo: {', '.join(todo)}")
+
+    t.h1("previous run differed:")
+    diff_reports = CaseReports([(cache, TestResult.DIFF, 10)])
+    cached, todo = fingerprints.cached_cases(out_dir, cases, diff_reports)
+    t.tln(f" * cached: {', '.join(cached)}")
+
+    t.h1("changed snapshot:")
+    with open(exp_md, "a") as file:
+        file.write("edited\n")
+    cached, todo = fingerprints.cached_cases(out_dir, cases, ok_reports)
+    t.tln(f" * cached: {', '.join(cached)}")
+
+    t.h1("changed test:")
+    with open(fingerprints.path(out_dir, cache), "w") as file:
+        file.write("fingerprint of an older version")
+    cached, todo = fingerprints.cached_cases(out_dir, cases, ok_reports)
+    t.tln(f" * cached: {', '.join(cached)}")
+    t.tln(" * selecting the dependent selects the changed dependency:")
+    for name in tests.selected_names([cache_use], out_dir, fingerprints):
+        t.tln(f"   - {name}")
+    t.tln(" * without memoization, the old result is reused:")
+    for name in tests.selected_names([cache_use], out_dir):
+        t.tln(f"   - {name}")
+
+
+def test_memoized_runs(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("with memoize=1, unchanged producers are not rerun. changing a declared")
+    t.tln("input file or refreshing with -r reruns them")
+
+    root_dir = t.tmp_path("books")
+    ran = []
+    input_file = t.tmp_file("input.txt")
+    with open(input_file, "w") as f:
+        f.write("1")
+
+    @bt.input_files(input_file)
+    def produce(t: bt.TestCaseRun):
+        ran.append("produce")
+        with open(input_file) as f:
+            value = int(f.read())
+        t.tln(f"produced {value}")
+        return value
+
+    @bt.depends_on(produce)
+    def consume(t: bt.TestCaseRun, value):
+        ran.append("consume")
+        t.tln(f"consumed {value}")
+
+    tests = bt.Tests([("memo/produce", produce), ("memo/consume", consume)])
+
+    def run(*args):
+        exec_and_report(t, tests, root_dir, list(args) + ["memo"], ran, {"memoize": True})
+
+    t.h1("first run:")
+    run("-a")
+
+    t.h1("second run:")
+    run()
+
+    t.h1("input file changed:")
+    with open(input_file, "w") as f:
+        f.write("1 ")
+    run()
+
+    t.h1("refresh:")
+    run("-r")
@@ -0,0 +1,109 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import booktest as bt
+from booktest.dependencies.cache import MemoryCache, estimate_size
+from booktest.core.runs import memory_cache
+from test.nested_runs import exec_tests
+
+
+FAIL = {}
+
+
+def test_size_estimates(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the cache estimates the memory used by the values. numpy arrays and")
+    t.tln("pandas objects are measured by their buffers")
+
+    array = np.zeros(1000)
+    values = {
+        "array": array,
+        "frame": pd.DataFrame({"x": np.arange(1000, dtype=np.int64)}),
+        "dict of arrays": {"a": array, "b": np.ones(500)},
+        "shared array": [array, array],
+    }
+
+    t.h1("sizes:")
+    for name, value in values.items():
+        t.tln(f" * {name}: {estimate_size(value) // 1000} kB")
+
+
+def test_memory_budget(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("values are evicted, when their total size exceeds the budget. the values")
+    t.tln("with the lowest cost per byte are evicted first and the evicted values")
+    t.tln("are passed to the spill function")
+
+    spilled = []
+    cache = MemoryCache(100_000, spill=lambda key, value: spilled.append(key))
+
+    t.h1("put:")
+    cache.put("model", np.zeros(5000), cost=10_000)
+    cache.put("data", np.zeros(5000), cost=10)
+    t.tln(f" * cached: {', '.join(key for key in ['model', 'data'] if key in cache)}")
+    t.tln(f" * size: {cache.size // 1000} kB")
+
+    t.h1("put over budget:")
+    cache.put("features", np.zeros(5000), cost=100)
+    t.tln(f" * cached: {', '.join(key for key in ['model', 'data', 'features'] if key in cache)}")
+    t.tln(f" * spilled: {', '.join(spilled)}")
+
+    t.h1("recently used values survive:")
+    for i in range(3):
+        cache["model"]
+        cache.put(f"batch{i}", np.zeros(5000), cost=100)
+    t.tln(f" * cached: {', '.join(sorted(key for key in ['model', 'features', 'batch0', 'batch1', 'batch2'] if key in cache))}")
+
+    t.h1("too large values:")
+    cache.put("huge", np.zeros(50_000), cost=1_000_000)
+    t.t(" * not cached..").assertln("huge" not in cache)
+    t.t(" * spilled..").assertln(spilled[-1] == "huge")
+
+    t.h1("configuration:")
+    t.tln(f" * cache_memory_mb=64 gives {memory_cache({'cache_memory_mb': '64'}).max_bytes} bytes")
+
+
+def test_removed_results(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the results removed from the disk are removed from the cache too, and")
+    t.tln("the evicted results are never written back into the result files")
+
+    root_dir = t.tmp_path("books")
+    cache = memory_cache({"cache_memory_mb": 1})
+
+    def produce(t: bt.TestCaseRun):
+        if FAIL.get("produce"):
+            raise ValueError("no data")
+        t.tln("ok")
+        return "data"
+
+    @bt.depends_on(produce)
+    def train(t: bt.TestCaseRun, data):
+        t.tln("ok")
+        return np.zeros(100)
+
+    tests = bt.Tests([("removed/produce", produce),
+                      ("removed/train", train)])
+    bin_path = tests.test_result_path(os.path.join(root_dir, ".out"), "removed/train")
+
+    t.h1("passed:")
+    FAIL.clear()
+    exec_tests(tests, root_dir, ["-s", "removed"], cache)
+    t.tln(f" * train result file: {os.path.exists(bin_path)}")
+
+    t.h1("skipped:")
+    # the cache is shared with the earlier run
+    cache.put(bin_path, np.zeros(100))
+    FAIL["produce"] = True
+    exec_tests(tests, root_dir, ["removed"], cache)
+    t.tln(f" * train result cached: {bin_path in cache}")
+    t.tln(f" * train result file: {os.path.exists(bin_path)}")
+
+    t.h1("evicted:")
+    cache.put(bin_path, np.zeros(100))
+    cache.put("features", np.zeros(70_000), cost=1000)
+    cache.put("model", np.zeros(70_000), cost=1000)
+    t.tln(f" * train result cached: {bin_path in cache}")
+    t.tln(f" * train result file: {os.path.exists(bin_path)}")
@@ -0,0 +1,40 @@
+import os
+
+import booktest as bt
+from booktest.core.testcaserun import flush_case_outputs
+from test.nested_runs import exec_tests
+
+
+SIZES = {}
+
+
+def test_output_buffering(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the test output is buffered and written, when the test ends. live_tail")
+    t.tln("flushes the output after every line, and the buffered output is")
+    t.tln("flushed also, when the worker is terminated")
+
+    root_dir = t.tmp_path("books")
+
+    def write(t: bt.TestCaseRun):
+        for i in range(10):
+            t.tln(f"line {i}")
+        SIZES["written"] = os.path.getsize(t.out_file_name)
+        flush_case_outputs()
+        SIZES["flushed"] = os.path.getsize(t.out_file_name)
+
+    tests = bt.Tests([("buffering/write", write)])
+
+    def run(config):
+        SIZES.clear()
+        exec_tests(tests, root_dir, ["-a", "buffering"], extra_default_config=config)
+        out_file = os.path.join(root_dir, "buffering", "write.md")
+        t.tln(f" * written during the test: {SIZES['written'] > 0}")
+        t.tln(f" * written after the flush: {SIZES['flushed'] > 0}")
+        t.tln(f" * accepted: {os.path.getsize(out_file)} bytes")
+
+    t.h1("buffered:")
+    run({})
+
+    t.h1("live tail:")
+    run({"live_tail": True})
@@ -0,0 +1,140 @@
+import mmap
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+import booktest as bt
+from booktest.dependencies.codecs import write_result, read_result, result_codec, \
+    register_codec, ResultCodec, CODECS, TYPE_CODECS
+
+
+def is_memory_mapped(array):
+    base = array
+    while base is not None:
+        if isinstance(base, memoryview):
+            return isinstance(base.obj, mmap.mmap)
+        if isinstance(base, np.memmap):
+            return True
+        base = base.base
+    return False
+
+
+def test_result_codecs(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("dependency results are stored with a codec selected by the value type.")
+    t.tln("the arrays of the large result files are memory mapped, when the results")
+    t.tln("are read back")
+
+    values = {
+        "string": "hello",
+        "array": np.arange(12, dtype=np.float64).reshape(3, 4),
+        "object array": np.array([1, "a"], dtype=object),
+        "frame": pd.DataFrame({"x": np.arange(5), "y": np.linspace(0, 1, 5)}),
+        "dict": {"weights": np.ones(4), "label": "model"},
+        "large array": np.arange(200_000, dtype=np.float64),
+        "large dict": {"weights": np.ones(200_000), "label": "model"},
+    }
+
+    t.h1("round trips:")
+    for name, value in values.items():
+        file_path = t.tmp_file(name.replace(" ", "_") + ".bin")
+        write_result(file_path, value)
+        read = read_result(file_path)
+
+        if isinstance(value, pd.DataFrame):
+            equal = value.equals(read)
+            mapped = is_memory_mapped(read["y"].values)
+        elif isinstance(value, dict):
+            equal = value.keys() == read.keys() and (value["weights"] == read["weights"]).all()
+            mapped = is_memory_mapped(read["weights"])
+        elif isinstance(value, np.ndarray):
+            equal = (value == read).all()
+            mapped = is_memory_mapped(read)
+        else:
+            equal = value == read
+            mapped = False
+
+        t.tln(f" * {name} uses {result_codec(value).name}, memory mapped: {mapped}")
+        t.t("   * read value equals the written..").assertln(equal)
+
+    t.h1("copy-on-write:")
+    for name in ["array", "large_array"]:
+        file_path = t.tmp_file(f"{name}.bin")
+        read = read_result(file_path)
+        read.flat[0] = 100
+        t.t(f" * {name} is writable..").assertln(read.flat[0] == 100)
+        t.t(" * the file is not modified..").assertln(read_result(file_path).flat[0] == 0)
+
+    t.h1("plain pickles:")
+    file_path = t.tmp_file("legacy.bin")
+    with open(file_path, "wb") as file:
+        pickle.dump([1, 2, 3], file)
+    t.tln(f" * {read_result(file_path)}")
+
+
+class Point:
+
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class PointCodec(ResultCodec):
+    name = "point"
+
+    def encode(self, value, file):
+        file.write(f"{value.x},{value.y}".encode())
+
+    def decode(self, buffer):
+        x, y = bytes(buffer).decode().split(",")
+        return Point(int(x), int(y))
+
+
+def test_custom_codec(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("custom codecs can be registered for custom types")
+
+    register_codec(PointCodec(), lambda value: isinstance(value, Point))
+    try:
+        file_path = t.tmp_file("point.bin")
+        write_result(file_path, Point(2, 3))
+
+        with open(file_path, "rb") as file:
+            t.h1("file:")
+            t.tcode("\n".join(line.rstrip() for line in file.read().decode().split("\n")))
+
+        point = read_result(file_path)
+        t.h1("read:")
+        t.tln(f" * point ({point.x}, {point.y})")
+    finally:
+        del CODECS[PointCodec.name]
+        TYPE_CODECS.pop(0)
+
+
+def test_broken_results(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("empty and truncated result files raise EOFError like the plain pickles")
+
+    t.h1("files:")
+    empty_path = t.tmp_file("empty.bin")
+    open(empty_path, "wb").close()
+
+    truncated_path = t.tmp_file("truncated.bin")
+    write_result(truncated_path, {"weights": np.ones(1000)})
+    with open(truncated_path, "r+b") as file:
+        file.truncate(os.path.getsize(truncated_path) // 2)
+
+    header_path = t.tmp_file("header.bin")
+    with open(header_path, "wb") as file:
+        file.write(b"#booktest-result pick")
+
+    for name, file_path in [("empty", empty_path),
+                            ("truncated", truncated_path),
+                            ("truncated header", header_path)]:
+        try:
+            read_result(file_path)
+            t.tln(f" * {name}: read")
+        except EOFError:
+            t.tln(f" * {name}: EOFError")
@@ -0,0 +1,65 @@
+import os
+
+import booktest as bt
+from booktest.dependencies.lifetimes import ResultLifetimes
+from test.nested_runs import exec_tests
+
+
+def test_lifetimes(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("results are released, when their last dependent has finished, or right")
+    t.tln("after the case, if no selected case depends on it")
+
+    lifetimes = ResultLifetimes({
+        "load": [],
+        "clean": ["load"],
+        "train": ["clean"],
+        "evaluate": ["train", "clean"],
+        "plot": [],
+    })
+
+    t.h1("releases:")
+    for name in ["load", "clean", "train", "evaluate", "plot", "plot"]:
+        t.tln(f" * {name} finished: {', '.join(lifetimes.finished(name)) or '-'}")
+
+
+def test_ephemeral_results(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("results are dropped from the memory after their last dependent")
+    t.tln("and the ephemeral result files are removed")
+
+    root_dir = t.tmp_path("books")
+
+    @bt.ephemeral
+    def load(t: bt.TestCaseRun):
+        t.tln("loaded")
+        return [1, 2, 3]
+
+    @bt.depends_on(load)
+    def train(t: bt.TestCaseRun, data):
+        t.tln(f"trained with {len(data)} rows")
+        return sum(data)
+
+    @bt.depends_on(train)
+    def evaluate(t: bt.TestCaseRun, model):
+        t.tln(f"evaluated {model}")
+
+    tests = bt.Tests([("pipeline/load", load),
+                      ("pipeline/train", train),
+                      ("pipeline/evaluate", evaluate)])
+    cache = bt.MemoryCache(1024 * 1024)
+
+    def run(*args):
+        return exec_tests(tests, root_dir, list(args), cache)
+
+    t.h1("pipeline run:")
+    t.tln(f" * exit code: {run('-a', 'pipeline')}")
+    t.tln(f" * results in memory: {len(cache)}")
+    for name, _ in tests.cases:
+        exists = os.path.exists(tests.test_result_path(os.path.join(root_dir, ".out"), name))
+        t.tln(f" * {name} result file exists: {exists}")
+
+    t.h1("ephemeral dependency is rerun:")
+    t.tln(f" * exit code: {run('pipeline/train')}")
+    exists = os.path.exists(tests.test_result_path(os.path.join(root_dir, ".out"), "pipeline/load"))
+    t.tln(f" * pipeline/load result file exists: {exists}")
@@ -0,0 +1,94 @@
+import os
+import threading
+
+import numpy as np
+
+import booktest as bt
+from booktest.dependencies.codecs import read_result, write_result
+from booktest.dependencies.writer import ResultWriter
+
+
+def result_header(file_path):
+    with open(file_path, "rb") as file:
+        return file.readline().decode().strip()
+
+
+def test_result_writer(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("results are written into the result files in a background thread.")
+    t.tln("the readers wait only for the write of the file they read")
+
+    writer = ResultWriter(max_pending=2)
+    release = threading.Event()
+    file_path = t.tmp_file("slow.bin")
+    other_path = t.tmp_file("other.bin")
+
+    t.h1("pending writes:")
+    # the first write blocks the writer, until it is released
+    writer.write(file_path, np.arange(1000), on_written=release.wait)
+    t.t(" * write doesn't wait for the file..").assertln(writer.is_pending(file_path))
+
+    reported = []
+    writer.when_written(file_path, lambda: reported.append(os.path.exists(file_path)))
+    writer.when_written(other_path, lambda: reported.append("not pending"))
+    t.t(" * unwritten files are reported immediately..").assertln(reported == ["not pending"])
+
+    release.set()
+    writer.wait(file_path)
+    t.t(" * the file is read after the write..").assertln(
+        (read_result(file_path) == np.arange(1000)).all())
+    t.t(" * written file is reported after the write..").assertln(reported == ["not pending", True])
+
+    t.h1("failed writes:")
+    write_result(other_path, "older result")
+    writer.write(other_path, lambda: None)
+    try:
+        writer.wait(other_path)
+        t.tln(" * wait raised nothing")
+    except Exception as e:
+        t.tln(f" * wait raises {type(e).__name__}")
+    t.t(" * older result is removed..").assertln(not os.path.exists(other_path))
+    errors = writer.close()
+    t.t(" * close returns the failed write..").assertln(
+        [file_path for file_path, _ in errors] == [other_path])
+
+    t.h1("synchronous writes:")
+    writer = ResultWriter(max_pending=0)
+    writer.write(other_path, "result")
+    t.t(" * file is written immediately..").assertln(read_result(other_path) == "result")
+    writer.write(other_path, None)
+    t.t(" * None result removes the file..").assertln(not os.path.exists(other_path))
+
+
+def test_result_compression(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("results can be compressed with zlib, zstd (requires zstandard)")
+    t.tln("or lz4 (requires lz4)")
+
+    values = {
+        "array": np.zeros((100, 100)),
+        "dict": {"weights": np.zeros(10000), "label": "model"},
+    }
+
+    t.h1("zlib:")
+    for name, value in values.items():
+        plain_path = t.tmp_file(name + ".bin")
+        compressed_path = t.tmp_file(name + ".zlib.bin")
+        write_result(plain_path, value)
+        ResultWriter(max_pending=0, compression="zlib").write(compressed_path, value)
+        read = read_result(compressed_path)
+        array = read if name == "array" else read["weights"]
+
+        t.tln(f" * {name}:")
+        t.tln(f"   - header: {result_header(compressed_path)}")
+        t.t("   - smaller than uncompressed..").assertln(
+            os.path.getsize(compressed_path) < os.path.getsize(plain_path))
+        t.t("   - round trip..").assertln(array.shape == np.asarray(
+            value if name == "array" else value["weights"]).shape and not array.any())
+        t.t("   - read array is writable..").assertln(array.flags.writeable)
+
+    t.h1("unknown compression:")
+    try:
+        write_result(t.tmp_file("unknown.bin"), "value", "brotli")
+    except ValueError as e:
+        t.tln(f" * {e}")
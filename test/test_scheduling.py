@@ -0,0 +1,63 @@
+import booktest as bt
+from test.nested_runs import simple_runner
+
+
+def test_worker_affinity(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("dependents prefer the worker, which has their dependency results in its")
+    t.tln("memory, and fall back to another idle worker, when that worker is busy.")
+    t.tln("the workers report the results loaded and evicted by each case")
+
+    runner = simple_runner(t, {}, {"parallel": 3})
+    cache = "test/examples/simple_book.py::test_cache"
+    cache_use = "test/examples/simple_book.py::test_cache_use"
+    cache_path = runner.tests.test_result_path(runner.out_dir, cache)
+
+    def t_assignments(idle_workers_list):
+        for idle_workers in idle_workers_list:
+            assigned = runner.assign_workers([([cache_use], {})], idle_workers)
+            t.tln(f" * idle workers {idle_workers}: test_cache_use runs in worker {assigned[0][0]}")
+
+    t.h1("test_cache loaded in worker 1:")
+    runner.worker_cache_changed(1, [cache_path], [])
+    t_assignments([[0, 1, 2], [0, 2]])
+
+    t.h1("test_cache evicted in worker 1 and loaded in worker 2:")
+    runner.worker_cache_changed(1, [], [cache_path])
+    runner.worker_cache_changed(2, [cache_path], [])
+    t_assignments([[0, 1, 2]])
+
+
+def t_ready(t: bt.TestCaseRun, runner):
+    t.tln(f" * ready: {', '.join(name for _, name in sorted(runner.ready))}")
+
+
+def test_ready_queue(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("cases enter the ready queue, when their last dependency finishes. cases")
+    t.tln("waiting for a resource are kept aside until the resource is freed")
+
+    runner = simple_runner(t, {}, {"parallel": 3})
+    cache = "test/examples/simple_book.py::test_cache"
+
+    t.h1("dependencies:")
+    t_ready(t, runner)
+    t.tln(f" * planned: {[names for names, _ in runner.plan(1)]}")
+    t_ready(t, runner)
+    runner.case_done(cache)
+    t.tln(" * test_cache done")
+    t_ready(t, runner)
+
+    runner = simple_runner(t, {}, {"parallel": 3}, "resource_book")
+
+    t.h1("resources:")
+    tasks = runner.plan(3)
+    t.tln(f" * planned: {[names for names, _ in tasks]}")
+    t.tln(f" * blocked: {sum(len(i) for i in runner.blocked.values())}")
+    t_ready(t, runner)
+    names, preallocations = tasks[0]
+    runner.case_done(names[0])
+    runner.deallocate(names[0], preallocations)
+    t.tln(" * resource freed")
+    t_ready(t, runner)
+    t.tln(f" * planned: {[names for names, _ in runner.plan(3)]}")
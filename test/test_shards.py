@@ -0,0 +1,72 @@
+import os
+
+import booktest as bt
+from booktest.config.detection import get_module_tests
+from booktest.core.shards import shard_cases, merge_out_dirs
+from booktest.reporting.reports import CaseReports, DurationHistory, Metrics, TestResult, read_lines
+
+
+def test_shard_balancing(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("cases are split into shards balanced by their durations, while the")
+    t.tln("cases depending on each other are kept in the same shard")
+
+    simple_tests = get_module_tests("test/examples/simple_book.py", "test.examples.simple_book")
+    hello_tests = get_module_tests("test/examples/hello_book.py", "test.examples.hello_book")
+    tests = bt.merge_tests(simple_tests + hello_tests)
+    cases = tests.all_names()
+    durations = {
+        "test/examples/simple_book.py::test_simple": 300,
+        "test/examples/simple_book.py::test_cache": 100,
+        "test/examples/simple_book.py::test_cache_use": 100,
+        "test/examples/hello_book.py::test_hello": 150
+    }
+
+    sharded = []
+    for shard in range(1, 4):
+        shard_case_names = shard_cases(tests, cases, shard, 3, durations)
+        sharded.extend(shard_case_names)
+        t.h1(f"shard {shard}/3:")
+        for name in shard_case_names:
+            t.tln(f" * {name}")
+
+    t.h1("coverage:")
+    t.t(" * every case is in exactly one shard..").assertln(sorted(sharded) == sorted(cases))
+
+
+def write_shard(shard_dir, cases, output):
+    os.makedirs(os.path.join(shard_dir, "test"), exist_ok=True)
+    CaseReports(cases).to_dir(shard_dir)
+    DurationHistory().update_all(cases).to_dir(shard_dir)
+    Metrics(sum(i[2] for i in cases)).to_dir(shard_dir)
+    with open(os.path.join(shard_dir, "output.txt"), "w") as f:
+        f.write(output + "\n")
+    for name, _, _ in cases:
+        with open(os.path.join(shard_dir, f"{name}.txt"), "w") as f:
+            f.write(f"output of {name}\n")
+
+
+def test_merge_out(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the .out directories of the shards are merged into a single .out")
+    t.tln("directory, which can be reviewed like a normal test run")
+
+    shard1 = t.tmp_path("shard1")
+    shard2 = t.tmp_path("shard2")
+    out_dir = t.tmp_path("out")
+    write_shard(shard1, [("test/a", TestResult.OK, 100), ("test/b", TestResult.DIFF, 50)], "shard 1 output")
+    write_shard(shard2, [("test/c", TestResult.FAIL, 200)], "shard 2 output")
+
+    merged = merge_out_dirs({}, out_dir, [shard1, shard2])
+
+    t.h1("merged cases:")
+    for name, result, duration in CaseReports.of_dir(out_dir).cases:
+        t.tln(f" * {name} {result.name} {duration} ms")
+    t.t(" * failed cases..").tln(", ".join(merged.failed()))
+
+    t.h1("merged files:")
+    for name in ["test/a", "test/b", "test/c"]:
+        t.tln(f" * {name}.txt: {read_lines(out_dir, name + '.txt')}")
+    t.tln(f" * output.txt: {read_lines(out_dir, 'output.txt')}")
+    t.tln(f" * metrics took: {Metrics.of_dir(out_dir).took_ms} ms")
+    t.tln(f" * history: {sorted(DurationHistory.of_dir(out_dir).durations().items())}")
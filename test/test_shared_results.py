@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+
+import numpy as np
+
+import booktest as bt
+from booktest.core.workers import WorkerPool
+from booktest.dependencies.codecs import write_result
+from booktest.dependencies.shared import SharedResults, attach_result
+from booktest.reporting.reports import TestResult
+from booktest.utils.utils import ensure_dir
+from test.nested_runs import simple_runner
+from test.test_workers import Events
+
+
+def describe_result(bin_path, segment_name, size):
+    features = attach_result(bin_path, segment_name, size)
+    rv = f"sum {features.sum()}, writable {features.flags.writeable}"
+    # the modification stays in this worker
+    features[:] = 0
+    return rv
+
+
+def test_shared_segments(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("large results are copied into shared memory segments owned by the")
+    t.tln("parent. workers decode the results from copy-on-write mappings, so the")
+    t.tln("arrays are writable like in the sequential runs")
+
+    bin_path = t.tmp_file("features.bin")
+    write_result(bin_path, np.ones((1000, 256)))
+    small_path = t.tmp_file("small.bin")
+    write_result(small_path, np.ones(10))
+
+    shared = SharedResults()
+    try:
+        t.h1("publish:")
+        t.t(" * large result is published..").assertln(shared.publish(bin_path))
+        t.t(" * small result is not published..").assertln(not shared.publish(small_path))
+
+        segments = shared.segment_names([bin_path, small_path])
+        t.tln(f" * {len(segments)} segment for the workers")
+
+        t.h1("worker:")
+        events = Events()
+        with WorkerPool(multiprocessing.get_context("spawn"), 1, describe_result, events) as pool:
+            pool.submit(0, "describe", bin_path, *segments[bin_path])
+            t.tln(f" * {events.wait(1)[3]}")
+            pool.submit(0, "describe again", bin_path, *segments[bin_path])
+            t.tln(f" * {events.wait(2)[3]}")
+
+        t.h1("release:")
+        shared.release(bin_path)
+        t.tln(f" * {len(shared.segment_names([bin_path]))} segments left")
+    finally:
+        shared.close()
+
+
+def test_share_planning(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the parallel runner shares the results with several dependents and")
+    t.tln("releases them, when the last dependent has finished")
+
+    runner = simple_runner(t, {}, {"parallel": 2}, book="shared_book")
+    features = "test/examples/shared_book.py::test_features"
+    dependents = ["test/examples/shared_book.py::test_feature_sum",
+                  "test/examples/shared_book.py::test_feature_mean"]
+
+    bin_path = runner.tests.test_result_path(runner.out_dir, features)
+    ensure_dir(os.path.dirname(bin_path))
+    write_result(bin_path, np.ones((1000, 256)))
+
+    try:
+        t.h1("features done:")
+        runner.case_done(features)
+        runner.share_results(features, TestResult.OK)
+        runner.release_results(features)
+        t.tln(f" * shared results of {dependents[0]}: {len(runner.shared_results([dependents[0]]))}")
+
+        t.h1("first dependent done:")
+        runner.case_done(dependents[0])
+        runner.share_results(dependents[0], TestResult.OK)
+        runner.release_results(dependents[0])
+        t.tln(f" * shared results of {dependents[1]}: {len(runner.shared_results([dependents[1]]))}")
+
+        t.h1("last dependent done:")
+        runner.case_done(dependents[1])
+        runner.share_results(dependents[1], TestResult.OK)
+        runner.release_results(dependents[1])
+        t.tln(f" * shared segments: {len(runner.shared.segments)}")
+        t.t(" * workers drop the result from memory..").assertln(
+            all(bin_path in runner.released[i] for i in range(runner.process_count)))
+    finally:
+        runner.shared.close()
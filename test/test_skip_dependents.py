@@ -0,0 +1,65 @@
+import os
+
+import booktest as bt
+from test.nested_runs import exec_and_report, simple_runner
+
+
+def test_skipped_dependents(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("when a case fails, the cases depending on it are reported skipped")
+    t.tln("without running them. the other cases are run normally")
+
+    root_dir = t.tmp_path("books")
+    ran = []
+
+    def produce(t: bt.TestCaseRun):
+        ran.append("produce")
+        raise ValueError("no data")
+
+    @bt.depends_on(produce)
+    def train(t: bt.TestCaseRun, data):
+        ran.append("train")
+        return data
+
+    @bt.depends_on(train)
+    def evaluate(t: bt.TestCaseRun, model):
+        ran.append("evaluate")
+
+    def independent(t: bt.TestCaseRun):
+        ran.append("independent")
+        t.tln("ok")
+
+    tests = bt.Tests([("pipeline/produce", produce),
+                      ("pipeline/train", train),
+                      ("pipeline/evaluate", evaluate),
+                      ("pipeline/independent", independent)])
+
+    t.h1("run:")
+    # the new snapshot of the independent case is accepted, so it passes
+    exit_code = exec_and_report(t, tests, root_dir, ["-a", "pipeline"], ran)
+    t.tln(f" * exit code: {exit_code}")
+
+    out_dir = os.path.join(root_dir, ".out")
+    with open(os.path.join(out_dir, "pipeline", "evaluate.txt")) as f:
+        t.tln(f" * evaluate report: {f.read().strip()}")
+
+
+def test_parallel_skip_planning(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the parallel runner marks the dependents of a failed case done, so")
+    t.tln("that they never enter the ready queue")
+
+    runner = simple_runner(t, {}, {"parallel": 2}, book="shared_book")
+    features = "test/examples/shared_book.py::test_features"
+
+    t.h1("planning:")
+    t.tln(f" * {len(runner.plan(2))} task planned")
+
+    t.h1("features failed:")
+    skipped = runner.skip_dependents(features)
+    runner.case_done(features)
+    for name, dependency in sorted(skipped):
+        runner.skip_case(name, dependency)
+        t.tln(f" * {name} skipped after {dependency}")
+    t.tln(f" * {len(runner.done)}/{len(runner.todo)} cases done")
+    t.tln(f" * {len(runner.plan(2))} tasks planned")
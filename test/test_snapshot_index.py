@@ -0,0 +1,137 @@
+import random
+import time
+
+import booktest as bt
+from booktest.core.snapshotindex import SnapshotIndex
+
+
+class ScanningReader:
+    """
+    Reference snapshot reader, which scans the lines one by one
+    and restarts from the top on backward jumps
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.reset()
+
+    def reset(self):
+        self.open = True
+        self.at = 0
+        self.exp_line = None
+        self.exp_line_number = 0
+        self.next_exp_line()
+
+    def next_exp_line(self):
+        if self.open:
+            self.exp_line_number += 1
+            if self.at < len(self.lines):
+                self.exp_line = self.lines[self.at]
+                self.at += 1
+            else:
+                # the end of the file closes the reader
+                self.open = False
+                self.exp_line = None
+
+    def jump(self, line_number):
+        if line_number < self.exp_line_number:
+            self.reset()
+        while self.exp_line is not None and self.exp_line_number < line_number:
+            self.next_exp_line()
+
+    def seek(self, is_line_ok, begin=0, end=10 ** 9):
+        at_line_number = self.exp_line_number
+        while self.exp_line is not None \
+                and not is_line_ok(self.exp_line) \
+                and self.exp_line_number < end:
+            self.next_exp_line()
+        if self.exp_line is None:
+            self.jump(begin)
+            while self.exp_line is not None \
+                    and not is_line_ok(self.exp_line) \
+                    and self.exp_line_number < at_line_number:
+                self.next_exp_line()
+
+
+def indexed_reader(lines):
+    """
+    Creates a test case run, which has only the snapshot reader state
+    """
+    rv = bt.TestCaseRun.__new__(bt.TestCaseRun)
+    rv.exp_file_exists = True
+    rv.exp = SnapshotIndex(lines)
+    rv.last_checked = False
+    rv.goto_exp_line(1)
+    return rv
+
+
+def random_lines(rnd, count):
+    return [rnd.choice(["# title", " * a", " * b", "key=1", "key=2", "", "text"])
+            for _ in range(count)]
+
+
+def test_snapshot_seeks(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the snapshot lines are read once into an index, which makes the seeks")
+    t.tln("and jumps lookups instead of file scans. the cursor moves like with")
+    t.tln("the scanning reader")
+
+    rnd = random.Random(0)
+    operations = 0
+    mismatches = 0
+    for _ in range(200):
+        lines = random_lines(rnd, rnd.randint(0, 12))
+        scanning = ScanningReader(lines)
+        indexed = indexed_reader(lines)
+        for _ in range(20):
+            kind = rnd.choice(["next", "jump", "line", "prefix", "range"])
+            if kind == "next":
+                scanning.next_exp_line()
+                indexed.next_exp_line()
+            elif kind == "jump":
+                line_number = rnd.randint(-1, len(lines) + 2)
+                scanning.jump(line_number)
+                indexed.jump(line_number)
+            elif kind == "line":
+                anchor = rnd.choice(lines + ["missing"])
+                scanning.seek(lambda x: x == anchor)
+                indexed.seek_line(anchor)
+            elif kind == "prefix":
+                prefix = rnd.choice([" * ", "key=", "#", "missing"])
+                scanning.seek(lambda x: x.startswith(prefix))
+                indexed.seek_prefix(prefix)
+            else:
+                anchor = rnd.choice(lines + ["missing"])
+                begin = rnd.randint(0, len(lines) + 1)
+                end = rnd.randint(begin, len(lines) + 2)
+                scanning.seek(lambda x: x == anchor, begin, end)
+                indexed.seek_line(anchor, begin, end)
+            operations += 1
+            if (scanning.exp_line_number, scanning.exp_line) != \
+                    (indexed.exp_line_number, indexed.exp_line):
+                mismatches += 1
+
+    t.h1("random operations:")
+    t.tln(f" * {operations} operations")
+    t.t(" * the cursors match..").assertln(mismatches == 0)
+
+    t.h1("large snapshot:")
+    lines = [f"key{i}={i}" for i in range(50000)]
+    indexed = indexed_reader(lines)
+    before = time.time()
+    for i in range(50000, 0, -97):
+        indexed.seek_line(f"key{i - 1}={i - 1}")
+        indexed.seek_prefix("key0=")
+    took_ms = 1000 * (time.time() - before)
+    t.tln(f" * cursor at line {indexed.exp_line_number}")
+    t.t(" * the backward seeks take less than a second..").assertln(took_ms < 1000)
+
+
+def test_indexed_anchors(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("anchors and headers seek the snapshot cursor from the index")
+
+    for i in [3, 1, 2]:
+        t.h2(f"section {i}:")
+        t.anchor(" * value=").tln(i * 10)
+        t.tset([f"item {j}" for j in range(i, 0, -1)])
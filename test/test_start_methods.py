@@ -0,0 +1,84 @@
+import multiprocessing
+import subprocess
+import sys
+
+import booktest as bt
+from booktest.core.runs import pool_context, preload_modules, case_modules, START_METHODS
+from booktest.config.detection import get_module_tests
+
+
+def test_start_method_validation(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("parallel workers can be started with spawn, forkserver or fork.")
+    t.tln("unknown or unsupported start methods must be rejected before any")
+    t.tln("worker is started")
+
+    tests = bt.merge_tests(get_module_tests("test/examples/simple_book.py", "test.examples.simple_book"))
+    available = multiprocessing.get_all_start_methods()
+
+    t.h1("start methods:")
+    for method in START_METHODS:
+        if method in available:
+            context = pool_context({"parallel_start_method": method}, tests)
+            t.t(f" * {method} creates a context..").assertln(context.get_start_method() == method)
+        else:
+            t.iln(f" * {method} is not available on this platform")
+
+    t.h1("unknown start method:")
+    try:
+        pool_context({"parallel_start_method": "thread"}, tests)
+        t.fail().tln(" * no error was raised")
+    except ValueError as e:
+        t.tln(f" * {e}")
+
+
+def test_preload_modules(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("forkserver and fork start methods import booktest, the configured")
+    t.tln("parallel_preload modules and the test modules once in the parent,")
+    t.tln("so that the workers don't need to reimport them")
+
+    tests = bt.merge_tests(get_module_tests("test/examples/simple_book.py", "test.examples.simple_book"))
+
+    t.h1("test modules:")
+    for module in case_modules(tests):
+        t.tln(f" * {module}")
+
+    t.h1("preloaded modules:")
+    for module in preload_modules({"parallel_preload": "json, csv,json"}, tests):
+        t.tln(f" * {module}")
+
+
+FORKSERVER_RUN = """
+import booktest as bt
+from booktest.core import runs
+from booktest.config.detection import get_module_tests
+
+tests = bt.merge_tests(get_module_tests("test/examples/simple_book.py", "test.examples.simple_book"))
+print("preloaded before:", runs.forkserver_preloaded())
+runs.pool_context({"parallel_start_method": "forkserver"}, tests)
+print("preloaded after:", runs.FORKSERVER_PRELOAD)
+runs.pool_context({"parallel_start_method": "forkserver", "parallel_preload": "json"}, tests)
+print("preloaded again:", runs.FORKSERVER_PRELOAD)
+"""
+
+
+def test_running_forkserver(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the forkserver is started once per process and it ignores later")
+    t.tln("preloads, so the preload is skipped with a warning, when an earlier")
+    t.tln("run has already set it. the run is done in a new interpreter to not")
+    t.tln("depend on the forkserver of this process")
+
+    if "forkserver" not in multiprocessing.get_all_start_methods():
+        t.iln(" * forkserver is not available on this platform")
+        return
+
+    result = subprocess.run([sys.executable, "-c", FORKSERVER_RUN],
+                            capture_output=True, text=True)
+
+    t.h1("output:")
+    for line in result.stdout.splitlines():
+        t.tln(f" * {line}")
+    t.t(" * the second preload was warned about..").assertln(
+        "the forkserver preload was set by an earlier run" in result.stderr)
@@ -0,0 +1,49 @@
+import random
+import time
+
+import booktest as bt
+from booktest.llm.tokenizer import tokenize
+
+
+def scanned_tokens(text):
+    """
+    Tokenizes the text character by character
+    """
+    tokenizer = bt.TestTokenizer(text)
+    tokenizer.pattern = None
+    return list(tokenizer)
+
+
+def test_tokenizer(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("ASCII text is tokenized with a compiled pattern. the tokens are the")
+    t.tln("same as when scanning the text character by character")
+
+    t.h1("examples:")
+    for text in ["a  -12.5x +b", "1.2.3 ab12 12ab", "|  3.50 | -x |", "päivä 12½ ²"]:
+        t.tln(f" * {text!r}: {tokenize(text)}")
+
+    t.h1("random texts:")
+    rnd = random.Random(0)
+    alphabet = "ab09 \t+-.|_\n"
+    mismatches = 0
+    for i in range(2000):
+        text = "".join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 20)))
+        if i % 4 == 0:
+            text += rnd.choice(["ä", "½", "٣", "€"])
+        if tokenize(text) != scanned_tokens(text) or \
+           list(bt.TestTokenizer(text)) != scanned_tokens(text):
+            mismatches += 1
+    t.t(" * the tokens match..").assertln(mismatches == 0)
+
+    t.h1("speed:")
+    line = "| 2024-01-01 | model_a | 0.9312 | -12.5 | ok |" * 10
+    before = time.time()
+    for _ in range(100):
+        scanned_tokens(line)
+    scan_took = time.time() - before
+    before = time.time()
+    for _ in range(100):
+        tokenize(line)
+    pattern_took = time.time() - before
+    t.t(" * the pattern is faster than scanning..").assertln(pattern_took < scan_took)
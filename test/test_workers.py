@@ -0,0 +1,152 @@
+import multiprocessing
+import os
+import threading
+import time
+
+import booktest as bt
+from booktest.config.detection import BookTestSetup
+from booktest.core import runs
+from booktest.core.runs import init_worker, exit_worker, process_cache
+from booktest.core.workers import WorkerPool
+
+
+def sleep_task(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def logged_setup_teardown():
+    log_path = os.environ["WORKER_SETUP_LOG"]
+    with open(log_path, "a") as f:
+        f.write("setup\n")
+    yield
+    with open(log_path, "a") as f:
+        f.write("teardown\n")
+
+
+def read_setup_log(task):
+    with open(os.environ["WORKER_SETUP_LOG"]) as f:
+        return f"{task}: {', '.join(f.read().split())}"
+
+
+def cache_result(key):
+    cache = process_cache({})
+    cache[key] = key
+    return len(cache)
+
+
+def logged_exit_worker():
+    exit_worker()
+    with open(os.environ["WORKER_SETUP_LOG"], "a") as f:
+        f.write(f"cache released: {runs.PROCESS_LOCAL_CACHE is None}\n")
+
+
+class Events:
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.events = []
+
+    def __call__(self, worker_id, event):
+        with self.condition:
+            self.events.append((worker_id,) + event)
+            self.condition.notify_all()
+
+    def wait(self, count):
+        with self.condition:
+            self.condition.wait_for(lambda: len(self.events) >= count, timeout=30)
+            return self.events[count - 1]
+
+
+def test_worker_termination(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("a worker running a hung task can be terminated. the worker is replaced")
+    t.tln("with a fresh one, which runs the next tasks. after the pool is closed,")
+    t.tln("the exited workers are no longer replaced")
+
+    events = Events()
+    context = multiprocessing.get_context("spawn")
+
+    with WorkerPool(context, 2, sleep_task, events) as pool:
+        t.h1("tasks:")
+        pool.submit(0, "hung", 60)
+        pool.submit(1, "fast", 0)
+        t.tln(f" * {events.wait(1)}")
+        t.tln(f" * idle workers: {pool.idle_workers()}")
+
+        t.h1("termination:")
+        before = time.time()
+        pool.terminate(0)
+        t.tln(f" * {events.wait(2)}")
+        t.t(" * terminated in less than 10s..").assertln(time.time() - before < 10)
+        t.tln(f" * {events.wait(3)}")
+        t.tln(f" * idle workers: {pool.idle_workers()}")
+
+        t.h1("replaced worker:")
+        pool.restart(0)
+        t.tln(f" * idle workers: {pool.idle_workers()}")
+        pool.submit(0, "next", 0)
+        t.tln(f" * {events.wait(4)}")
+
+        t.h1("closing:")
+        pool.close()
+        pool.terminate(1)
+        time.sleep(0.5)
+        pool.restart(1)
+        t.tln(f" * events: {len(events.events)}")
+        t.tln(f" * idle workers: {pool.idle_workers()}")
+
+
+def test_worker_setup(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the process setup is done once, when the worker starts, and")
+    t.tln("torn down, when the worker exits")
+
+    log_path = t.tmp_file("setup.log")
+    events = Events()
+    context = multiprocessing.get_context("spawn")
+
+    # the spawned worker inherits the environment
+    os.environ["WORKER_SETUP_LOG"] = log_path
+    try:
+        with WorkerPool(context,
+                        1,
+                        read_setup_log,
+                        events,
+                        initializer=init_worker,
+                        initargs=(BookTestSetup(logged_setup_teardown),),
+                        finalizer=exit_worker) as pool:
+            t.h1("tasks:")
+            for i, task in enumerate(["first", "second", "third"]):
+                pool.submit(0, task, task)
+                t.tln(f" * {events.wait(i + 1)[3]}")
+    finally:
+        del os.environ["WORKER_SETUP_LOG"]
+
+    t.h1("worker exit:")
+    with open(log_path) as f:
+        t.tln(f" * {', '.join(f.read().split())}")
+
+
+def test_worker_memory(t: bt.TestCaseRun):
+    t.h1("description:")
+    t.tln("the worker releases its cached results in the finalizer, because the")
+    t.tln("fork and forkserver workers exit without running the atexit hooks")
+
+    log_path = t.tmp_file("exit.log")
+    events = Events()
+    context = multiprocessing.get_context("spawn")
+
+    os.environ["WORKER_SETUP_LOG"] = log_path
+    try:
+        with WorkerPool(context, 1, cache_result, events, finalizer=logged_exit_worker) as pool:
+            t.h1("tasks:")
+            for i, key in enumerate(["first", "second"]):
+                pool.submit(0, key, key)
+                t.tln(f" * {events.wait(i + 1)[3]} cached results")
+    finally:
+        del os.environ["WORKER_SETUP_LOG"]
+
+    t.h1("worker exit:")
+    with open(log_path) as f:
+        t.tln(f" * {f.read().strip()}")